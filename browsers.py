@@ -0,0 +1,255 @@
+"""
+Module with lifecycle of Google Chrome browser for long runs: browser
+is recycled after browser_max_pages pages or if memory of its processes
+exceeds browser_max_rss_mb (location of store is restored), processes
+of browser are always killed, memory is recorded per stage of parsing
+"""
+
+from __future__ import annotations
+
+from logging import getLogger
+import os
+import signal
+from typing import TYPE_CHECKING, Callable
+
+from services import (confirm_cookies, create_chrome_options, get_link,
+                      initialize_browser, specify_address)
+from settings import config
+
+if TYPE_CHECKING:
+    from selenium.webdriver import Chrome
+
+
+# Constants
+
+# Memory of processes is measured once per this number of pages
+RSS_CHECK_PAGES = 20
+
+PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+
+# Classes
+
+class ManagedBrowser:
+    """ Browser replaced by new driver when it is recycled (attributes
+    and methods of current driver are available as attributes of object,
+    so it is used as Chrome) """
+
+    def __init__(self, create: Callable) -> None:
+        self.create = create
+        self.driver = create()
+        self.pages = 0
+        self.checked = 0
+        self.recycles = 0
+        self.store = None
+        self.memory = {}
+
+    def __getattr__(self, name: str):
+        return getattr(self.driver, name)
+
+    def get(self, url: str) -> None:
+        self.driver.get(url)
+        self.pages += 1
+
+
+# Functions
+
+def open_browser() -> ManagedBrowser:
+    """ Function for launching browser with lifecycle manager
+    (options are created again for every driver) """
+
+    return ManagedBrowser(
+                lambda: initialize_browser(create_chrome_options()))
+
+
+def get_process_tree(pid: int) -> list:
+    """ Function for getting process and all its descendants
+    (from /proc, empty list if process is absent) """
+
+    children = {}
+    for name in os.listdir('/proc'):
+        if not name.isdigit():
+            continue
+        try:
+            with open(f'/proc/{name}/stat', encoding='utf-8') as f:
+                stat = f.read()
+        except OSError:
+            continue
+        # name of command in brackets can contain spaces
+        ppid = int(stat.rsplit(')', 1)[1].split()[1])
+        children.setdefault(ppid, []).append(int(name))
+
+    if not os.path.exists(f'/proc/{pid}'):
+        return []
+
+    tree = [pid]
+    for parent in tree:
+        tree.extend(children.get(parent, []))
+    return tree
+
+
+def get_rss_mb(pids: list) -> float:
+    """ Function for getting resident memory of processes in MB """
+
+    pages = 0
+    for pid in pids:
+        try:
+            with open(f'/proc/{pid}/statm', encoding='utf-8') as f:
+                pages += int(f.read().split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+    return pages * PAGE_SIZE / 1024 / 1024
+
+
+def get_driver_pid(browser: ManagedBrowser) -> int:
+    """ Function for getting pid of chromedriver (None if unknown) """
+
+    try:
+        return browser.driver.service.process.pid
+    except AttributeError:
+        return None
+
+
+def get_browser_rss_mb(browser: ManagedBrowser) -> float:
+    """ Function for getting memory of chromedriver and Chrome processes """
+
+    pid = get_driver_pid(browser)
+    if pid is None:
+        return 0.0
+    return get_rss_mb(get_process_tree(pid))
+
+
+def record_memory(browser: ManagedBrowser, stage: str) -> float:
+    """ Function for recording memory of browser and of parser
+    at stage of parsing, memory of browser is returned """
+
+    browser_mb = get_browser_rss_mb(browser)
+    parser_mb = get_rss_mb([os.getpid()])
+
+    stats = browser.memory.setdefault(stage, {'samples': 0,
+                                              'browser_max_mb': 0.0,
+                                              'parser_max_mb': 0.0})
+    stats['samples'] += 1
+    stats['browser_max_mb'] = max(stats['browser_max_mb'], browser_mb)
+    stats['parser_max_mb'] = max(stats['parser_max_mb'], parser_mb)
+    stats['browser_last_mb'] = browser_mb
+    stats['parser_last_mb'] = parser_mb
+    return browser_mb
+
+
+def get_start_time(pid: int) -> int:
+    """ Function for getting start time of process in clock ticks
+    since boot (None if process is absent), pid of finished process
+    can be reused by new process with other start time """
+
+    try:
+        with open(f'/proc/{pid}/stat', encoding='utf-8') as f:
+            stat = f.read()
+    except OSError:
+        return None
+    return int(stat.rsplit(')', 1)[1].split()[19])
+
+
+def quit_driver(driver: Chrome) -> None:
+    """ Function for closing driver, processes of browser left
+    after closing (or after failed closing) are killed (only processes
+    existing before closing, not new processes with the same pid) """
+
+    try:
+        pid = driver.service.process.pid
+    except AttributeError:
+        pid = None
+    tree = get_process_tree(pid) if pid is not None else []
+    started = {pid: get_start_time(pid) for pid in tree}
+
+    try:
+        driver.quit()
+    except Exception:
+        getLogger(__name__).exception('Closing of browser failed!')
+
+    for pid, start in started.items():
+        if start is None or get_start_time(pid) != start:
+            continue
+        try:
+            os.kill(pid, signal.SIGKILL)
+        except OSError:
+            continue
+
+
+def recycle_browser(browser: ManagedBrowser) -> None:
+    """ Function for replacing driver by new one
+    (location of store specified in old driver is restored) """
+
+    quit_driver(browser.driver)
+    browser.driver = browser.create()
+    browser.pages = 0
+    browser.checked = 0
+    browser.recycles += 1
+
+    # new browser gets location of store and confirmed cookies,
+    # as browser of store in parse_prods
+    if browser.store is not None:
+        get_link(browser, config.base_url)
+        specify_address(browser, browser.store)
+        confirm_cookies(browser)
+
+
+def maintain_browser(browser: Chrome, stage: str) -> None:
+    """ Function for recycling browser if limits of pages or memory
+    are reached (called only between pages, when state of opened page
+    is not needed), memory is measured every RSS_CHECK_PAGES pages """
+
+    if not isinstance(browser, ManagedBrowser):
+        return
+
+    max_pages = config.browser_max_pages
+    max_rss_mb = config.browser_max_rss_mb
+    reason = None
+
+    if max_pages and browser.pages >= max_pages:
+        reason = f'{browser.pages} pages'
+    elif not browser.memory.get(stage) or \
+            browser.pages - browser.checked >= RSS_CHECK_PAGES:
+        browser.checked = browser.pages
+        rss_mb = record_memory(browser, stage)
+        if max_rss_mb and rss_mb > max_rss_mb:
+            reason = f'{rss_mb:.0f} MB'
+
+    if reason is not None:
+        getLogger(__name__).info(f'Browser is recycled after {reason} '
+                                 f'(stage "{stage}").')
+        recycle_browser(browser)
+
+
+def count_page(browser: Chrome) -> None:
+    """ Function for counting page loaded without method get
+    (for example, in tab by script) """
+
+    if isinstance(browser, ManagedBrowser):
+        browser.pages += 1
+
+
+def close_browser(browser: Chrome) -> None:
+    """ Function for closing browser and killing its processes """
+
+    if isinstance(browser, ManagedBrowser):
+        quit_driver(browser.driver)
+    else:
+        quit_driver(browser)
+
+
+def describe_memory(browser: Chrome) -> str:
+    """ Function for describing memory by stages for log """
+
+    if not isinstance(browser, ManagedBrowser):
+        return ''
+
+    stages = '; '.join(
+        '{}: browser max {:.0f} MB, last {:.0f} MB, parser max {:.0f} MB, '
+        'last {:.0f} MB'.format(stage, stats['browser_max_mb'],
+                                stats['browser_last_mb'],
+                                stats['parser_max_mb'],
+                                stats['parser_last_mb'])
+        for stage, stats in browser.memory.items())
+    return (f'Browser: {browser.recycles} recycles, {browser.pages} pages '
+            f'of current driver. Memory: {stages}.')
@@ -0,0 +1,135 @@
+"""
+Module allows to write products to columnar Parquet file
+with typed columns (pyarrow is required)
+"""
+
+from datetime import datetime
+import json
+import os
+from typing import Any, Iterable
+
+from exceptions import ParquetUnavailable, WriteProductsToParquetFailed
+from settings import config
+
+
+# Constants
+
+INT_FIELDS = ['chain_id', 'sku_status', 'in_stock', 'sku_packed']
+
+FLOAT_FIELDS = ['price', 'price_promo', 'price_card', 'price_card_promo',
+                'sku_weight_min', 'sku_weight_max', 'sku_volume_min',
+                'sku_volume_max', 'sku_quantity_min', 'sku_quantity_max',
+                'sku_fat_min', 'sku_fat_max', 'sku_alcohol_min',
+                'sku_alcohol_max']
+
+DATETIME_FIELDS = ['price_datetime']
+
+JSON_FIELDS = ['sku_parameters_json']
+
+
+# Functions
+
+def create_schema(fields: list):
+    """ Function for creating Arrow schema for fields of CSV-file
+    (all columns are nullable) """
+
+    import pyarrow as pa
+
+    columns = []
+    for field in fields:
+        if field in INT_FIELDS:
+            columns.append(pa.field(field, pa.int64()))
+        elif field in FLOAT_FIELDS:
+            columns.append(pa.field(field, pa.float64()))
+        elif field in DATETIME_FIELDS:
+            columns.append(pa.field(field, pa.timestamp('s')))
+        elif field in JSON_FIELDS:
+            columns.append(pa.field(field, pa.string(),
+                                    metadata={'format': 'json'}))
+        else:
+            columns.append(pa.field(field, pa.string()))
+
+    return pa.schema(columns)
+
+
+def convert_value(field: str, value: Any) -> Any:
+    """ Function for converting value of product to type of column
+    (empty values are None) """
+
+    if value is None or value == '':
+        return None
+
+    if field in INT_FIELDS:
+        return int(value)
+    if field in FLOAT_FIELDS:
+        return float(value)
+    if field in DATETIME_FIELDS:
+        if isinstance(value, datetime):
+            return value
+        return datetime.strptime(value, '%Y-%m-%d %H:%M:%S')
+    if field in JSON_FIELDS:
+        if isinstance(value, str):
+            return value
+        return json.dumps(value, ensure_ascii=False)
+
+    return str(value)
+
+
+def check_parquet() -> None:
+    """ Function for checking on start of parser that .parquet file
+    can be written (pyarrow is installed, codec of parquet_compression
+    is supported), otherwise error is raised before scraping """
+
+    if not config.parquet_enable:
+        return
+
+    compression = config.parquet_compression
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet  # noqa: F401
+
+        if compression != 'none' and not pa.Codec.is_available(compression):
+            raise ValueError(f'codec "{compression}" is not available')
+
+    except Exception as e:
+        raise ParquetUnavailable(compression) from e
+
+
+def write_products_parquet(dir: str, name: str, products: Iterable[dict],
+                           fields: list) -> None:
+    """ Function to write products to .parquet file by row groups
+    (products may be generator, only 1 row group is kept in memory) """
+
+    prod = None
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        if not os.path.exists(dir):
+            os.mkdir(dir)
+
+        schema = create_schema(fields)
+        size = config.parquet_row_group_size
+        compression = config.parquet_compression
+
+        with pq.ParquetWriter(f'{dir}/{name}', schema,
+                              compression=compression) as writer:
+            columns = {field: [] for field in fields}
+            rows = 0
+
+            for prod in products:
+                for field in fields:
+                    columns[field].append(convert_value(field,
+                                                        prod.get(field)))
+                rows += 1
+
+                if rows == size:
+                    writer.write_table(pa.table(columns, schema=schema))
+                    columns = {field: [] for field in fields}
+                    rows = 0
+
+            if rows:
+                writer.write_table(pa.table(columns, schema=schema))
+
+    except Exception as e:
+        raise WriteProductsToParquetFailed(dir, name, prod) from e
@@ -0,0 +1,114 @@
+"""
+Module with functions for writing CSV-file directly to archive
+(rows are compressed while they are written, without copies of file)
+"""
+
+from concurrent.futures import Executor, Future
+from contextlib import contextmanager
+from importlib import import_module
+import io
+import os
+import time
+from typing import Iterator, TextIO
+import zipfile
+
+from exceptions import ArchiveCodecUnavailable, CreateZIPArchiveFailed
+from settings import config
+
+
+# Constants
+
+ARCHIVE_EXTENSIONS = {'deflate': '.zip', 'zstd': '.csv.zst', 'none': '.csv'}
+
+
+# Classes
+
+class InlineExecutor(Executor):
+    """ Executor running tasks in current process (without workers) """
+
+    def submit(self, fn, *args, **kwargs) -> Future:
+        future = Future()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+
+# Functions
+
+def get_archive_name(csv_name: str) -> str:
+    """ Function for getting name of archive for CSV-file
+    by codec from config """
+
+    codec = config.archive_codec
+    return csv_name.replace('.csv', ARCHIVE_EXTENSIONS[codec])
+
+
+def check_archive_codec() -> None:
+    """ Function for checking on start of parser that archives can be
+    written by archive_codec (library zstandard is imported only when
+    first archive is written), otherwise error is raised before scraping """
+
+    codec = config.archive_codec
+    try:
+        if codec == 'zstd':
+            import_module('zstandard')
+
+    except Exception as e:
+        raise ArchiveCodecUnavailable(codec) from e
+
+
+@contextmanager
+def open_archive_stream(dir: str, csv_name: str,
+                        stats: dict) -> Iterator[TextIO]:
+    """ Function for opening text stream writing CSV-file to archive
+    (codec - deflate, zstd or none), after closing of stream
+    stats contains path of archive, sizes and time of writing """
+
+    codec = config.archive_codec
+    level = config.archive_level
+    path = f'{dir}/{get_archive_name(csv_name)}'
+    start = time.monotonic()
+
+    try:
+        if not os.path.exists(dir):
+            os.mkdir(dir)
+
+        if codec == 'deflate':
+            with zipfile.ZipFile(path, mode='w',
+                                 compression=zipfile.ZIP_DEFLATED,
+                                 compresslevel=level) as zf:
+                with zf.open(csv_name, 'w', force_zip64=True) as entry:
+                    with io.TextIOWrapper(entry, encoding='utf-8',
+                                          newline='') as stream:
+                        yield stream
+                raw_bytes = zf.getinfo(csv_name).file_size
+
+        elif codec == 'zstd':
+            import zstandard
+
+            compressor = zstandard.ZstdCompressor(level=level)
+            with open(path, 'wb') as f:
+                with compressor.stream_writer(f, closefd=False) as writer:
+                    with io.TextIOWrapper(writer, encoding='utf-8',
+                                          newline='') as stream:
+                        yield stream
+                        stream.flush()
+                        raw_bytes = compressor.frame_progression()[0]
+
+        elif codec == 'none':
+            with open(path, 'w', newline='', encoding='utf-8') as stream:
+                yield stream
+            raw_bytes = os.path.getsize(path)
+
+        else:
+            assert False, f'Unknown codec: {codec}'
+
+    except Exception as e:
+        raise CreateZIPArchiveFailed(path, csv_name) from e
+
+    stats['path'] = path
+    stats['raw_bytes'] = raw_bytes
+    stats['archive_bytes'] = os.path.getsize(path)
+    stats['seconds'] = round(time.monotonic() - start, 3)
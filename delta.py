@@ -0,0 +1,157 @@
+"""
+Module with delta output: products are compared with snapshot
+of previous run of store (8-byte hash per SKU), only new, changed
+and removed products are written
+"""
+
+from datetime import datetime
+from hashlib import blake2b
+import os
+
+from exceptions import SaveSnapshotFailed
+from locks import lock_file
+from settings import config
+
+
+# Constants
+
+# Fields not compared between runs
+VOLATILE_FIELDS = ['price_datetime', 'change_type']
+
+CHANGE_NEW = 'new'
+CHANGE_CHANGED = 'changed'
+CHANGE_UNCHANGED = 'unchanged'
+CHANGE_REMOVED = 'removed'
+
+
+# Functions
+
+def get_snapshot_path(tt: str) -> str:
+    """ Function for getting path of snapshot of store """
+
+    name = tt.replace('/', '_')
+    return f'{config.delta_dir}/{name}.snapshot'
+
+
+def load_snapshot(tt: str) -> tuple:
+    """ Function for loading hashes of products of previous run
+    (keys - source_sku_code) and number of runs since full output """
+
+    path = get_snapshot_path(tt)
+    hashes = {}
+    runs = 0
+    if not os.path.exists(path):
+        return hashes, runs
+
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            if line.startswith('#runs='):
+                runs = int(line[6:])
+                continue
+            sku, value = line.rstrip('\n').rsplit(';', 1)
+            hashes[sku] = int(value, 16)
+
+    return hashes, runs
+
+
+def save_snapshot(tt: str, hashes: dict, runs: int,
+                  merge: bool = False) -> None:
+    """ Function for saving hashes of products of current run (merge -
+    hashes are added to saved snapshot, which can be updated meanwhile
+    by other shards; snapshot is locked while it is updated) """
+
+    path = get_snapshot_path(tt)
+    try:
+        with lock_file(path):
+            if merge:
+                saved, _ = load_snapshot(tt)
+                saved.update(hashes)
+                hashes = saved
+
+            with open(f'{path}.tmp', 'w', encoding='utf-8') as f:
+                f.write(f'#runs={runs}\n')
+                for sku, value in hashes.items():
+                    f.write(f'{sku};{value:016x}\n')
+            os.replace(f'{path}.tmp', path)
+
+    except Exception as e:
+        raise SaveSnapshotFailed(path) from e
+
+
+def get_product_hash(prod: dict, fields: list) -> int:
+    """ Function for getting 8-byte hash of product fields """
+
+    values = '\x1f'.join(str(prod.get(field, '')) for field in fields
+                         if field not in VOLATILE_FIELDS)
+    digest = blake2b(values.encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big')
+
+
+def create_delta(tt: str, partial: bool = False) -> dict:
+    """ Function for creating state of comparing products of store
+    (every delta_full_every run all products are written; partial - only
+    some categories of store are parsed, so only hashes of parsed products
+    are added to snapshot and removed products are unknown) """
+
+    previous, runs = load_snapshot(tt)
+    if partial:
+        full = not previous
+    else:
+        full = not previous or runs + 1 >= config.delta_full_every
+    current = {}
+
+    return {'tt': tt, 'previous': previous, 'current': current,
+            'runs': 0 if full else runs + 1, 'full': full,
+            'partial': partial}
+
+
+def mark_changes(delta: dict, products: dict, fields: list) -> dict:
+    """ Function for selecting new and changed products of part
+    (products are copied with field change_type) """
+
+    result = {}
+    for link, prod in products.items():
+        sku = str(prod['source_sku_code'])
+        value = get_product_hash(prod, fields)
+        delta['current'][sku] = value
+
+        previous = delta['previous'].get(sku)
+        if previous is None:
+            change = CHANGE_NEW
+        elif previous != value:
+            change = CHANGE_CHANGED
+        elif delta['full']:
+            change = CHANGE_UNCHANGED
+        else:
+            continue
+
+        result[link] = dict(prod, change_type=change)
+
+    return result
+
+
+def get_removed_products(delta: dict) -> dict:
+    """ Function for getting rows of products absent in current run """
+
+    if delta['partial']:
+        return {}
+
+    created = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    return {sku: {'source_sku_code': sku, 'tt_id': delta['tt'],
+                  'price_datetime': created, 'change_type': CHANGE_REMOVED}
+            for sku in delta['previous'] if sku not in delta['current']}
+
+
+def mark_partial(delta: dict) -> None:
+    """ Function for marking run of store as partial if some products
+    or categories failed: products absent in run are not removed,
+    their hashes of previous run are kept in snapshot """
+
+    delta['partial'] = True
+
+
+def finish_delta(delta: dict) -> None:
+    """ Function for saving snapshot of current run """
+
+    save_snapshot(delta['tt'], delta['current'], delta['runs'],
+                  delta['partial'])
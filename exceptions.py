@@ -2,13 +2,62 @@
 Module with exceptions for parsers
 """
 
-from typing import Union
+import re
+from typing import Any, Union
+
+
+# Maximum length of payload in message of exception
+MAX_PAYLOAD_LENGTH = 500
+
+
+def shorten(value: Any, limit: int = MAX_PAYLOAD_LENGTH) -> str:
+    """ Function for converting payload to string of limited length """
+
+    if isinstance(value, (list, tuple, dict, set)) and len(value) > 10:
+        items = list(value)[:10]
+        string = f'{items} ... ({len(value)} items)'
+    else:
+        string = str(value)
+
+    if len(string) > limit:
+        return f'{string[:limit]} ... ({len(string)} symbols)'
+    return string
 
 
 # For both parsers
 
 class ParserException(Exception):
-    pass
+
+    def __reduce__(self):
+        # exception is restored without calling of __init__
+        # (necessary to return it from worker process)
+        return (self.__class__.__new__, (self.__class__, *self.args),
+                self.__dict__)
+
+
+class LazyParserException(ParserException):
+    """ Exception with large payload, message is built only
+    when it is needed and payload in it is shortened """
+
+    def message(self) -> str:
+        # default message - words of name of class ("Parse products failed!")
+        words = re.findall(r'[A-Z]+(?![a-z])|[A-Z]?[a-z]+|\d+',
+                           type(self).__name__)
+        return ' '.join(words).capitalize() + '!'
+
+    def __str__(self) -> str:
+        return self.message()
+
+
+class ConfigInvalid(ParserException):
+    def __init__(self, path: str, key: str) -> None:
+        self.path = path
+        self.key = key
+        super().__init__(
+            'Reading of configuration failed!\n'
+            f'Config: {path}\n'
+            f'Key: {key}'
+        )
 
 
 class CreateLoggerFailed(ParserException):
@@ -60,15 +109,34 @@ class SpecifyAddressFailed(ParserException):
         )
 
 
+class CreateSessionFailed(ParserException):
+    def __init__(self, url: str) -> None:
+        self.url = url
+        super().__init__(
+            'Creating HTTP session from browser failed!\n'
+            f'Current url of browser: {url}'
+        )
+
+
+class OpenTabsFailed(ParserException):
+    def __init__(self, count: int) -> None:
+        self.count = count
+        super().__init__(
+            'Opening tabs in browser failed!\n'
+            f'Number of tabs: {count}'
+        )
+
+
 # For get_categories.py
 
-class ParseCategoriesFromListFailed(ParserException):
+class ParseCategoriesFromListFailed(LazyParserException):
     def __init__(self, list_categories: str) -> None:
         self.categories = list_categories
-        super().__init__(
-            'Parsing categories from list failed!\n'
-            f'List of categories: {list_categories}'
-        )
+        super().__init__()
+
+    def message(self) -> str:
+        return ('Parsing categories from list failed!\n'
+                f'List of categories: {shorten(self.categories)}')
 
 
 class GetCategoriesFromHtmlFailed(ParserException):
@@ -76,17 +144,18 @@ class GetCategoriesFromHtmlFailed(ParserException):
         super().__init__('Getting categories from HTML-page failed!')
 
 
-class WriteCategoriesToCsvFailed(ParserException):
+class WriteCategoriesToCsvFailed(LazyParserException):
     def __init__(self, dir: str, name: str, categories: dict) -> None:
         self.dir = dir
         self.name_csv = name
         self.categories = categories
-        super().__init__(
-            'Write categories to CSV-file failed!\n'
-            f'Dir: {dir}\n'
-            f'CSV-file name: {name}\n'
-            f'Categories: {categories}'
-        )
+        super().__init__()
+
+    def message(self) -> str:
+        return ('Write categories to CSV-file failed!\n'
+                f'Dir: {self.dir}\n'
+                f'CSV-file name: {self.name_csv}\n'
+                f'Categories: {len(self.categories)}')
 
 
 # For run.py
@@ -96,7 +165,7 @@ class CorrectnessStringFailed(ParserException):
         self.string = string
         super().__init__(
             'Checking correctness of string failed!\n'
-            f'String: {string}'
+            f'String: {shorten(string)}'
         )
 
 
@@ -109,15 +178,16 @@ class CorrectnessNumberFailed(ParserException):
         )
 
 
-class CheckCategoriesFailed(ParserException):
+class CheckCategoriesFailed(LazyParserException):
     def __init__(self, input_cats: list, actual_cats: list) -> None:
         self.input_cats = input_cats
         self.actual_cats = actual_cats
-        super().__init__(
-            'Checking of categories failed!\n'
-            f'Input_categories: {input_cats}\n'
-            f'Actual categories: {actual_cats}'
-        )
+        super().__init__()
+
+    def message(self) -> str:
+        return ('Checking of categories failed!\n'
+                f'Input_categories: {shorten(self.input_cats)}\n'
+                f'Actual categories: {shorten(self.actual_cats)}')
 
 
 class FillCommonInfoFailed(ParserException):
@@ -177,14 +247,33 @@ class ParseProductFromJsonFailed(ParserException):
         )
 
 
-class ParseProductsFromCategory(ParserException):
+class ParseProductsFromCategory(LazyParserException):
     def __init__(self, links: list, link: str) -> None:
         self.links = links
         self.link = link
+        super().__init__()
+
+    def message(self) -> str:
+        return ('Parsing products from category failed!\n'
+                f'Products links: {shorten(self.links)}\n'
+                f'Product link: {self.link}')
+
+
+class FillProductFromCacheFailed(ParserException):
+    def __init__(self, product_link: str) -> None:
+        self.product_link = product_link
+        super().__init__(
+            'Filling of product from static attributes cache failed!\n'
+            f'Product link: {product_link}'
+        )
+
+
+class SaveStaticCacheFailed(ParserException):
+    def __init__(self, path: str) -> None:
+        self.path = path
         super().__init__(
-            'Parsing products from category failed!\n'
-            f'Products links: {links}\n'
-            f'Product link: {link}'
+            'Saving static attributes of products failed!\n'
+            f'Path: {path}'
         )
 
 
@@ -197,29 +286,154 @@ class GetProductsLinksFromCategory(ParserException):
         )
 
 
-class WriteProductsToCsvFailed(ParserException):
+class WriteProductsToCsvFailed(LazyParserException):
     def __init__(self, dir: str, name: str, prods: dict, prod: dict) -> None:
         self.dir = dir
         self.name_csv = name
         self.products = prods
         self.product = prod
+        super().__init__()
+
+    def message(self) -> str:
+        return ('Write products to CSV-file failed!\n'
+                f'Dir: {self.dir}\n'
+                f'CSV-file name: {self.name_csv}\n'
+                f'Products: {len(self.products)}\n'
+                f'Product: {shorten(self.product)}')
+
+
+class WriteProductsToParquetFailed(LazyParserException):
+    def __init__(self, dir: str, name: str, prod: dict) -> None:
+        self.dir = dir
+        self.name_parquet = name
+        self.product = prod
+        super().__init__()
+
+    def message(self) -> str:
+        return ('Write products to Parquet-file failed!\n'
+                f'Dir: {self.dir}\n'
+                f'Parquet-file name: {self.name_parquet}\n'
+                f'Product: {shorten(self.product)}')
+
+
+class ParquetUnavailable(ParserException):
+    def __init__(self, compression: str) -> None:
+        self.compression = compression
         super().__init__(
-            'Write categories to CSV-file failed!\n'
-            f'Dir: {dir}\n'
-            f'CSV-file name: {name}\n'
-            f'Products: {prods}\n'
-            f'Product: {prod}'
+            'Parquet-file can not be written (library pyarrow is not '
+            'installed or compression is not supported)!\n'
+            f'Compression: {compression}'
+        )
+
+
+class ArchiveCodecUnavailable(ParserException):
+    def __init__(self, codec: str) -> None:
+        self.codec = codec
+        super().__init__(
+            'Archive can not be written (library of codec is not '
+            'installed)!\n'
+            f'Codec: {codec}'
+        )
+
+
+class WriteHistoryFailed(ParserException):
+    def __init__(self, rows: int) -> None:
+        self.rows = rows
+        super().__init__(
+            'Writing products to history database failed!\n'
+            f'Rows written before error: {rows}'
+        )
+
+
+class SaveSnapshotFailed(ParserException):
+    def __init__(self, path: str) -> None:
+        self.path = path
+        super().__init__(
+            'Saving snapshot of products failed!\n'
+            f'Snapshot: {path}'
+        )
+
+
+class SaveScheduleFailed(ParserException):
+    def __init__(self, path: str) -> None:
+        self.path = path
+        super().__init__(
+            'Saving schedule of categories failed!\n'
+            f'Schedule: {path}'
         )
 
 
-class ParseProductsFailed(ParserException):
-    def __init__(self, categories: list, tt: str) -> None:
+class SaveTimingsFailed(ParserException):
+    def __init__(self, path: str) -> None:
+        self.path = path
+        super().__init__(
+            'Saving timings of categories failed!\n'
+            f'Timings: {path}'
+        )
+
+
+class SavePlanFailed(ParserException):
+    def __init__(self, path: str) -> None:
+        self.path = path
+        super().__init__(
+            'Saving plan of run failed!\n'
+            f'Plan: {path}'
+        )
+
+
+class SaveImagesIndexFailed(ParserException):
+    def __init__(self, dir: str) -> None:
+        self.dir = dir
+        super().__init__(
+            'Saving index of images failed!\n'
+            f'Images: {dir}'
+        )
+
+
+class WorkQueueFailed(ParserException):
+    def __init__(self, action: str, subject: str) -> None:
+        self.action = action
+        self.subject = subject
+        super().__init__(
+            'Operation of work queue failed!\n'
+            f'Action: {action}\n'
+            f'Subject: {subject}'
+        )
+
+
+class ArchivePartsFailed(LazyParserException):
+    def __init__(self, parts: list) -> None:
+        self.parts = parts
+        super().__init__()
+
+    def message(self) -> str:
+        return ('Archiving of parts failed!\n'
+                f'Parts: {shorten(self.parts)}')
+
+
+class ParseProductsFailed(LazyParserException):
+    def __init__(self, categories: list, tt: str,
+                 category: str = None) -> None:
         self.categories = categories
         self.tt = tt
+        self.category = category
+        super().__init__()
+
+    def message(self) -> str:
+        return ('Parsing products failed!\n'
+                f'Categories: {shorten(self.categories)}\n'
+                f'Failed category: {self.category}\n'
+                f'TT: {self.tt}')
+
+
+class ErrorBudgetExceeded(ParserException):
+    def __init__(self, budget: int, product_link: str) -> None:
+        self.budget = budget
+        self.product_link = product_link
         super().__init__(
-            'Parsing products failed!\n'
-            f'Categories: {categories}\n'
-            f'TT: {tt}'
+            'Number of failed products exceeded error budget!\n'
+            f'Error budget: {budget}\n'
+            f'Last product link: {product_link}'
             )
 
 
@@ -235,13 +449,11 @@ class CreateZIPArchiveFailed(ParserException):
 
 
 class SendZIPArchiveFailed(ParserException):
-    def __init__(self, archive_name: str, csv_name: str, tt: str) -> None:
+    def __init__(self, archive_name: str, tt: str) -> None:
         self.archive_name = archive_name
-        self.csv_name = csv_name
         self.tt = tt
         super().__init__(
             'Sending archive failed!\n'
             f'Archive: {archive_name}\n'
-            f'CSV: {csv_name}\n'
             f'TT: {tt}'
             )
@@ -1,36 +1,47 @@
 """
 Module allows to get all categories from site 'https://yarcheplus.ru/'
-and write them to .csv file
+and write them to .csv file (categories of all stores are captured
+concurrently, each store in its own browser)
 """
 
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
 import csv
 from datetime import datetime
 import json
+from logging import Logger
 import os
-
-from bs4 import BeautifulSoup
-from selenium.webdriver import Chrome
+from threading import Lock, local
+from typing import TYPE_CHECKING
 
 from exceptions import (CreateLoggerFailed, ParseCategoriesFromListFailed,
                         OpenBrowserFailed, LoadPageFailed, ChromeOptionsFailed,
                         SpecifyAddressFailed, GetCategoriesFromHtmlFailed,
-                        WriteCategoriesToCsvFailed)
-from services import (create_logger, create_chrome_options, get_link,
-                      initialize_browser, specify_address)
+                        WriteCategoriesToCsvFailed, ConfigInvalid)
+from browsers import close_browser, open_browser
+from profiling import start_profiler, stage, stop_profiler
+from services import create_logger, get_link, specify_address
+from settings import config
+
+if TYPE_CHECKING:
+    from selenium.webdriver import Chrome
 
 
-# Read configuration file
+# Constants
 
-with open('config.json') as config:
-    config = json.load(config)
+CATEGORY_FIELDS = ['id', 'parent_id', 'name', 'url', 'parent_url']
 
 
 # Functions
 
-def parse_categories_from_list(cats: list, result: dict = {}) -> dict:
+def parse_categories_from_list(cats: list, result: dict = None) -> dict:
     """ Function for extracting categories from an already preprocessed
     list """
 
+    if result is None:
+        result = {}
+
     try:
         for cat in cats:
             
@@ -69,8 +80,10 @@ def parse_categories_from_list(cats: list, result: dict = {}) -> dict:
 def get_categories(browser: Chrome) -> dict:
     """ Function for getting categories from HTML-page """
 
+    from bs4 import BeautifulSoup
+
     try:
-        url = '{}/category/'.format(config['base_url'])
+        url = '{}/category/'.format(config.base_url)
         get_link(browser, url)
 
         html = browser.page_source
@@ -101,7 +114,7 @@ def write_categories_to_csv(dir: str, name: str, categories: dict) -> None:
 
         with open(f'{dir}/{name}', 'w', newline='', encoding='utf-8') as f:
             writer = csv.writer(f, delimiter=';')
-            writer.writerow(['id', 'parent_id', 'name', 'url', 'parent_url'])
+            writer.writerow(CATEGORY_FIELDS)
 
             for id, fields in categories.items():
 
@@ -111,51 +124,136 @@ def write_categories_to_csv(dir: str, name: str, categories: dict) -> None:
         raise WriteCategoriesToCsvFailed(dir, name, categories) from e
 
 
-def parse() -> None:
-    """ Main work function launching parser """
+def capture_categories(tt_ids: list, logger: Logger) -> dict:
+    """ Function for getting categories of stores concurrently
+    (categories_workers threads, each thread has own browser, because
+    location is kept in cookies of browser), keys - tt_id """
+
+    threads = local()
+    opened = []
+    lock = Lock()
+
+    def capture(tt_id: str) -> dict:
+        browser = getattr(threads, 'browser', None)
+        if browser is None:
+            browser = open_browser()
+            threads.browser = browser
+            with lock:
+                opened.append(browser)
+
+        with stage('open_store'):
+            get_link(browser, config.base_url)
+            specify_address(browser, tt_id)
+        logger.info(f'Location "{tt_id}" is specified successfully.')
 
+        with stage('get_categories'):
+            categories = get_categories(browser)
+        logger.info(f'{len(categories)} categories of "{tt_id}" are parsed '
+                    f'from HTML-page successfully.')
+        return categories
+
+    workers = max(1, min(config.categories_workers, len(tt_ids)))
     try:
-        logger = create_logger('get_categories.log', __name__)
-        logger.debug('Parser started successfully.')
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            return dict(zip(tt_ids, pool.map(capture, tt_ids)))
 
-        options = create_chrome_options()
+    finally:
+        for browser in opened:
+            close_browser(browser)
 
-        logger.debug('Browser is configured successfully.')
 
-        browser = initialize_browser(options)
+def build_category_matrix(captures: dict, tt_ids: list) -> dict:
+    """ Function for joining categories of stores: every category
+    is stored once with bitmap of stores (bit N - N-th store of tt_ids) """
 
-        logger.debug('Browser is launched successfully.')
+    matrix = {}
+    for bit, tt_id in enumerate(tt_ids):
+        for id, fields in captures[tt_id].items():
+            if id not in matrix:
+                matrix[id] = dict(fields, stores=0)
+            matrix[id]['stores'] |= 1 << bit
+    return matrix
 
-        tt_ids = config.get('tt_id', ["Москва, Вересаева 10"])
 
-        for tt_id in tt_ids:
-            get_link(browser, config['base_url'])
+def get_category_stores(stores: int, tt_ids: list) -> list:
+    """ Function for decoding bitmap of stores of category """
 
-            logger.info('Page "{}" is loaded successfully.'.format(
-                                                        config['base_url'])
-                        )
+    return [tt_id for bit, tt_id in enumerate(tt_ids) if stores >> bit & 1]
 
-            specify_address(browser, tt_id)
 
-            logger.info(f'Location "{tt_id}" is specified successfully.')
+def write_category_matrix(dir: str, name: str, matrix: dict,
+                          tt_ids: list) -> None:
+    """ Function to write categories of all stores to .csv file (column
+    stores - hexadecimal bitmap) and stores of bits to second file """
 
-            categories = get_categories(browser)
+    try:
+        if not os.path.exists(dir):
+            os.mkdir(dir)
+
+        with open(f'{dir}/{name}', 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f, delimiter=';')
+            writer.writerow(CATEGORY_FIELDS + ['stores'])
+
+            for id, fields in matrix.items():
+                writer.writerow([id] + [fields[field] for field
+                                        in CATEGORY_FIELDS[1:]] +
+                                [format(fields['stores'], 'x')])
+
+        name_stores = name.replace('categories', 'stores', 1)
+        with open(f'{dir}/{name_stores}', 'w', newline='',
+                  encoding='utf-8') as f:
+            writer = csv.writer(f, delimiter=';')
+            writer.writerow(['bit', 'tt_id'])
+            writer.writerows(enumerate(tt_ids))
+
+    except Exception as e:
+        raise WriteCategoriesToCsvFailed(dir, name, matrix) from e
+
+
+def parse() -> None:
+    """ Main work function launching parser """
 
-            logger.info("Categories are parsed from HTML-page successfully.")
+    try:
+        logger = create_logger('get_categories.log', __name__)
+        logger.debug('Parser started successfully.')
+
+        # stages are profiled only with profile_mode
+        start_profiler()
+
+        tt_ids = config.tt_id
+        captures = capture_categories(tt_ids, logger)
+
+        dir = config.output_directory
+        datetime_creation = datetime.now()
+        datetime_creation = datetime_creation.strftime(
+                                        '%Y-%m-%d %H:%M:%S'
+                                        )
 
-            dir = config.get('output_directory', 'out')
-            datetime_creation = datetime.now()
-            datetime_creation = datetime_creation.strftime(
-                                            '%Y-%m-%d %H:%M:%S'
-                                            )
-            name_csv = f'categories ({tt_id}) - {datetime_creation}.csv'
-            write_categories_to_csv(dir, name_csv, categories)
+        if config.categories_export == 'matrix':
+            matrix = build_category_matrix(captures, tt_ids)
+            name_csv = f'categories - {datetime_creation}.csv'
+            with stage('write_categories'):
+                write_category_matrix(dir, name_csv, matrix, tt_ids)
 
-            logger.info(f'All parsed categories are writed to "{name_csv}".')
-            logger.debug('Parser finished to work.')
+            logger.info(f'{len(matrix)} categories of {len(tt_ids)} '
+                        f'stores are writed to "{name_csv}".')
+
+        else:
+            for tt_id in tt_ids:
+                name_csv = f'categories ({tt_id}) - {datetime_creation}.csv'
+                write_categories_to_csv(dir, name_csv, captures[tt_id])
+
+                logger.info(f'All parsed categories are writed to '
+                            f'"{name_csv}".')
+
+        logger.debug('Parser finished to work.')
+
+    except ConfigInvalid as e:
+        print(e)
+        raise
 
-    except CreateLoggerFailed:
-        logger.exception('Creation of logger failed!')
+    except CreateLoggerFailed as e:
+        print(e)
         raise
 
     except ChromeOptionsFailed:
@@ -189,8 +287,10 @@ def parse() -> None:
     except Exception as e:
         assert False, f'Unknown error: {e}'
 
-    else:
-        browser.quit()
+    finally:
+        profile_dir = stop_profiler()
+        if profile_dir is not None:
+            logger.info(f'Profiles of stages are writed to "{profile_dir}".')
 
 
 if __name__ == '__main__':
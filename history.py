@@ -0,0 +1,184 @@
+"""
+Module with SQLite history of prices: records of every run are saved
+by batches and can be queried (latest prices, changes of prices)
+"""
+
+import os
+import sqlite3
+from typing import Iterable, Optional
+
+from exceptions import WriteHistoryFailed
+from settings import config
+
+
+# Constants
+
+HISTORY_FIELDS = ['source_sku_code', 'tt_id', 'price_datetime', 'price',
+                  'price_promo', 'price_card', 'price_card_promo',
+                  'sku_status', 'in_stock']
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS prices (
+    source_sku_code TEXT NOT NULL,
+    tt_id TEXT NOT NULL,
+    price_datetime TEXT NOT NULL,
+    price REAL,
+    price_promo REAL,
+    price_card REAL,
+    price_card_promo REAL,
+    sku_status INTEGER,
+    in_stock INTEGER,
+    PRIMARY KEY (source_sku_code, tt_id, price_datetime)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS prices_datetime
+    ON prices (price_datetime, tt_id);
+CREATE INDEX IF NOT EXISTS prices_store
+    ON prices (tt_id, price_datetime);
+CREATE TABLE IF NOT EXISTS latest_prices (
+    tt_id TEXT NOT NULL,
+    source_sku_code TEXT NOT NULL,
+    price_datetime TEXT NOT NULL,
+    price REAL,
+    price_promo REAL,
+    price_card REAL,
+    price_card_promo REAL,
+    sku_status INTEGER,
+    in_stock INTEGER,
+    PRIMARY KEY (tt_id, source_sku_code)
+) WITHOUT ROWID;
+'''
+
+# Latest record of SKU in store is kept in separate table
+UPDATE_LATEST = '''
+INSERT INTO latest_prices
+SELECT tt_id, source_sku_code, price_datetime, price, price_promo,
+       price_card, price_card_promo, sku_status, in_stock
+FROM prices WHERE price_datetime = ? AND tt_id = ? AND source_sku_code = ?
+ON CONFLICT (tt_id, source_sku_code) DO UPDATE SET
+    price_datetime = excluded.price_datetime, price = excluded.price,
+    price_promo = excluded.price_promo, price_card = excluded.price_card,
+    price_card_promo = excluded.price_card_promo,
+    sku_status = excluded.sku_status, in_stock = excluded.in_stock
+WHERE excluded.price_datetime >= latest_prices.price_datetime
+'''
+
+
+# Functions
+
+def open_history(path: str) -> sqlite3.Connection:
+    """ Function for opening database of history (WAL mode) """
+
+    dir = os.path.dirname(path)
+    if dir and not os.path.exists(dir):
+        os.makedirs(dir)
+
+    conn = sqlite3.connect(path)
+    conn.row_factory = sqlite3.Row
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def history_row(prod: dict) -> tuple:
+    """ Function for converting product to row of table prices """
+
+    values = [prod.get(field) if prod.get(field, '') != '' else None
+              for field in HISTORY_FIELDS]
+    values[0] = str(values[0])
+    return tuple(values)
+
+
+def write_batch(conn: sqlite3.Connection, query: str, batch: list) -> None:
+    """ Function for writing batch of rows and updating latest prices
+    in 1 transaction """
+
+    with conn:
+        conn.executemany(query, batch)
+        conn.executemany(UPDATE_LATEST,
+                         [(row[2], row[1], row[0]) for row in batch])
+
+
+def write_history(conn: sqlite3.Connection, products: Iterable[dict]) -> int:
+    """ Function for writing products to history by batches
+    (1 transaction per batch), number of rows is returned """
+
+    size = config.history_batch_size
+    placeholders = ', '.join('?' * len(HISTORY_FIELDS))
+    query = (f'INSERT OR REPLACE INTO prices '
+             f'({", ".join(HISTORY_FIELDS)}) '
+             f'VALUES ({placeholders})')
+
+    rows = 0
+    batch = []
+    try:
+        for prod in products:
+            batch.append(history_row(prod))
+            if len(batch) == size:
+                write_batch(conn, query, batch)
+                rows += len(batch)
+                batch = []
+
+        if batch:
+            write_batch(conn, query, batch)
+            rows += len(batch)
+
+        return rows
+
+    except Exception as e:
+        raise WriteHistoryFailed(rows) from e
+
+
+def get_latest_price(conn: sqlite3.Connection, sku: str,
+                     tt: str) -> Optional[dict]:
+    """ Function for getting latest record of SKU in store """
+
+    row = conn.execute(
+        'SELECT * FROM prices WHERE source_sku_code = ? AND tt_id = ? '
+        'ORDER BY price_datetime DESC LIMIT 1', (str(sku), tt)).fetchone()
+    return dict(row) if row else None
+
+
+def get_latest_prices(conn: sqlite3.Connection, tt: str = None) -> list:
+    """ Function for getting latest record of every SKU
+    (of 1 store or of all stores) """
+
+    if tt is None:
+        rows = conn.execute('SELECT * FROM latest_prices')
+    else:
+        rows = conn.execute('SELECT * FROM latest_prices WHERE tt_id = ?',
+                            (tt,))
+    return [dict(row) for row in rows]
+
+
+def get_price_changes(conn: sqlite3.Connection, since: str,
+                      tt: str = None) -> list:
+    """ Function for getting records since datetime ('%Y-%m-%d %H:%M:%S')
+    with prices different from previous record of SKU in store
+    (records of new SKUs have previous prices None) """
+
+    query = '''
+        SELECT * FROM (
+            SELECT cur.source_sku_code, cur.tt_id, cur.price_datetime,
+                   cur.price, cur.price_promo,
+                   prev.price AS previous_price,
+                   prev.price_promo AS previous_price_promo
+            FROM prices AS cur
+            LEFT JOIN prices AS prev
+              ON prev.source_sku_code = cur.source_sku_code
+             AND prev.tt_id = cur.tt_id
+             AND prev.price_datetime = (
+                    SELECT MAX(p.price_datetime) FROM prices AS p
+                    WHERE p.source_sku_code = cur.source_sku_code
+                      AND p.tt_id = cur.tt_id
+                      AND p.price_datetime < cur.price_datetime)
+            WHERE cur.price_datetime >= ? {}
+        )
+        WHERE previous_price IS NOT price
+           OR previous_price_promo IS NOT price_promo
+        ORDER BY price_datetime
+    '''
+    if tt is not None:
+        return [dict(row) for row in conn.execute(
+                    query.format('AND cur.tt_id = ?'), (since, tt))]
+    return [dict(row) for row in conn.execute(query.format(''), (since,))]
@@ -0,0 +1,193 @@
+"""
+Module with harvesting of images of products: images are downloaded
+concurrently to content-addressed store (name of file - SHA-256 of
+content), unchanged images are skipped by conditional requests
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from hashlib import sha256
+import json
+from logging import getLogger
+import os
+from threading import get_ident, Lock
+from typing import Optional
+from urllib.parse import urljoin
+
+from exceptions import SaveImagesIndexFailed
+from settings import config
+
+
+# Constants
+
+INDEX_NAME = 'index.json'
+
+# State of harvesting of process (None - harvesting is not started)
+_harvest = None
+_harvest_lock = Lock()
+
+EXTENSIONS = {'image/jpeg': '.jpg', 'image/png': '.png',
+              'image/webp': '.webp', 'image/gif': '.gif'}
+
+
+# Functions
+
+def create_harvest() -> dict:
+    """ Function for creating state of harvesting (index - keys, ETag and
+    Last-Modified of downloaded URLs, checked - URLs checked in this run) """
+
+    import requests
+
+    dir = config.images_dir
+    index = {}
+    if os.path.exists(f'{dir}/{INDEX_NAME}'):
+        with open(f'{dir}/{INDEX_NAME}', encoding='utf-8') as f:
+            index = json.load(f)
+
+    workers = config.images_workers
+    session = requests.Session()
+    session.headers.update(config.headers)
+    adapter = requests.adapters.HTTPAdapter(pool_maxsize=workers)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+
+    return {'index': index, 'checked': set(), 'lock': Lock(),
+            'session': session, 'stats': {'requests': 0, 'not_modified': 0,
+                                          'downloaded': 0, 'bytes': 0,
+                                          'errors': 0}}
+
+
+def get_harvest() -> Optional[dict]:
+    """ Function for getting state of harvesting from config (state
+    is created once per process, so images shared by stores are
+    requested once) """
+
+    global _harvest
+    if not config.images_enable:
+        return None
+    with _harvest_lock:
+        if _harvest is None:
+            _harvest = create_harvest()
+    return _harvest
+
+
+def get_image_url(src: str) -> str:
+    """ Function for getting absolute URL of image """
+
+    return urljoin(config.base_url + '/', src)
+
+
+def save_image(content: bytes, content_type: str) -> str:
+    """ Function for saving image to store, key of image
+    (path relative to images_dir) is returned """
+
+    digest = sha256(content).hexdigest()
+    extension = EXTENSIONS.get(content_type.split(';')[0].strip(), '')
+    key = f'{digest[:2]}/{digest}{extension}'
+
+    path = f'{config.images_dir}/{key}'
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # equal image can be saved by other thread or process at once
+        temp = f'{path}.{os.getpid()}-{get_ident()}.tmp'
+        with open(temp, 'wb') as f:
+            f.write(content)
+        os.replace(temp, path)
+
+    return key
+
+
+def fetch_image(harvest: dict, url: str) -> Optional[str]:
+    """ Function for downloading 1 image (conditional request if image
+    was downloaded before), key of image is returned """
+
+    with harvest['lock']:
+        record = harvest['index'].get(url)
+    stats = harvest['stats']
+
+    headers = {}
+    if record is not None:
+        if record.get('etag'):
+            headers['If-None-Match'] = record['etag']
+        if record.get('modified'):
+            headers['If-Modified-Since'] = record['modified']
+
+    try:
+        response = harvest['session'].get(url, headers=headers, timeout=30)
+        if response.status_code == 304 and record is not None:
+            with harvest['lock']:
+                stats['requests'] += 1
+                stats['not_modified'] += 1
+            return record['key']
+
+        response.raise_for_status()
+        key = save_image(response.content,
+                         response.headers.get('Content-Type', ''))
+
+    except Exception:
+        getLogger(__name__).exception(f'Image "{url}" is not downloaded!')
+        with harvest['lock']:
+            stats['requests'] += 1
+            stats['errors'] += 1
+        return record['key'] if record is not None else None
+
+    with harvest['lock']:
+        stats['requests'] += 1
+        stats['downloaded'] += 1
+        stats['bytes'] += len(response.content)
+        harvest['index'][url] = {'key': key,
+                                 'etag': response.headers.get('ETag'),
+                                 'modified': response.headers.get(
+                                                        'Last-Modified')}
+    return key
+
+
+def harvest_images(harvest: dict, products: dict) -> None:
+    """ Function for downloading images of products and writing keys
+    of images to field sku_images_keys (in order of sku_images), every
+    URL is requested once per run """
+
+    urls = set()
+    for prod in products.values():
+        for src in filter(None, prod.get('sku_images', '').split('|')):
+            url = get_image_url(src)
+            if url not in harvest['checked']:
+                urls.add(url)
+
+    if urls:
+        with ThreadPoolExecutor(max_workers=config.images_workers) as pool:
+            list(pool.map(lambda url: fetch_image(harvest, url), urls))
+        harvest['checked'].update(urls)
+
+    for prod in products.values():
+        keys = []
+        for src in filter(None, prod.get('sku_images', '').split('|')):
+            record = harvest['index'].get(get_image_url(src))
+            keys.append(record['key'] if record else '')
+        prod['sku_images_keys'] = '|'.join(keys)
+
+
+def save_images_index(harvest: dict) -> None:
+    """ Function for saving index of downloaded images """
+
+    dir = config.images_dir
+    try:
+        # images of other parts can be harvested at the same time
+        with harvest['lock']:
+            index = dict(harvest['index'])
+
+        if not os.path.exists(dir):
+            os.makedirs(dir)
+        with open(f'{dir}/{INDEX_NAME}.tmp', 'w', encoding='utf-8') as f:
+            json.dump(index, f, ensure_ascii=False)
+        os.replace(f'{dir}/{INDEX_NAME}.tmp', f'{dir}/{INDEX_NAME}')
+
+    except Exception as e:
+        raise SaveImagesIndexFailed(dir) from e
+
+
+def describe_harvest(harvest: dict) -> str:
+    """ Function for describing statistics of harvesting for log """
+
+    return ('Images: {requests} requests, {not_modified} not modified, '
+            '{downloaded} downloaded ({bytes} bytes), '
+            '{errors} errors.'.format(**harvest['stats']))
@@ -0,0 +1,28 @@
+"""
+Module with locks of files shared by several processes of parser
+(shards of run update the same snapshots of stores and planner file)
+"""
+
+from contextlib import contextmanager
+import fcntl
+import os
+from typing import Iterator
+
+
+# Functions
+
+@contextmanager
+def lock_file(path: str) -> Iterator[None]:
+    """ Function for locking file by other processes while it is read
+    and written (lock is taken on file path.lock, waits for other lock) """
+
+    dir = os.path.dirname(path)
+    if dir and not os.path.exists(dir):
+        os.makedirs(dir, exist_ok=True)
+
+    with open(f'{path}.lock', 'a') as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
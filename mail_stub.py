@@ -0,0 +1,98 @@
+"""
+Module with local SMTP server for checking of sending archives
+without real mail server (messages are saved to directory)
+
+Usage:
+python3 mail_stub.py [port] [directory]
+
+Config for parser: "email_from": {"smtp": "127.0.0.1", "port": 1025,
+"ssl": "false", "password": "", ...}
+"""
+
+from datetime import datetime
+import os
+import socketserver
+import sys
+import uuid
+
+
+class SMTPHandler(socketserver.StreamRequestHandler):
+    """ Handler of 1 SMTP session (commands of RFC 5321 without auth) """
+
+    def reply(self, line: str) -> None:
+        self.wfile.write(f'{line}\r\n'.encode('utf-8'))
+
+    def read_data(self) -> bytes:
+        lines = []
+        while True:
+            line = self.rfile.readline()
+            if not line or line in (b'.\r\n', b'.\n'):
+                break
+            # dot-stuffing
+            if line.startswith(b'..'):
+                line = line[1:]
+            lines.append(line)
+        return b''.join(lines)
+
+    def handle(self) -> None:
+        sender, receivers = None, []
+        self.reply('220 localhost SMTP stub')
+
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode('utf-8', 'replace').strip()
+            verb = command[:4].upper()
+
+            if verb in ('HELO', 'EHLO'):
+                self.reply('250 localhost')
+            elif verb == 'MAIL':
+                sender, receivers = command[10:].strip(), []
+                self.reply('250 OK')
+            elif verb == 'RCPT':
+                receivers.append(command[8:].strip())
+                self.reply('250 OK')
+            elif verb == 'DATA':
+                self.reply('354 End data with <CR><LF>.<CR><LF>')
+                data = self.read_data()
+                self.server.save(sender, receivers, data)
+                self.reply('250 OK')
+            elif verb in ('RSET', 'NOOP'):
+                self.reply('250 OK')
+            elif verb == 'QUIT':
+                self.reply('221 Bye')
+                return
+            else:
+                self.reply('502 Command not implemented')
+
+
+class SMTPStub(socketserver.ThreadingTCPServer):
+    """ Local SMTP server saving received messages to .eml files """
+
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self, address: tuple, dir: str) -> None:
+        self.dir = dir
+        self.messages = 0
+        if not os.path.exists(dir):
+            os.makedirs(dir)
+        super().__init__(address, SMTPHandler)
+
+    def save(self, sender: str, receivers: list, data: bytes) -> None:
+        created = datetime.now().strftime('%Y-%m-%d_%H-%M-%S')
+        name = f'{self.dir}/{created}-{uuid.uuid4().hex}.eml'
+        with open(name, 'wb') as f:
+            f.write(data)
+        self.messages += 1
+        print(f'Message from {sender} to {", ".join(receivers)}: {name}')
+
+
+if __name__ == '__main__':
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 1025
+    dir = sys.argv[2] if len(sys.argv) > 2 else 'out/mail_stub'
+
+    with SMTPStub(('127.0.0.1', port), dir) as server:
+        print(f'SMTP stub is listening on 127.0.0.1:{port}')
+        server.serve_forever()
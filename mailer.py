@@ -0,0 +1,223 @@
+"""
+Module allows to send archives by mail in background thread
+(jobs are saved to disk and are retried until archive is sent)
+"""
+
+from __future__ import annotations
+
+import json
+from logging import Logger
+import os
+from queue import Empty, Queue
+from threading import Thread
+import time
+from typing import TYPE_CHECKING
+import uuid
+
+from exceptions import SendZIPArchiveFailed
+from settings import config
+
+if TYPE_CHECKING:
+    from email.mime.multipart import MIMEMultipart
+    import smtplib
+
+
+# Functions
+
+def build_message(path_archive: str, subject: str) -> MIMEMultipart:
+    """ Function for building message with archive for all receivers """
+
+    from email.mime.application import MIMEApplication
+    from email.mime.multipart import MIMEMultipart
+
+    sender = config.email_from['login']
+    receivers = config.emails_to
+
+    msg = MIMEMultipart()
+    msg['From'] = sender
+    msg['To'] = ', '.join(receivers)
+    msg['Subject'] = subject
+
+    basename = os.path.basename(path_archive)
+    with open(path_archive, 'rb') as f:
+        part = MIMEApplication(
+            f.read(),
+            Name=basename
+        )
+    part['Content-Disposition'] = f'attachment; filename="{basename}"'
+    msg.attach(part)
+
+    return msg
+
+
+def connect_smtp() -> smtplib.SMTP:
+    """ Function for connecting to SMTP server from config
+    (port and ssl can be changed for local SMTP server) """
+
+    import smtplib
+
+    email_from = config.email_from
+    port = email_from.get('port', 465)
+
+    if str(email_from.get('ssl', 'true')).lower() == 'true':
+        smtp = smtplib.SMTP_SSL(email_from['smtp'], port, timeout=60)
+    else:
+        smtp = smtplib.SMTP(email_from['smtp'], port, timeout=60)
+
+    if email_from.get('password'):
+        smtp.login(email_from['login'], email_from['password'])
+
+    return smtp
+
+
+def send_message(path_archive: str, subject: str, tt_id: str) -> None:
+    """ Function to send archive to all receivers in 1 SMTP session """
+
+    try:
+        msg = build_message(path_archive, subject)
+
+        smtp = connect_smtp()
+        try:
+            smtp.send_message(msg, config.email_from['login'],
+                              config.emails_to)
+        finally:
+            smtp.quit()
+
+    except Exception as e:
+        raise SendZIPArchiveFailed(path_archive, tt_id) from e
+
+
+def save_job(job: dict) -> None:
+    """ Function for saving job of mailer to queue directory """
+
+    path = job['file']
+    with open(f'{path}.tmp', 'w', encoding='utf-8') as f:
+        json.dump(job, f, ensure_ascii=False)
+    os.replace(f'{path}.tmp', path)
+
+
+def load_jobs(dir: str) -> list:
+    """ Function for loading jobs not sent in previous runs """
+
+    jobs = []
+    for name in sorted(os.listdir(dir)):
+        if name.endswith('.json'):
+            with open(f'{dir}/{name}', encoding='utf-8') as f:
+                job = json.load(f)
+            if not job.get('failed'):
+                jobs.append(job)
+    return jobs
+
+
+def send_job(mailer: dict, job: dict) -> None:
+    """ Function for sending archive of job (failed job waits for retry
+    time delay * attempts in list of waiting jobs, without sleeping) """
+
+    logger = mailer['logger']
+    max_retries = config.mail_max_retries
+
+    started = time.monotonic()
+    try:
+        send_message(job['path'], job['subject'], job['tt_id'])
+    except SendZIPArchiveFailed:
+        job['attempts'] += 1
+        if job['attempts'] >= max_retries:
+            job['failed'] = True
+            save_job(job)
+            logger.exception('Sending archive "{}" failed after {} '
+                             'attempts!'.format(job['path'],
+                                                job['attempts']))
+        else:
+            delay = config.mail_retry_delay_s * job['attempts']
+            job['retry_at'] = time.time() + delay
+            save_job(job)
+            mailer['waiting'].append(job)
+            logger.warning('Sending archive "{}" failed, attempt {} of '
+                           '{}, retry after {:.0f} s.'.format(
+                               job['path'], job['attempts'], max_retries,
+                               delay))
+        return
+
+    os.remove(job['file'])
+    mailer['sent'] += 1
+    logger.info('Archive "{}" with csv file is sended ({} bytes, '
+                '{:.1f} s).'.format(job['path'],
+                                    os.path.getsize(job['path']),
+                                    time.monotonic() - started))
+
+
+def process_jobs(mailer: dict) -> None:
+    """ Function of background thread sending archives from queue
+    (new archives are sent while failed ones wait for retry time) """
+
+    waiting = mailer['waiting']
+    stopping = False
+
+    while True:
+        # queue is waited until retry time of first waiting job
+        timeout = None
+        if waiting:
+            retry = min(waiting, key=lambda job: job['retry_at'])
+            timeout = max(0, retry['retry_at'] - time.time())
+        elif stopping:
+            return
+
+        try:
+            job = mailer['queue'].get(timeout=timeout)
+        except Empty:
+            waiting.remove(retry)
+            send_job(mailer, retry)
+            continue
+
+        if job is None:
+            # jobs waiting for retry are processed before stop
+            stopping = True
+        elif job.get('retry_at', 0) > time.time():
+            # job of previous run waits for its retry time
+            waiting.append(job)
+        else:
+            send_job(mailer, job)
+
+
+def start_mailer(logger: Logger) -> dict:
+    """ Function for starting background thread of mailer,
+    jobs not sent in previous runs are queued again """
+
+    dir = config.mail_queue_dir
+    if not os.path.exists(dir):
+        os.makedirs(dir)
+
+    # waiting - failed jobs waiting for retry time
+    mailer = {'dir': dir, 'queue': Queue(), 'waiting': [], 'logger': logger,
+              'sent': 0}
+    for job in load_jobs(dir):
+        logger.info('Archive "{}" from previous run is queued '
+                    'for sending.'.format(job['path']))
+        mailer['queue'].put(job)
+
+    mailer['thread'] = Thread(target=process_jobs, args=(mailer,),
+                              name='mailer', daemon=True)
+    mailer['thread'].start()
+
+    return mailer
+
+
+def enqueue_archive(mailer: dict, path_archive: str, subject: str,
+                    tt_id: str) -> None:
+    """ Function for adding archive to queue of mailer
+    (job is saved to disk before sending) """
+
+    name = '{}-{}.json'.format(time.strftime('%Y%m%d%H%M%S'),
+                               uuid.uuid4().hex)
+    job = {'file': '{}/{}'.format(mailer['dir'], name),
+           'path': os.path.abspath(path_archive), 'subject': subject,
+           'tt_id': tt_id, 'attempts': 0}
+    save_job(job)
+    mailer['queue'].put(job)
+
+
+def stop_mailer(mailer: dict) -> None:
+    """ Function for waiting until all queued archives are processed """
+
+    mailer['queue'].put(None)
+    mailer['thread'].join()
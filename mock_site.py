@@ -0,0 +1,502 @@
+"""
+Module with local stand-in of site 'https://yarcheplus.ru/' for load
+testing of parsers without real site: catalog of synthetic products
+(or recorded pages), category and product pages with __INITIAL_STATE__,
+button "Показать ещё", address selection, images of products
+(with ETag), latency and errors
+
+Usage:
+python3 mock_site.py [--port 8080] [--categories 10] [--products 100]
+                     [--latency-ms 50] [--error-rate 0.01] [--recorded DIR]
+
+Config for parser: "base_url": "http://127.0.0.1:8080"
+Statistics of requests: http://127.0.0.1:8080/__stats
+"""
+
+import argparse
+from hashlib import sha1
+from http.cookies import SimpleCookie
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import os
+import random
+from threading import Lock
+import time
+from urllib.parse import parse_qs, unquote, urlsplit
+
+
+# Constants
+
+ADDRESS_COOKIE = 'mock_address'
+
+BRANDS = ['Ярче', 'Простоквашино', 'Агуша', 'Махеевъ', 'Heinz', 'Lays']
+
+COUNTRIES = ['Россия', 'Беларусь', 'Казахстан', 'Италия']
+
+PAGE = '''<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>{title}</title></head>
+<body>
+<button class="aJ8u8iEK8" onclick="this.remove()">Принять cookies</button>
+<button class="a31qlM9dd c2D0-ojBi"
+        onclick="document.getElementById('address').style.display='block'">
+  {address}
+</button>
+<div id="address" style="display: none">
+  <input id="receivedAddress" type="text" autocomplete="off">
+  <button onclick="confirmAddress()"><span>Подтвердить</span></button>
+</div>
+{body}
+<script charset="UTF-8">window.__INITIAL_STATE__={state};</script>
+<script>
+function confirmAddress() {{
+  var value = document.getElementById('receivedAddress').value;
+  document.cookie = '{cookie}=' + encodeURIComponent(value) + '; path=/';
+  location.reload();
+}}
+</script>
+</body></html>
+'''
+
+SHOW_MORE = '''
+<span id="more" data-page="2" onclick="showMore(this)">Показать ещё</span>
+<script>
+function showMore(button) {{
+  var page = parseInt(button.dataset.page);
+  var query = location.search ? location.search + '&' : '?';
+  fetch(location.pathname + query + '{param}=' + page + '&fragment=1')
+    .then(function (response) {{ return response.text(); }})
+    .then(function (html) {{
+      document.getElementById('cards').insertAdjacentHTML('beforeend', html);
+      button.dataset.page = page + 1;
+      if (page >= {pages}) {{ button.remove(); }}
+    }});
+}}
+</script>
+'''
+
+CARD = '''<div class="c3s8K6a5X">
+  <a class="g2mGXj5-x" href="/product/{code}-{id}">{name}</a>
+  {promo}<div class="price">{price}</div>
+</div>
+'''
+
+# Start of JPEG file (images of products of one brand are equal)
+IMAGE_HEADER = b'\xff\xd8\xff\xe0\x00\x10JFIF\x00'
+
+PROMO = '<div class="e10FT7BLs a3blieLf1 m3blieLf1">Акция</div>'
+
+
+# Classes
+
+class Catalog:
+    """ Synthetic catalog: categories and products are generated from seed,
+    prices depend on store (address) and change every epoch_s seconds
+    (products of promo categories change more often) """
+
+    def __init__(self, categories: int, products: int, page_size: int,
+                 volatility: float, epoch_s: float, seed: int) -> None:
+        self.page_size = page_size
+        self.volatility = volatility
+        self.epoch_s = epoch_s
+        self.seed = seed
+        self.categories = []
+        self.products = {}
+
+        parents = max(1, categories // 5)
+        for number in range(categories):
+            category = {'id': 1000 + number, 'code': f'kategoriya-{number}',
+                        'name': f'Категория {number}',
+                        'parent': 100 + number % parents,
+                        'promo': number % 4 == 0, 'products': []}
+            self.categories.append(category)
+
+            for index in range(products):
+                id = 10000 + number * products + index
+                category['products'].append(id)
+                self.products[id] = self.create_product(id, category)
+
+            # product of previous category is shown also in this category
+            if number:
+                category['products'].append(self.categories[number - 1]
+                                            ['products'][0])
+
+    def create_product(self, id: int, category: dict) -> dict:
+        """ Function for creating static attributes of product """
+
+        rnd = random.Random(f'{self.seed}:{id}')
+        unit = rnd.choice(['шт.', 'шт.', 'шт.', 'кг'])
+        weight = '' if unit == 'кг' else f'{rnd.randint(1, 20) * 50} г'
+        return {'id': id, 'code': f'tovar-{id}', 'name': f'Товар {id}',
+                'category': category, 'unit': unit,
+                'price': round(rnd.uniform(30, 1500), 2),
+                'brand': rnd.choice(BRANDS),
+                'country': rnd.choice(COUNTRIES),
+                'weight': weight}
+
+    def get_image(self, id: int) -> bytes:
+        """ Function for getting content of image of product """
+
+        product = self.products[id]
+        return IMAGE_HEADER + product['brand'].encode('utf-8') * 512
+
+    def get_category(self, code: str) -> dict:
+        """ Function for finding category by code and id from URL """
+
+        for category in self.categories:
+            if f"{category['code']}-{category['id']}" == code:
+                return category
+        return None
+
+    def get_offer(self, product: dict, address: str) -> dict:
+        """ Function for getting price and stock of product in store
+        at current epoch """
+
+        volatility = self.volatility
+        if not product['category']['promo']:
+            volatility /= 10
+
+        epoch = int(time.time() // self.epoch_s) if self.epoch_s else 0
+        change = 0
+        for number in range(epoch, -1, -1):
+            rnd = random.Random(f"{self.seed}:{product['id']}:{number}")
+            if rnd.random() < volatility:
+                change = number
+                break
+            # last change is searched only within recent epochs
+            if epoch - number > 50:
+                break
+
+        rnd = random.Random(f"{self.seed}:{product['id']}:{address}:{change}")
+        price = round(product['price'] * rnd.uniform(0.9, 1.1), 2)
+        promo = product['category']['promo'] and rnd.random() < 0.5
+        return {'price': round(price * 0.8, 2) if promo else price,
+                'previousPrice': price if promo else None,
+                'isAvailable': rnd.random() > 0.05}
+
+    def get_card(self, id: int, address: str) -> dict:
+        """ Function for getting product card of category page state """
+
+        product = self.products[id]
+        card = {'id': id, 'code': product['code'], 'name': product['name']}
+        card.update(self.get_offer(product, address))
+        return card
+
+    def get_product_data(self, id: int, address: str) -> dict:
+        """ Function for getting product data of product page state """
+
+        product = self.products[id]
+        category = product['category']
+        properties = [
+            {'__typename': 'ItemOfListPropertyValue',
+             'property': {'name': 'brand', 'title': 'Бренд'},
+             'item': {'label': product['brand']}},
+            {'__typename': 'ItemOfListPropertyValue',
+             'property': {'name': 'country_of_manufacture',
+                          'title': 'Страна производства'},
+             'item': {'label': product['country']}},
+            {'__typename': 'ListPropertyValue',
+             'property': {'name': 'composition', 'title': 'Состав'},
+             'list': [{'label': 'вода'}, {'label': 'соль'}]}]
+        if product['weight']:
+            properties.append({'__typename': 'StringPropertyValue',
+                               'property': {'name': 'weight_unit',
+                                            'title': 'Вес'},
+                               'strValue': product['weight']})
+
+        data = self.get_card(id, address)
+        data.update({'categories': [
+                        {'name': f"Раздел {category['parent']}"},
+                        {'name': category['name']}],
+                     'propertyValues': properties,
+                     'quant': {'unit': product['unit']}})
+        return data
+
+    def get_category_list(self) -> list:
+        """ Function for getting tree of categories of catalog state """
+
+        parents = {}
+        for category in self.categories:
+            id = category['parent']
+            if id not in parents:
+                parents[id] = {'id': id, 'treeId': id, 'parentTreeId': None,
+                               'code': f'razdel-{id}',
+                               'name': f'Раздел {id}',
+                               'isCatalogDisplay': False,
+                               'isCategoryDisplay': True, 'children': []}
+            parents[id]['children'].append(
+                {'id': category['id'], 'treeId': category['id'],
+                 'parentTreeId': id, 'code': category['code'],
+                 'name': category['name'], 'isCatalogDisplay': True,
+                 'isCategoryDisplay': True, 'children': []})
+        return list(parents.values())
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    """ Handler of requests to pages of mock site """
+
+    def log_message(self, format: str, *args) -> None:
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def get_address(self) -> str:
+        cookie = SimpleCookie(self.headers.get('Cookie', ''))
+        if ADDRESS_COOKIE in cookie:
+            return unquote(cookie[ADDRESS_COOKIE].value)
+        return ''
+
+    def reply(self, status: int, body: str,
+              content_type: str = 'text/html; charset=utf-8') -> None:
+        data = body.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+        self.server.count('bytes', len(data))
+
+    def reply_image(self, code: str) -> None:
+        """ Function for sending image of product (ETag of content,
+        304 answer to conditional request with the same ETag) """
+
+        id = int(code.split('.')[0])
+        data = self.server.catalog.get_image(id)
+        etag = '"{}"'.format(sha1(data).hexdigest()[:16])
+
+        if self.headers.get('If-None-Match') == etag:
+            self.server.count('not_modified')
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'image/jpeg')
+        self.send_header('Content-Length', str(len(data)))
+        self.send_header('ETag', etag)
+        self.end_headers()
+        self.wfile.write(data)
+        self.server.count('bytes', len(data))
+
+    def render(self, title: str, body: str, state: dict) -> str:
+        address = self.get_address() or 'Укажите адрес доставки'
+        state = json.dumps(state, ensure_ascii=False).replace('</', '<\\/')
+        return PAGE.format(title=title, address=address, body=body,
+                           state=state, cookie=ADDRESS_COOKIE)
+
+    def do_GET(self) -> None:
+        url = urlsplit(self.path)
+        query = parse_qs(url.query)
+        server = self.server
+
+        if url.path == '/__stats':
+            self.reply(200, json.dumps(server.get_stats()),
+                       'application/json')
+            return
+
+        kind = url.path.strip('/').split('/')[0] or 'main'
+        server.count('requests')
+        server.count(kind)
+
+        delay = server.latency_s + random.uniform(0, server.jitter_s)
+        if delay:
+            time.sleep(delay)
+
+        if random.random() < server.error_rate:
+            server.count('errors')
+            self.reply(503, 'Service Unavailable')
+            return
+
+        recorded = server.get_recorded(url.path)
+        if recorded is not None:
+            self.reply(200, recorded)
+            return
+
+        if kind == 'images':
+            try:
+                self.reply_image(url.path.split('/')[2])
+            except (KeyError, ValueError, IndexError):
+                self.reply(404, 'Not Found')
+            return
+
+        try:
+            if kind == 'main':
+                page = self.render('Ярче!', '<main>Главная</main>', {})
+            elif url.path.rstrip('/') == '/category':
+                page = self.render('Каталог', '', {'api': {'categoryList': {
+                    'list': server.catalog.get_category_list()}}})
+            elif kind == 'catalog':
+                page = self.get_category_page(url.path.split('/')[2], query)
+            elif kind == 'product':
+                page = self.get_product_page(url.path.split('/')[2])
+            else:
+                page = None
+        except (KeyError, ValueError, IndexError):
+            page = None
+
+        if page is None:
+            self.reply(404, 'Not Found')
+        else:
+            self.reply(200, page)
+
+    def get_category_page(self, code: str, query: dict) -> str:
+        """ Function for rendering page of category (with parameter
+        page_param - only products of this page, with parameter
+        promo_param - only promo products), page after last one is empty
+        or absent (404) if site has missing_pages """
+
+        catalog = self.server.catalog
+        category = catalog.get_category(code)
+        if category is None:
+            return None
+
+        address = self.get_address()
+        ids = category['products']
+        if self.server.promo_param in query:
+            ids = [id for id in ids
+                   if catalog.get_card(id, address)['previousPrice']]
+
+        param = self.server.page_param
+        page = int(query.get(param, ['1'])[0])
+        size = catalog.page_size
+        pages = max(1, -(-len(ids) // size))
+        if page > pages and self.server.missing_pages:
+            return None
+        ids = ids[(page - 1) * size:page * size]
+
+        cards = [catalog.get_card(id, address) for id in ids]
+        html = ''.join(CARD.format(promo=PROMO if card['previousPrice']
+                                   else '', **card) for card in cards)
+
+        if 'fragment' in query:
+            return html
+
+        body = f'<div class="k30d0QKVw"><div id="cards">{html}</div></div>'
+        if page == 1 and pages > 1:
+            body += SHOW_MORE.format(param=param, pages=pages)
+
+        return self.render(category['name'], body,
+                           {'api': {'productList': {'list': cards}}})
+
+    def get_product_page(self, code: str) -> str:
+        """ Function for rendering page of product """
+
+        id = int(code.rsplit('-', 1)[1])
+        catalog = self.server.catalog
+        if id not in catalog.products:
+            return None
+
+        data = catalog.get_product_data(id, self.get_address())
+        stock = '' if data['isAvailable'] else '<div>Нет в наличии</div>'
+        body = (f'<img class="c1uCMShdi" src="/images/{id}.jpg">'
+                f'<div class="q1a5cSewj">{stock}</div>')
+
+        return self.render(data['name'], body,
+                           {'api': {'product': {'data': data}}})
+
+
+class MockSite(ThreadingHTTPServer):
+    """ Local HTTP server of mock site with counters of requests """
+
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self, address: tuple, catalog: Catalog,
+                 latency_s: float = 0, jitter_s: float = 0,
+                 error_rate: float = 0, page_param: str = 'page',
+                 recorded: str = None, verbose: bool = False,
+                 promo_param: str = 'promo',
+                 missing_pages: bool = False) -> None:
+        self.catalog = catalog
+        self.latency_s = latency_s
+        self.jitter_s = jitter_s
+        self.error_rate = error_rate
+        self.page_param = page_param
+        self.promo_param = promo_param
+        self.missing_pages = missing_pages
+        self.recorded = recorded
+        self.verbose = verbose
+        self.started = time.monotonic()
+        self.stats = {}
+        self.lock = Lock()
+        super().__init__(address, MockHandler)
+
+    def count(self, key: str, value: int = 1) -> None:
+        with self.lock:
+            self.stats[key] = self.stats.get(key, 0) + value
+
+    def get_stats(self) -> dict:
+        with self.lock:
+            stats = dict(self.stats)
+        elapsed = max(time.monotonic() - self.started, 0.001)
+        stats['requests_per_s'] = round(stats.get('requests', 0) / elapsed, 2)
+        return stats
+
+    def get_recorded(self, path: str) -> str:
+        """ Function for reading recorded page (DIR/<path>.html) """
+
+        if not self.recorded:
+            return None
+        name = os.path.join(self.recorded, path.strip('/') or 'index')
+        if not os.path.isfile(f'{name}.html'):
+            return None
+        with open(f'{name}.html', encoding='utf-8') as f:
+            return f.read()
+
+
+# Functions
+
+def create_site(port: int = 8080, categories: int = 10, products: int = 100,
+                page_size: int = 30, latency_ms: float = 0,
+                jitter_ms: float = 0, error_rate: float = 0,
+                volatility: float = 0.2, epoch_s: float = 600,
+                seed: int = 1, page_param: str = 'page',
+                recorded: str = None, verbose: bool = False,
+                missing_pages: bool = False) -> MockSite:
+    """ Function for creating mock site (port 0 - any free port) """
+
+    catalog = Catalog(categories, products, page_size, volatility, epoch_s,
+                      seed)
+    return MockSite(('127.0.0.1', port), catalog, latency_ms / 1000,
+                    jitter_ms / 1000, error_rate, page_param, recorded,
+                    verbose, missing_pages=missing_pages)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--categories', type=int, default=10,
+                        help='number of low level categories')
+    parser.add_argument('--products', type=int, default=100,
+                        help='number of products in category')
+    parser.add_argument('--page-size', type=int, default=30,
+                        help='number of products on category page')
+    parser.add_argument('--latency-ms', type=float, default=0)
+    parser.add_argument('--jitter-ms', type=float, default=0)
+    parser.add_argument('--error-rate', type=float, default=0,
+                        help='share of requests answered with 503')
+    parser.add_argument('--volatility', type=float, default=0.2,
+                        help='share of products of promo categories '
+                             'changing price every epoch')
+    parser.add_argument('--epoch-s', type=float, default=600)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--page-param', default='page')
+    parser.add_argument('--recorded', help='directory with recorded pages '
+                                           '(<path>.html)')
+    parser.add_argument('--missing-pages', action='store_true',
+                        help='answer 404 to category page after last one')
+    parser.add_argument('--verbose', action='store_true')
+    args = parser.parse_args()
+
+    site = create_site(args.port, args.categories, args.products,
+                       args.page_size, args.latency_ms, args.jitter_ms,
+                       args.error_rate, args.volatility, args.epoch_s,
+                       args.seed, args.page_param, args.recorded,
+                       args.verbose, args.missing_pages)
+
+    with site:
+        print(f'Mock site is listening on http://127.0.0.1:{args.port} '
+              f'({len(site.catalog.products)} products)')
+        try:
+            site.serve_forever()
+        except KeyboardInterrupt:
+            print(json.dumps(site.get_stats()))
@@ -0,0 +1,227 @@
+"""
+Module with staged pipeline of parser: scraping (producer) puts parts
+of products to bounded queue, archive stage writes them to archives
+in workers and passes archives to deliver stage (mailer)
+"""
+
+from concurrent.futures import Executor
+from logging import Logger
+from queue import Queue
+from threading import Condition, Lock, Thread
+import time
+from typing import Callable
+
+from exceptions import ArchivePartsFailed
+from profiling import stage
+from settings import config
+
+
+# Functions
+
+def create_stage_stats() -> dict:
+    """ Function for creating counters of 1 stage of pipeline """
+
+    # wait_s - time of waiting for place in full queue
+    return {'items': 0, 'errors': 0, 'bytes': 0, 'busy_s': 0.0,
+            'wait_s': 0.0, 'max_depth': 0}
+
+
+def start_pipeline(logger: Logger, executor: Executor, write: Callable,
+                   deliver: Callable, prepare: Callable = None) -> dict:
+    """ Function for starting threads of archive stage
+    (prepare(products) is run in thread of archive stage before writing,
+    write(dir, name_csv, products, fields) is run in executor and returns
+    stats of archive, deliver(path_archive, tt) passes archive to mailer) """
+
+    workers = max(1, config.part_workers)
+    size = config.pipeline_queue_size
+
+    # stores - parts of every store: queued, finished (archived or failed),
+    # names of failed parts and callback run after all parts are archived
+    lock = Lock()
+    pipeline = {'queue': Queue(maxsize=size), 'logger': logger,
+                'executor': executor, 'write': write, 'deliver': deliver,
+                'prepare': prepare,
+                'lock': lock, 'finished': Condition(lock), 'stores': {},
+                'failed': [], 'stopped': False, 'started': time.monotonic(),
+                'stats': {'scrape': create_stage_stats(),
+                          'archive': create_stage_stats()}}
+
+    pipeline['threads'] = [Thread(target=run_archive_stage,
+                                  args=(pipeline,), name=f'archive-{i}',
+                                  daemon=True)
+                           for i in range(workers)]
+    for thread in pipeline['threads']:
+        thread.start()
+
+    return pipeline
+
+
+def put_part(pipeline: dict, tt: str, dir: str, name_csv: str,
+             products: dict, fields: list) -> None:
+    """ Function for passing part of products to archive stage
+    (fields - columns of .csv file, scraping waits if queue is full) """
+
+    stats = pipeline['stats']['scrape']
+    with pipeline['lock']:
+        get_store(pipeline, tt)['queued'] += 1
+
+    started = time.monotonic()
+    pipeline['queue'].put({'tt': tt, 'dir': dir, 'name_csv': name_csv,
+                           'products': products, 'fields': fields})
+
+    with pipeline['lock']:
+        stats['items'] += 1
+        stats['wait_s'] += time.monotonic() - started
+        stats['max_depth'] = max(stats['max_depth'],
+                                 pipeline['queue'].qsize())
+
+    pipeline['logger'].debug('Part "{}" is queued for archiving, depth of '
+                             'queue: {}.'.format(name_csv,
+                                                 pipeline['queue'].qsize()))
+
+
+def get_store(pipeline: dict, tt: str) -> dict:
+    """ Function for getting counters of parts of store
+    (called under lock of pipeline) """
+
+    return pipeline['stores'].setdefault(tt, {'queued': 0, 'finished': 0,
+                                              'failed': [], 'callback': None})
+
+
+def run_store_callback(pipeline: dict, tt: str) -> None:
+    """ Function for running callback of store if all its parts are
+    finished (callback is skipped if any part failed) """
+
+    with pipeline['lock']:
+        store = get_store(pipeline, tt)
+        callback = store['callback']
+        if callback is None or store['finished'] < store['queued']:
+            return
+        store['callback'] = None
+        failed = list(store['failed'])
+
+    if failed:
+        pipeline['logger'].error(f'Parts of "{tt}" failed, results of store '
+                                 f'are not saved: {failed}.')
+    else:
+        try:
+            callback()
+        except Exception:
+            pipeline['logger'].exception(f'Saving results of "{tt}" failed!')
+            with pipeline['lock']:
+                pipeline['failed'].append(f'results of {tt}')
+
+    with pipeline['finished']:
+        pipeline['finished'].notify_all()
+
+
+def after_parts(pipeline: dict, tt: str, callback: Callable) -> None:
+    """ Function for running callback (for example, saving snapshot
+    of store) when all queued parts of store are archived """
+
+    with pipeline['lock']:
+        get_store(pipeline, tt)['callback'] = callback
+    run_store_callback(pipeline, tt)
+
+
+def wait_parts(pipeline: dict, tt: str) -> None:
+    """ Function for waiting until callback of store is run
+    (results of previous parsing of store are saved) """
+
+    with pipeline['finished']:
+        pipeline['finished'].wait_for(
+            lambda: get_store(pipeline, tt)['callback'] is None)
+
+
+def run_archive_stage(pipeline: dict) -> None:
+    """ Function of thread of archive stage """
+
+    logger = pipeline['logger']
+    stats = pipeline['stats']['archive']
+
+    while True:
+        job = pipeline['queue'].get()
+        if job is None:
+            return
+
+        started = time.monotonic()
+        try:
+            if pipeline['prepare'] is not None:
+                with stage('prepare_part'):
+                    pipeline['prepare'](job['products'])
+
+            with stage('archive'):
+                future = pipeline['executor'].submit(
+                                pipeline['write'], job['dir'],
+                                job['name_csv'], job['products'],
+                                job['fields'])
+                archive = future.result()
+
+            logger.info('Archive "{path}" is writed: {raw_bytes} bytes of '
+                        'CSV, {archive_bytes} bytes of archive, '
+                        '{seconds} s.'.format(**archive))
+
+            pipeline['deliver'](archive['path'], job['tt'])
+
+        except Exception:
+            logger.exception('Archiving of part "{}" failed!'.format(
+                                                            job['name_csv']))
+            with pipeline['lock']:
+                stats['errors'] += 1
+                store = get_store(pipeline, job['tt'])
+                store['failed'].append(job['name_csv'])
+                store['finished'] += 1
+                pipeline['failed'].append(job['name_csv'])
+            run_store_callback(pipeline, job['tt'])
+            continue
+
+        with pipeline['lock']:
+            stats['items'] += 1
+            stats['bytes'] += archive['archive_bytes']
+            stats['busy_s'] += time.monotonic() - started
+            get_store(pipeline, job['tt'])['finished'] += 1
+        run_store_callback(pipeline, job['tt'])
+
+
+def log_pipeline_stats(pipeline: dict, mailer: dict = None) -> None:
+    """ Function for logging throughput of stages and depth of queues """
+
+    elapsed = max(time.monotonic() - pipeline['started'], 0.001)
+    for name, stats in pipeline['stats'].items():
+        pipeline['logger'].info(
+            'Stage "{}": {} items ({:.2f}/min), {} errors, {} bytes, '
+            'busy {:.1f} s, waiting {:.1f} s, max depth of queue {}.'.format(
+                name, stats['items'], stats['items'] * 60 / elapsed,
+                stats['errors'], stats['bytes'], stats['busy_s'],
+                stats['wait_s'], stats['max_depth']))
+
+    if mailer is not None:
+        pipeline['logger'].info('Stage "deliver": {} archives sended, '
+                                'depth of queue {}, {} waiting for '
+                                'retry.'.format(mailer['sent'],
+                                                mailer['queue'].qsize(),
+                                                len(mailer['waiting'])))
+
+
+def stop_pipeline(pipeline: dict) -> None:
+    """ Function for waiting until all queued parts are archived
+    (repeated call does nothing) """
+
+    if pipeline['stopped']:
+        return
+    pipeline['stopped'] = True
+
+    for _ in pipeline['threads']:
+        pipeline['queue'].put(None)
+    for thread in pipeline['threads']:
+        thread.join()
+
+
+def check_pipeline(pipeline: dict) -> None:
+    """ Function for stopping pipeline and raising error
+    if any part or result of store failed """
+
+    stop_pipeline(pipeline)
+    if pipeline['failed']:
+        raise ArchivePartsFailed(pipeline['failed'])
@@ -0,0 +1,248 @@
+"""
+Module with planner of runs: numbers of products and durations of parsing
+of categories are recorded, categories of stores are split to balanced
+shards (longest processing time first) and runtime is estimated
+"""
+
+from datetime import datetime
+from hashlib import blake2b
+import heapq
+import json
+import os
+from zlib import crc32
+
+from exceptions import SavePlanFailed, SaveTimingsFailed
+from locks import lock_file
+from settings import config
+
+
+# Constants
+
+# Weight of last run in recorded duration of category
+SMOOTHING = 0.5
+
+# Duration of category without records (if no category is recorded)
+DEFAULT_SECONDS = 60
+
+
+# Functions
+
+def load_timings(path: str) -> dict:
+    """ Function for loading timings of categories
+    (keys of categories - 'tt_id|url') """
+
+    timings = {'categories': {}}
+    if os.path.exists(path):
+        with open(path, encoding='utf-8') as f:
+            timings.update(json.load(f))
+    timings['recorded'] = []
+    return timings
+
+
+def save_timings(path: str, timings: dict) -> None:
+    """ Function for saving timings of categories recorded in this run
+    (timings of other shards saved to the same file are kept, file
+    is locked while it is updated) """
+
+    try:
+        with lock_file(path):
+            saved = load_timings(path)
+            for key in timings['recorded']:
+                saved['categories'][key] = timings['categories'][key]
+            del saved['recorded']
+
+            with open(f'{path}.tmp', 'w', encoding='utf-8') as f:
+                json.dump(saved, f, ensure_ascii=False)
+            os.replace(f'{path}.tmp', path)
+
+    except Exception as e:
+        raise SaveTimingsFailed(path) from e
+
+
+def record_category(timings: dict, tt: str, url: str, products: int,
+                    seconds: float) -> None:
+    """ Function for recording number of products and duration
+    of parsing of category """
+
+    key = f'{tt}|{url}'
+    record = timings['categories'].get(key)
+    if record is None:
+        record = {'products': products, 'seconds': seconds, 'runs': 0}
+    else:
+        record['products'] = products
+        record['seconds'] = (SMOOTHING * seconds +
+                             (1 - SMOOTHING) * record['seconds'])
+    record['runs'] += 1
+
+    timings['categories'][key] = record
+    if key not in timings['recorded']:
+        timings['recorded'].append(key)
+
+
+def estimate_category(timings: dict, tt: str, url: str) -> float:
+    """ Function for estimating duration of category in store (category
+    not recorded in store - average of other stores or of all categories) """
+
+    categories = timings['categories']
+    record = categories.get(f'{tt}|{url}')
+    if record is not None:
+        return record['seconds']
+
+    same = [record['seconds'] for key, record in categories.items()
+            if key.split('|', 1)[1] == url]
+    if same:
+        return sum(same) / len(same)
+    if categories:
+        return (sum(record['seconds'] for record in categories.values()) /
+                len(categories))
+    return DEFAULT_SECONDS
+
+
+def get_known_categories(timings: dict, tt: str) -> list:
+    """ Function for getting categories of store recorded in previous runs """
+
+    return [key.split('|', 1)[1] for key in timings['categories']
+            if key.split('|', 1)[0] == tt]
+
+
+def plan_shards(timings: dict, jobs: list, count: int) -> list:
+    """ Function for splitting jobs (pairs tt_id, url) to count shards
+    with close durations: longest job is given to least loaded shard """
+
+    shards = [{'jobs': [], 'seconds': 0.0} for _ in range(max(1, count))]
+    heap = [(0.0, index) for index in range(len(shards))]
+
+    costs = sorted(((estimate_category(timings, tt, url), tt, url)
+                    for tt, url in jobs), reverse=True)
+    for seconds, tt, url in costs:
+        load, index = heapq.heappop(heap)
+        shards[index]['jobs'].append((tt, url))
+        shards[index]['seconds'] += seconds
+        heapq.heappush(heap, (load + seconds, index))
+
+    return shards
+
+
+def get_job_shard(shards: list, tt: str, url: str) -> int:
+    """ Function for getting number of shard of job (jobs absent in plan
+    are distributed by hash, equally in all processes) """
+
+    for index, shard in enumerate(shards):
+        if (tt, url) in shard['jobs']:
+            return index
+    return crc32(f'{tt}|{url}'.encode('utf-8')) % len(shards)
+
+
+def create_plan(timings: dict) -> list:
+    """ Function for planning run: categories of stores recorded
+    in previous runs are split to shard_count shards """
+
+    jobs = [(tt, url) for tt in config.tt_id
+            for url in get_known_categories(timings, tt)]
+    return plan_shards(timings, jobs, config.shard_count)
+
+
+def get_plan_run_id() -> str:
+    """ Function for getting id of sharded run
+    (shard_run_id, default - date of start) """
+
+    return config.shard_run_id or datetime.now().strftime('%Y-%m-%d')
+
+
+def get_plan_path(run_id: str, count: int) -> str:
+    """ Function for getting path of plan of run (next to planner_file) """
+
+    base = os.path.splitext(config.planner_file)[0]
+    name = run_id.replace('/', '_')
+    return f'{base}_plan_{name}_{count}.json'
+
+
+def get_plan_fingerprint() -> str:
+    """ Function for getting hash of configuration of sharded run
+    (stores, categories of stores and number of shards) """
+
+    values = json.dumps([config.tt_id, config.categories,
+                         config.shard_count], sort_keys=True,
+                        ensure_ascii=False)
+    return blake2b(values.encode('utf-8'), digest_size=8).hexdigest()
+
+
+def freeze_plan(timings: dict) -> list:
+    """ Function for getting plan shared by all shards of run: first
+    shard of run (shard_run_id, default - date of start) creates plan
+    and saves it, other shards load it, so categories are split equally
+    in all processes even if planner_file is changed meanwhile. Plan is
+    created again if configuration of run is changed or shard was already
+    finished by plan (next run), single process - plan is not saved """
+
+    if config.shard_count <= 1:
+        return create_plan(timings)
+
+    path = get_plan_path(get_plan_run_id(), config.shard_count)
+    fingerprint = get_plan_fingerprint()
+    try:
+        with lock_file(path):
+            plan = None
+            if os.path.exists(path):
+                with open(path, encoding='utf-8') as f:
+                    plan = json.load(f)
+
+            if (plan is None or plan['fingerprint'] != fingerprint or
+                    config.shard_index in plan['finished']):
+                plan = {'fingerprint': fingerprint, 'finished': [],
+                        'shards': create_plan(timings)}
+                save_plan(path, plan)
+
+        shards = plan['shards']
+        for shard in shards:
+            shard['jobs'] = [tuple(job) for job in shard['jobs']]
+        return shards
+
+    except Exception as e:
+        raise SavePlanFailed(path) from e
+
+
+def finish_plan() -> None:
+    """ Function for marking shard as finished in plan of run, plan is
+    deleted when all shards are finished (failed shard started again
+    in the same run gets the same categories) """
+
+    if config.shard_count <= 1:
+        return
+
+    path = get_plan_path(get_plan_run_id(), config.shard_count)
+    try:
+        with lock_file(path):
+            if not os.path.exists(path):
+                return
+            with open(path, encoding='utf-8') as f:
+                plan = json.load(f)
+
+            if config.shard_index not in plan['finished']:
+                plan['finished'].append(config.shard_index)
+            if len(plan['finished']) >= config.shard_count:
+                os.remove(path)
+            else:
+                save_plan(path, plan)
+
+    except Exception as e:
+        raise SavePlanFailed(path) from e
+
+
+def save_plan(path: str, plan: dict) -> None:
+    """ Function for writing plan of run (called under lock of plan) """
+
+    with open(f'{path}.tmp', 'w', encoding='utf-8') as f:
+        json.dump(plan, f, ensure_ascii=False)
+    os.replace(f'{path}.tmp', path)
+
+
+def describe_plan(shards: list) -> str:
+    """ Function for describing estimated runtime of plan """
+
+    loads = ', '.join('{:.0f} s'.format(shard['seconds'])
+                      for shard in shards)
+    jobs = sum(len(shard['jobs']) for shard in shards)
+    runtime = max(shard['seconds'] for shard in shards)
+    return (f'Estimated runtime: {runtime:.0f} s ({jobs} known categories, '
+            f'shards: {loads}).')
@@ -0,0 +1,186 @@
+"""
+Module with opt-in profiling of stages of parsing (profile_mode):
+"sampling" - stacks of threads inside stages are sampled every
+profile_interval_ms, "cprofile" - functions of main thread are traced
+by cProfile. Profiles of stages and collapsed stacks for flamegraphs
+are written to logs_dir, without profile_mode stages cost nothing
+"""
+
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+import os
+import sys
+import threading
+from typing import ContextManager, Optional
+
+from settings import config
+
+
+# Constants
+
+# Context of stage if profiling is disabled
+NO_STAGE = nullcontext()
+
+# Number of functions in profile of stage
+TOP_FUNCTIONS = 40
+
+# Profiler of process (None - profiling is disabled)
+_profiler = None
+
+
+# Functions
+
+def start_profiler() -> Optional[dict]:
+    """ Function for starting profiler of process by profile_mode """
+
+    global _profiler
+    mode = config.profile_mode
+    if not mode:
+        return None
+
+    created = datetime.now().strftime('%Y-%m-%d_%H-%M-%S')
+    _profiler = {'mode': mode, 'dir': f'{config.logs_dir}/profile_{created}',
+                 'stages': {}, 'stacks': Counter(), 'profiles': {},
+                 'stop': threading.Event(), 'thread': None}
+
+    if mode == 'sampling':
+        thread = threading.Thread(target=sample_stacks, args=(_profiler,),
+                                  name='profiler', daemon=True)
+        _profiler['thread'] = thread
+        thread.start()
+
+    return _profiler
+
+
+def get_frame_name(frame) -> str:
+    """ Function for getting name of function of frame for stacks """
+
+    code = frame.f_code
+    name = os.path.basename(code.co_filename)
+    return f'{code.co_name} ({name}:{code.co_firstlineno})'
+
+
+def sample_stacks(profiler: dict) -> None:
+    """ Function for sampling stacks of threads inside stages
+    (root of stack - name of innermost stage) """
+
+    interval = config.profile_interval_ms / 1000
+    own = threading.get_ident()
+    while not profiler['stop'].wait(interval):
+        for ident, frame in sys._current_frames().items():
+            # stage can be finished by thread while stack is sampled
+            stages = profiler['stages'].get(ident, [])[-1:]
+            if ident == own or not stages:
+                continue
+
+            stack = []
+            while frame is not None:
+                stack.append(get_frame_name(frame))
+                frame = frame.f_back
+            stack.append(stages[-1])
+            profiler['stacks'][';'.join(reversed(stack))] += 1
+
+
+@contextmanager
+def profile_stage(profiler: dict, name: str):
+    """ Function for marking code of thread as stage (cProfile of outer
+    stage is paused while inner stage is profiled) """
+
+    stages = profiler['stages'].setdefault(threading.get_ident(), [])
+    traced = (profiler['mode'] == 'cprofile' and
+              threading.current_thread() is threading.main_thread())
+
+    if traced:
+        import cProfile
+
+        if stages:
+            profiler['profiles'][stages[-1]].disable()
+        profile = profiler['profiles'].setdefault(name, cProfile.Profile())
+        profile.enable()
+
+    stages.append(name)
+    try:
+        yield
+    finally:
+        stages.pop()
+        if traced:
+            profile.disable()
+            if stages:
+                profiler['profiles'][stages[-1]].enable()
+
+
+def stage(name: str) -> ContextManager:
+    """ Function for getting context of stage for profiling
+    (shared empty context if profiling is disabled) """
+
+    if _profiler is None:
+        return NO_STAGE
+    return profile_stage(_profiler, name)
+
+
+def write_sampling_profiles(profiler: dict) -> None:
+    """ Function for writing functions of every stage sorted
+    by number of samples on top of stack (self) and in stack (total) """
+
+    samples = {}
+    for stack, number in profiler['stacks'].items():
+        frames = stack.split(';')
+        counters = samples.setdefault(frames[0], (Counter(), Counter(),
+                                                  Counter()))
+        counters[0][frames[-1]] += number
+        for frame in set(frames[1:]):
+            counters[1][frame] += number
+        counters[2]['samples'] += number
+
+    for name, (own, total, count) in samples.items():
+        with open(f"{profiler['dir']}/{name}.txt", 'w',
+                  encoding='utf-8') as f:
+            f.write(f"Samples: {count['samples']}\n\n"
+                    f"{'self':>8} {'total':>8}  function\n")
+            for frame, number in total.most_common(TOP_FUNCTIONS):
+                f.write(f'{own[frame]:>8} {number:>8}  {frame}\n')
+
+
+def write_cprofile_profiles(profiler: dict) -> None:
+    """ Function for writing cProfile statistics of every stage (.prof)
+    and own time of functions as stacks stage;function (microseconds) """
+
+    import pstats
+
+    for name, profile in profiler['profiles'].items():
+        profile.dump_stats(f"{profiler['dir']}/{name}.prof")
+        stats = pstats.Stats(profile).stats
+        for (file, line, function), values in stats.items():
+            micros = int(values[2] * 1000000)
+            if micros:
+                frame = f'{function} ({os.path.basename(file)}:{line})'
+                profiler['stacks'][f'{name};{frame}'] += micros
+
+
+def stop_profiler() -> Optional[str]:
+    """ Function for stopping profiler and writing profiles of stages
+    and collapsed stacks (stacks.collapsed), directory is returned """
+
+    global _profiler
+    profiler = _profiler
+    if profiler is None:
+        return None
+    _profiler = None
+
+    profiler['stop'].set()
+    if profiler['thread'] is not None:
+        profiler['thread'].join()
+
+    os.makedirs(profiler['dir'], exist_ok=True)
+    if profiler['mode'] == 'sampling':
+        write_sampling_profiles(profiler)
+    else:
+        write_cprofile_profiles(profiler)
+
+    with open(f"{profiler['dir']}/stacks.collapsed", 'w',
+              encoding='utf-8') as f:
+        for stack, number in profiler['stacks'].most_common():
+            f.write(f'{stack} {number}\n')
+
+    return profiler['dir']
@@ -0,0 +1,128 @@
+"""
+Module with pool of proxies for browser and HTTP requests: health
+of every proxy (latency, errors, blocks) is tracked, healthy proxies
+are chosen more often, every proxy has own limit of requests per second
+"""
+
+import random
+from threading import Lock
+import time
+from typing import Optional
+
+from settings import config
+
+
+# Constants
+
+# Weight of last request in latency of proxy
+SMOOTHING = 0.2
+
+# HTTP statuses meaning that proxy is blocked by site
+BLOCK_STATUSES = [403, 429]
+
+# Pool of process created from config (None - proxies are not used)
+_pool = None
+_pool_lock = Lock()
+
+
+# Functions
+
+def create_pool(urls: list, rate_per_s: float, block_s: float) -> dict:
+    """ Function for creating pool of proxies (urls - 'http://host:port') """
+
+    return {'lock': Lock(), 'rate_per_s': rate_per_s, 'block_s': block_s,
+            'proxies': [{'url': url, 'requests': 0, 'errors': 0,
+                         'blocks': 0, 'latency_s': 1.0, 'next_at': 0.0,
+                         'blocked_until': 0.0} for url in urls]}
+
+
+def get_proxy_pool() -> Optional[dict]:
+    """ Function for getting pool of proxies from config
+    (pool is created once per process) """
+
+    global _pool
+    if not config.proxies:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            _pool = create_pool(config.proxies, config.proxy_rate_per_s,
+                                config.proxy_block_s)
+    return _pool
+
+
+def get_weight(proxy: dict) -> float:
+    """ Function for getting health score of proxy: share of successful
+    requests divided by latency (new proxy has score of 1 s latency) """
+
+    success = ((proxy['requests'] - proxy['errors'] + 1) /
+               (proxy['requests'] + 1))
+    return success / max(proxy['latency_s'], 0.01)
+
+
+def choose_proxy(pool: dict) -> dict:
+    """ Function for choosing proxy weighted by health score
+    (blocked proxies are skipped while other proxies are available) """
+
+    now = time.time()
+    proxies = [proxy for proxy in pool['proxies']
+               if proxy['blocked_until'] <= now]
+    if not proxies:
+        return min(pool['proxies'], key=lambda proxy: proxy['blocked_until'])
+
+    weights = [get_weight(proxy) for proxy in proxies]
+    return random.choices(proxies, weights=weights)[0]
+
+
+def wait_turn(pool: dict, proxy: dict) -> None:
+    """ Function for waiting until request through proxy is allowed
+    by its limit (slot is reserved under lock, waiting is outside) """
+
+    with pool['lock']:
+        now = time.time()
+        start = max(now, proxy['next_at'], proxy['blocked_until'])
+        proxy['next_at'] = start + 1 / pool['rate_per_s']
+
+    if start > now:
+        time.sleep(start - now)
+
+
+def acquire_proxy(pool: dict) -> dict:
+    """ Function for getting proxy for next request """
+
+    with pool['lock']:
+        proxy = choose_proxy(pool)
+    wait_turn(pool, proxy)
+    return proxy
+
+
+def find_proxy(pool: dict, url: str) -> Optional[dict]:
+    """ Function for finding proxy of pool by URL """
+
+    for proxy in pool['proxies']:
+        if proxy['url'] == url:
+            return proxy
+    return None
+
+
+def report_proxy(pool: dict, proxy: dict, seconds: float,
+                 error: bool = False, blocked: bool = False) -> None:
+    """ Function for updating health of proxy after request
+    (blocked proxy is not used for proxy_block_s seconds) """
+
+    with pool['lock']:
+        proxy['requests'] += 1
+        proxy['latency_s'] = (SMOOTHING * seconds +
+                              (1 - SMOOTHING) * proxy['latency_s'])
+        if error or blocked:
+            proxy['errors'] += 1
+        if blocked:
+            proxy['blocks'] += 1
+            proxy['blocked_until'] = time.time() + pool['block_s']
+
+
+def describe_pool(pool: dict) -> str:
+    """ Function for describing health of proxies for log """
+
+    return '; '.join(
+        '{url}: {requests} requests, {errors} errors, {blocks} blocks, '
+        '{latency_s:.2f} s'.format(**proxy) for proxy in pool['proxies'])
@@ -3,22 +3,20 @@ Module allows to get all products from site 'https://yarcheplus.ru/'
 and write them to .csv file
 """
 
+from __future__ import annotations
+
+from concurrent.futures import (Executor, ProcessPoolExecutor,
+                                ThreadPoolExecutor)
 import csv
 from datetime import datetime
-from email.mime.application import MIMEApplication
-from email.mime.multipart import MIMEMultipart
+from itertools import islice
 import json
-from logging import Logger
+from logging import getLogger, Logger
 import os
-from shutil import copyfile
-import smtplib
+import socket
+import sys
 import time
-from typing import Union
-import zipfile
-
-from bs4 import BeautifulSoup
-from selenium.webdriver import Chrome
-from selenium.webdriver.common.action_chains import ActionChains
+from typing import TYPE_CHECKING, Iterator, Tuple, Union
 
 from exceptions import (CreateLoggerFailed, OpenBrowserFailed, LoadPageFailed,
                         ChromeOptionsFailed, SpecifyAddressFailed,
@@ -28,18 +26,49 @@ from exceptions import (CreateLoggerFailed, OpenBrowserFailed, LoadPageFailed,
                         FillSkuParametersFailed, ConvertWeightVolumeFailed,
                         ParseProductFromJsonFailed, ParseProductsFromCategory,
                         GetProductsLinksFromCategory, WriteProductsToCsvFailed,
-                        ParseProductsFailed, CreateZIPArchiveFailed,
-                        SendZIPArchiveFailed)
-from services import (create_logger, create_chrome_options, get_link,
-                      initialize_browser, specify_address)
+                        ParseProductsFailed, SendZIPArchiveFailed,
+                        FillProductFromCacheFailed, SaveStaticCacheFailed,
+                        ErrorBudgetExceeded, ArchivePartsFailed,
+                        ConfigInvalid, ParserException, ParquetUnavailable,
+                        ArchiveCodecUnavailable, SavePlanFailed,
+                        SaveTimingsFailed, SaveScheduleFailed, shorten)
+from services import (create_logger, get_link, specify_address,
+                      create_session, get_html, confirm_cookies)
+from browsers import (close_browser, count_page, describe_memory,
+                      maintain_browser, open_browser)
+from columnar import check_parquet, write_products_parquet
+from delivery import (InlineExecutor, check_archive_codec,
+                      open_archive_stream)
+from delta import (create_delta, finish_delta, get_removed_products,
+                   mark_changes, mark_partial)
 from get_categories import get_categories
+from history import open_history, write_history
+from images import (describe_harvest, get_harvest, harvest_images,
+                    save_images_index)
+from mailer import enqueue_archive, start_mailer, stop_mailer
+from pipeline import (after_parts, check_pipeline, log_pipeline_stats,
+                      put_part, start_pipeline, stop_pipeline, wait_parts)
+from profiling import start_profiler, stage, stop_profiler
+from planner import (describe_plan, estimate_category, finish_plan,
+                     freeze_plan, get_job_shard, load_timings,
+                     record_category, save_timings)
+from proxies import describe_pool, get_proxy_pool
+from scheduler import (get_category_state, load_schedule, record_failure,
+                       record_refresh, save_schedule, select_due_categories)
+from settings import config, configure
+from tabs import load_pages_in_tabs
+from workqueue import (add_jobs, complete_jobs, count_jobs, extend_leases,
+                       fail_job, get_run_id, iter_results, lease_jobs,
+                       mark_merged, open_queue, upsert_results)
+
+if TYPE_CHECKING:
+    import sqlite3
+
+    from bs4 import BeautifulSoup
+    from requests import Session
+    from selenium.webdriver import Chrome
 
 
-# Read configuration file
-
-with open('config.json') as config:
-    config = json.load(config)
-
 # Constants
 
 CSV_FIELDS = ['parser_id', 'chain_id', 'tt_id', 'tt_region', 'tt_name',
@@ -68,6 +97,19 @@ PARAMS = {'brand': 'sku_brand', 'country_of_manufacture': 'sku_country',
           'volume_unit': 'sku_volume_min',
           'quantity_in_package': 'sku_quantity_min', 'at_pack': 'sku_package'}
 
+# Fields of product which do not depend on store and time
+STATIC_FIELDS = ['sku_category', 'sku_weight_min', 'sku_weight_max',
+                 'sku_volume_min', 'sku_volume_max', 'sku_quantity_min',
+                 'sku_quantity_max', 'sku_packed', 'sku_package', 'sku_brand',
+                 'sku_country', 'sku_manufacturer', 'sku_parameters_json',
+                 'sku_images', 'dev_info']
+
+# Keys of product card in category page state with availability
+AVAILABILITY_KEYS = ['isAvailable', 'available', 'inStock']
+
+# Number of pages per tab loaded between checks of browser
+TABS_BATCH = 10
+
 
 # Functions
 
@@ -159,11 +201,9 @@ def fill_common_informations(result: dict, product_link: str,) -> None:
     """ Function to write common information for 1 product """
 
     try:
-        result[product_link]['parser_id'] = config.get('parser_id', 'mc_test')
-        result[product_link]['chain_id'] = config.get('chain_id', '113')
-        result[product_link]['tt_region'] = REGIONS[config.get(
-                                                        'tt_region', 'msk'
-                                                        )]
+        result[product_link]['parser_id'] = config.parser_id
+        result[product_link]['chain_id'] = config.chain_id
+        result[product_link]['tt_region'] = REGIONS[config.tt_region]
         result[product_link]['server_ip'] = '127.0.0.1'
         result[product_link]['promodata'] = 'promodata'
 
@@ -171,11 +211,24 @@ def fill_common_informations(result: dict, product_link: str,) -> None:
         raise FillCommonInfoFailed(product_link) from e
 
 
+def fill_store_informations(result: dict, link: str, tt: str) -> None:
+    """ Function to write information about store and time for 1 product """
+
+    result[link]['sku_link'] = '{}{}'.format(config.base_url, link)
+    result[link]['tt_id'] = tt
+
+    result[link]['tt_name'] = correct_str(
+                '{} ({})'.format(config.chain_name, tt))
+
+    created = datetime.now()
+    result[link]['price_datetime'] = created.strftime('%Y-%m-%d %H:%M:%S')
+
+
 def check_sku_images(soup: BeautifulSoup, result: dict, link: str) -> None:
     """ Function for checking sku image flag and writing image """
 
     try:
-        if config.get('sku_images_enable', 'true').lower() == 'true':
+        if config.sku_images_enable:
             if soup.find('img', class_='c1uCMShdi'):
                 result[link]['sku_images'] = soup.find('img',
                                                        class_='c1uCMShdi'
@@ -235,7 +288,7 @@ def fill_sku_parameters(res: dict, link: str, product: dict) -> None:
             else:
                 assert False, 'Unknown typename'
 
-            if config.get('sku_parameters_enable', 'true').lower() == 'true':
+            if config.sku_parameters_enable:
                 for param in PARAMS:
                     if prop['property']['name'] == param:
                         if prop['__typename'] == 'ItemOfListPropertyValue':
@@ -298,6 +351,18 @@ def convert_weight_volume(res: dict, link: str, *, param: dict) -> None:
         raise ConvertWeightVolumeFailed(link, name, value) from e
 
 
+def fill_prices(res: dict, link: str, product: dict) -> None:
+    """ Function for writing prices of product (from product page
+    or from product card of category page) to common dictionary """
+
+    if product['previousPrice']:
+        if product['previousPrice'] > product['price']:
+            res[link]['price'] = correct_number(product['previousPrice'])
+            res[link]['price_promo'] = correct_number(product['price'])
+    else:
+        res[link]['price'] = correct_number(product['price'])
+
+
 def parse_product_info_from_json(res: dict, link: str, product: dict) -> None:
     """ Function for parsing information about product from
     JSON <script> and writing info to common dictionary """
@@ -306,12 +371,7 @@ def parse_product_info_from_json(res: dict, link: str, product: dict) -> None:
         res[link]['source_sku_code'] = product['id']
         res[link]['sku_name'] = correct_str(product['name'])
 
-        if product['previousPrice']:
-            if product['previousPrice'] > product['price']:
-                res[link]['price'] = correct_number(product['previousPrice'])
-                res[link]['price_promo'] = correct_number(product['price'])
-        else:
-            res[link]['price'] = correct_number(product['price'])
+        fill_prices(res, link, product)
 
         if product['categories']:
             res[link]['sku_category'] = correct_str(
@@ -339,54 +399,337 @@ def parse_product_info_from_json(res: dict, link: str, product: dict) -> None:
         raise ParseProductFromJsonFailed(link) from e
 
 
-def parse_prods_links(browser: Chrome, urls: list, res: dict, tt: str) -> None:
-    """ Function for parsing info about products of 1 category """
+def get_initial_state(soup: BeautifulSoup) -> dict:
+    """ Function for getting JSON state of page from <script> """
+
+    tag = soup.find('script', charset='UTF-8')
+
+    # delete 'window.__INITIAL_STATE__=' at the start
+    # and ';' at the end
+    return json.loads(tag.string[25:-1])
+
+
+def create_cache_stats() -> dict:
+    """ Function for creating counters of products deduplication """
+
+    return {'links': 0, 'duplicates': 0, 'cache_hits': 0, 'cache_misses': 0,
+            'errors': 0}
+
+
+def fill_product_from_cache(res: dict, link: str, product: dict,
+                            static: dict, tt: str) -> None:
+    """ Function for writing product from known static attributes,
+    only name, prices and stock are taken from product data
+    (product page or card of category page) """
 
     try:
-        for link in urls:
-            get_link(browser, '{}{}'.format(config[('base_url')], link))
+        res[link] = dict(static)
+        fill_common_informations(res, link)
+        fill_store_informations(res, link, tt)
+
+        res[link]['source_sku_code'] = product['id']
+        res[link]['sku_name'] = correct_str(product['name'])
+        fill_prices(res, link, {'price': product['price'],
+                                'previousPrice': product.get('previousPrice')})
 
-            html = browser.page_source
-            soup = BeautifulSoup(html, 'lxml')
+        available = True
+        for key in AVAILABILITY_KEYS:
+            if key in product:
+                available = bool(product[key])
+                break
+        res[link]['sku_status'] = 1 if available else 0
 
-            res[link] = {}
-            fill_common_informations(res, link)
-            res[link]['sku_link'] = '{}{}'.format(config['base_url'], link)
-            res[link]['tt_id'] = tt
+    except Exception as e:
+        raise FillProductFromCacheFailed(link) from e
+
+
+def load_products_pages(browser: Chrome,
+                        links: list) -> Iterator[Tuple[str, str]]:
+    """ Function for loading products pages one by one or
+    in several tabs of browser (pairs (link, HTML-page) are returned,
+    HTML-page is None if page is not loaded) """
+
+    count = config.browser_tabs
+    if count > 1:
+        # browser is recycled only between batches of tabs
+        size = count * TABS_BATCH
+        for start in range(0, len(links), size):
+            maintain_browser(browser, 'products')
+            urls = {'{}{}'.format(config.base_url, link): link
+                    for link in links[start:start + size]}
+            for url, html in load_pages_in_tabs(browser, list(urls), count):
+                count_page(browser)
+                yield urls[url], html
+    else:
+        for link in links:
+            maintain_browser(browser, 'products')
+            try:
+                get_link(browser, '{}{}'.format(config.base_url, link))
+            except LoadPageFailed:
+                yield link, None
+                continue
+            yield link, browser.page_source
 
-            res[link]['tt_name'] = correct_str(
-                        '{} ({})'.format(config.get('chain_name', 'Ярче'), tt))
 
-            created = datetime.now()
-            res[link]['price_datetime'] = created.strftime('%Y-%m-%d %H:%M:%S')
+def quarantine_product(link: str, tt: str, error: Exception) -> None:
+    """ Function for writing failed product to quarantine file
+    (JSON lines) for later reparsing """
 
-            check_sku_images(soup, res, link)
+    logs_dir = config.logs_dir
+    if not os.path.exists(logs_dir):
+        os.mkdir(logs_dir)
 
-            div_sku_status = soup.find('div', class_='q1a5cSewj')
-            if div_sku_status.find('div', text='Нет в наличии'):
-                res[link]['sku_status'] = 0
-            else:
-                res[link]['sku_status'] = 1
+    name = config.quarantine_file
+    record = {'datetime': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+              'tt_id': tt, 'link': link, 'error': type(error).__name__,
+              'message': shorten(error, 1000)}
+    with open(f'{logs_dir}/{name}', 'a', encoding='utf-8') as f:
+        f.write(json.dumps(record, ensure_ascii=False) + '\n')
 
-            check_bags(res, link)
 
-            tag = soup.find('script', charset='UTF-8')
+def handle_product_error(link: str, tt: str, error: Exception,
+                         stats: dict, errors: dict) -> None:
+    """ Function for isolating failed product: product is quarantined,
+    parsing is stopped only if error budget of run is exceeded """
 
-            # delete 'window.__INITIAL_STATE__=' at the start
-            # and ';' at the end
-            api = json.loads(tag.string[25:-1])
+    quarantine_product(link, tt, error)
+    stats['errors'] += 1
+    errors['products'] += 1
 
-            product = api['api']['product']['data']
-            parse_product_info_from_json(res, link, product)
+    budget = config.error_budget
+    if errors['products'] > budget:
+        raise ErrorBudgetExceeded(budget, link) from error
+
+
+def parse_product_page(html: str, link: str, res: dict, tt: str,
+                       cache: dict, stats: dict) -> None:
+    """ Function for parsing info about 1 product from product page """
+
+    from bs4 import BeautifulSoup
+
+    if html is None:
+        raise LoadPageFailed(link, config.max_retries)
+
+    soup = BeautifulSoup(html, 'lxml')
+
+    api = get_initial_state(soup)
+    product = api['api']['product']['data']
+
+    div_sku_status = soup.find('div', class_='q1a5cSewj')
+    if div_sku_status.find('div', text='Нет в наличии'):
+        sku_status = 0
+    else:
+        sku_status = 1
+
+    static = cache.get(str(product['id']))
+    if static is not None:
+        stats['cache_hits'] += 1
+        fill_product_from_cache(res, link, product, static, tt)
+        res[link]['sku_status'] = sku_status
+        return
+
+    stats['cache_misses'] += 1
+
+    res[link] = {}
+    fill_common_informations(res, link)
+    fill_store_informations(res, link, tt)
+
+    check_sku_images(soup, res, link)
+
+    res[link]['sku_status'] = sku_status
+
+    check_bags(res, link)
+
+    parse_product_info_from_json(res, link, product)
+
+    update_static_cache(cache, res, [link])
+
+
+def parse_prods_links(browser: Chrome, urls: list, res: dict, tt: str,
+                      cache: dict = None, stats: dict = None,
+                      errors: dict = None) -> None:
+    """ Function for parsing info about products of 1 category
+    (every link is loaded once per store, static attributes of products
+    from cache are not parsed again, failed products are quarantined) """
+
+    if cache is None:
+        cache = {}
+    if stats is None:
+        stats = create_cache_stats()
+    if errors is None:
+        errors = {'products': 0}
+
+    link = None
+    try:
+        new_links = []
+        seen = set()
+        for link in urls:
+            stats['links'] += 1
+
+            # product is already parsed from another category
+            if link in res or link in seen:
+                stats['duplicates'] += 1
+            else:
+                new_links.append(link)
+                seen.add(link)
+
+        for link, html in load_products_pages(browser, new_links):
+            try:
+                # time of browser is outside, time of parsing HTML inside
+                with stage('parse_product'):
+                    parse_product_page(html, link, res, tt, cache, stats)
+            except Exception as e:
+                res.pop(link, None)
+                handle_product_error(link, tt, e, stats, errors)
+                continue
+
+            getLogger(__name__).debug(f'Product "{link}" is parsed.',
+                                      extra={'sampled': True})
 
     except Exception as e:
         raise ParseProductsFromCategory(urls, link) from e
 
 
-def get_products_links_from_category(browser: Chrome, url: str) -> list:
-    """ Function for getting products from category HTML-page"""
+def extract_products_links(soup: BeautifulSoup,
+                           promo_only: bool = None) -> list:
+    """ Function for extracting products links from category HTML-page
+    (only promo products if promo_only, by default - from config) """
+
+    if promo_only is None:
+        promo_only = config.promo_only
+
+    # In order not to take products not from the category
+    rubric_all_products = soup.find('div', class_='k30d0QKVw')
+    if not rubric_all_products:
+        return []
+    products = rubric_all_products.findAll('div', class_='c3s8K6a5X')
+
+    if promo_only:
+        promo_class = 'e10FT7BLs a3blieLf1 m3blieLf1'
+        promo_products = [product for product in products
+                          if product.find('div', class_=promo_class)]
+        products = promo_products
+
+    a_links_products = [prod.find('a', class_='g2mGXj5-x')
+                        for prod in products]
+    pure_links_products = [a['href'] for a in a_links_products]
+
+    return pure_links_products
+
+
+def find_listing_products(state: Union[dict, list]) -> list:
+    """ Function for searching product cards in JSON state
+    of category page """
+
+    cards = []
+    if isinstance(state, dict):
+        if all(key in state for key in ('id', 'code', 'name', 'price')):
+            return [state]
+        for value in state.values():
+            cards.extend(find_listing_products(value))
+    elif isinstance(state, list):
+        for value in state:
+            cards.extend(find_listing_products(value))
+    return cards
+
+
+def extract_listing_cards(soup: BeautifulSoup, cards: dict) -> None:
+    """ Function for writing product cards of category page
+    to dictionary (keys - products links) """
 
     try:
+        state = get_initial_state(soup)
+    except Exception:
+        return
+
+    for card in find_listing_products(state):
+        cards['/product/{}-{}'.format(card['code'], card['id'])] = card
+
+
+def get_category_page_url(url: str, page: int) -> str:
+    """ Function for building URL of category page with number """
+
+    if page == 1:
+        return url
+
+    page_param = config.page_param
+    separator = '&' if '?' in url else '?'
+    return f'{url}{separator}{page_param}={page}'
+
+
+def get_products_links_by_pages(session: Session, url: str,
+                                cards: dict = None) -> list:
+    """ Function for getting products from category by page numbers
+    (pages are loaded concurrently and merged in order, absent page,
+    empty page or repeated last page is end of category) """
+
+    from bs4 import BeautifulSoup
+
+    workers = config.pagination_workers
+    links = []
+    seen = set()
+    page = 1
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        while True:
+            pages = range(page, page + workers)
+            htmls = executor.map(
+                lambda p: get_html(session, get_category_page_url(url, p),
+                                   missing_ok=True),
+                pages)
+
+            finished = False
+            for html in htmls:
+                # site answers 404 to page after last one
+                if html is None:
+                    finished = True
+                    break
+
+                soup = BeautifulSoup(html, 'lxml')
+                if cards is not None:
+                    extract_listing_cards(soup, cards)
+                # end of category is checked by all products of page,
+                # page can have no promo products
+                page_links = [link for link in
+                              extract_products_links(soup, promo_only=False)
+                              if link not in seen]
+
+                # empty page or repeated last page - end of category
+                if not page_links:
+                    finished = True
+                    break
+
+                seen.update(page_links)
+                if config.promo_only:
+                    promo = set(extract_products_links(soup))
+                    page_links = [link for link in page_links
+                                  if link in promo]
+                links.extend(page_links)
+
+            if finished:
+                return links
+
+            page += workers
+
+
+def get_products_links_from_category(browser: Chrome, url: str,
+                                     session: Session = None,
+                                     cards: dict = None) -> list:
+    """ Function for getting products from category HTML-page
+    (if cards is given, product cards of category are written to it) """
+
+    from bs4 import BeautifulSoup
+    from selenium.webdriver.common.action_chains import ActionChains
+
+    try:
+        # only promo products are requested from site
+        if config.promo_only and config.promo_filter:
+            separator = '&' if '?' in url else '?'
+            url = f'{url}{separator}{config.promo_filter}'
+
+        if session is not None:
+            return get_products_links_by_pages(session, url, cards)
+
         get_link(browser, url)
         try:
             show = browser.find_element_by_xpath(
@@ -406,185 +749,826 @@ def get_products_links_from_category(browser: Chrome, url: str) -> list:
         html = browser.page_source
         soup = BeautifulSoup(html, 'lxml')
 
-        # In order not to take products not from the category
-        rubric_all_products = soup.find('div', class_='k30d0QKVw')
-        products = rubric_all_products.findAll('div', class_='c3s8K6a5X')
-
-        if config.get('promo_only', 'false').lower() == 'true':
-            promo_class = 'e10FT7BLs a3blieLf1 m3blieLf1'
-            promo_products = [product for product in products
-                              if product.find('div', class_=promo_class)]
-            products = promo_products
+        # state of page contains only cards of first page
+        if cards is not None:
+            extract_listing_cards(soup, cards)
 
-        a_links_products = [prod.find('a', class_='g2mGXj5-x')
-                            for prod in products]
-        pure_links_products = [a['href'] for a in a_links_products]
-
-        return pure_links_products
+        return extract_products_links(soup)
 
     except Exception as e:
         raise GetProductsLinksFromCategory(url) from e
 
 
-def create_zip_archive(archive_name: str, csv_name: str) -> None:
-    """ Function to create archive and add to it csv files """
+def load_static_cache(path: str) -> dict:
+    """ Function for loading static attributes of products
+    (keys - source_sku_code) """
+
+    if not os.path.exists(path):
+        return {}
+
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_static_cache(path: str, cache: dict) -> None:
+    """ Function for saving static attributes of products """
 
     try:
-        with zipfile.ZipFile(archive_name, mode='w',
-                             compression=zipfile.ZIP_DEFLATED) as zf:
-            zf.write(csv_name)
+        dir = os.path.dirname(path)
+        if dir and not os.path.exists(dir):
+            os.makedirs(dir)
+
+        with open(f'{path}.tmp', 'w', encoding='utf-8') as f:
+            json.dump(cache, f, ensure_ascii=False)
+        os.replace(f'{path}.tmp', path)
+
     except Exception as e:
-        raise CreateZIPArchiveFailed(archive_name, csv_name) from e
+        raise SaveStaticCacheFailed(path) from e
 
 
-def send_archive(name_archive: str, csv_name: str, tt_id: str) -> None:
-    """ Function to send archive by mail """
+def update_static_cache(cache: dict, products: dict, links: list) -> None:
+    """ Function for writing static attributes of parsed products to cache """
 
-    try:
-        sender = config['email_from']['login']
-        sender_password = config['email_from']['password']
-        receivers = config['emails_to']
+    for link in links:
+        prod = products[link]
+        cache[str(prod['source_sku_code'])] = {
+            field: prod[field] for field in STATIC_FIELDS if field in prod}
+
+
+def parse_listing_prods(browser: Chrome, links: list, cards: dict,
+                        cache: dict, res: dict, tt: str, stats: dict,
+                        errors: dict) -> None:
+    """ Function for parsing products of 1 category from product cards,
+    product pages are visited only for unknown products """
+
+    unknown_links = []
+    for link in links:
+        card = cards.get(link)
+        if link in res or not card or str(card['id']) not in cache:
+            unknown_links.append(link)
+            continue
 
-        smtp = smtplib.SMTP_SSL(config['email_from']['smtp'], 465)
-        smtp.login(sender, sender_password)
+        stats['links'] += 1
+        stats['cache_hits'] += 1
+        try:
+            fill_product_from_cache(res, link, card,
+                                    cache[str(card['id'])], tt)
+        except FillProductFromCacheFailed as e:
+            res.pop(link, None)
+            handle_product_error(link, tt, e, stats, errors)
 
-        for receiver in receivers:
-            name = config['chain_name']
-            region = REGIONS[config.get('tt_region', 'msk')]
-            created = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    if unknown_links:
+        parse_prods_links(browser, unknown_links, res, tt, cache, stats,
+                          errors)
 
-            subject = f'{name} | app | {region} | {tt_id} | pd_all | {created}'
-            msg = MIMEMultipart()
-            msg['From'] = sender
-            msg['To'] = receiver
-            msg['Subject'] = subject
 
-            basename = os.path.basename(name_archive)
-            with open(basename, "rb") as f:
-                part = MIMEApplication(
-                    f.read(),
-                    Name=basename
-                )
-            part['Content-Disposition'] = f'attachment; filename="{basename}"'
-            msg.attach(part)
+def send_archive(mailer: dict, path_archive: str, tt_id: str) -> None:
+    """ Function to send archive by mail (archive is queued
+    and sent to all receivers by background mailer) """
 
-            smtp.sendmail(sender, receiver, msg.as_string())
+    try:
+        name = config.chain_name
+        region = REGIONS[config.tt_region]
+        created = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
 
-        os.remove(csv_name)
-        os.remove(name_archive)
+        kind = 'pd_delta' if '_pd_delta_' in path_archive else 'pd_all'
 
-        smtp.close()
+        subject = f'{name} | app | {region} | {tt_id} | {kind} | {created}'
+        enqueue_archive(mailer, path_archive, subject, tt_id)
 
     except Exception as e:
-        raise SendZIPArchiveFailed(name_archive, csv_name, tt_id) from e
+        raise SendZIPArchiveFailed(path_archive, tt_id) from e
 
 
-def write_products_csv(dir: str, name: str, products: dict) -> None:
-    """ Function to write info about products to .csv file """
+def products_rows(products: dict,
+                  fields: list = CSV_FIELDS) -> Iterator[list]:
+    """ Function for getting rows of .csv file from products """
+
+    for _, prod in products.items():
+        yield [prod[f] if prod.get(f, '') else '' for f in fields]
 
-    try:
-        if not os.path.exists(dir):
-            os.mkdir(dir)
 
-        with open(f'{dir}/{name}', 'w', newline='', encoding='utf-8') as f:
+def write_products_csv(dir: str, name: str, products: dict,
+                       fields: list = CSV_FIELDS) -> dict:
+    """ Function to write info about products to .csv file, file is
+    compressed while rows are written (codec - archive_codec from config),
+    statistics of writing are returned (path of archive, sizes, time) """
+
+    stats = {}
+    prod = None
+    try:
+        with open_archive_stream(dir, name, stats) as f:
             writer = csv.writer(f, delimiter=';', )
-            writer.writerow(CSV_FIELDS)
+            writer.writerow(fields)
+
+            for prod in products_rows(products, fields):
+                writer.writerow(prod)
 
-            for _, prod in products.items():
-                values = [prod[f] if prod.get(f, '') else ''
-                          for f in CSV_FIELDS]
-                writer.writerow(values)
+        return stats
 
     except Exception as e:
         raise WriteProductsToCsvFailed(dir, name, products, prod) from e
 
 
-def parse_prods(browser: Chrome, cats: list, logger: Logger, tt: str) -> str:
-    """ Function for parsing information about all relevant products """
+def write_part(dir: str, name: str, products: dict,
+               fields: list = CSV_FIELDS) -> dict:
+    """ Function for writing part of products in archive stage: archive
+    of .csv file and, if parquet_enable, .parquet file with the same rows
+    (row groups are written one by one), statistics of archive
+    are returned """
+
+    stats = write_products_csv(dir, name, products, fields)
+    if config.parquet_enable:
+        name_parquet = '{}.parquet'.format(os.path.splitext(name)[0])
+        write_products_parquet(dir, name_parquet, products.values(), fields)
+    return stats
+
+
+def prepare_part(products: dict) -> None:
+    """ Function for preparing part in archive stage before writing:
+    images of products are harvested outside of scraping thread
+    (in main process, so index of images is shared by all parts) """
+
+    harvest = get_harvest()
+    if harvest is not None and products:
+        harvest_images(harvest, products)
+
+
+def create_parts(tt: str, pipeline: dict, partial: bool = False) -> dict:
+    """ Function for creating state of splitting products of store
+    to parts p1..pN (parts are passed to archive stage of pipeline,
+    delta - comparing with previous run if delta output is enabled,
+    partial - only some categories of store are parsed) """
+
+    delta = None
+    if config.delta_enable:
+        # snapshot of previous parsing of store is saved after its parts
+        wait_parts(pipeline, tt)
+        delta = create_delta(tt, partial)
+
+    # pending - rows not written to parts yet, bytes - their size
+    return {'tt': tt, 'pipeline': pipeline, 'number': 0, 'written': 0,
+            'pending': {}, 'bytes': 0, 'delta': delta,
+            'created': datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}
+
+
+def get_part_name(parts: dict) -> str:
+    """ Function for getting name of .csv file of next part """
+
+    region = config.tt_region
+    tt = parts['tt']
+    created = parts['created']
+
+    if is_splitting_enabled():
+        p = 'p{}'.format(parts['number'] + 1)
+    else:
+        p = config.part_number
+
+    # parts of the same store are written by several processes
+    if config.shard_count > 1:
+        p = '{}s{}'.format(p, config.shard_index + 1)
+
+    delta = parts['delta']
+    kind = 'pd_delta' if delta is not None and not delta['full'] else 'pd_all'
+
+    return f'yarche_app_{region}_{tt}_{p}_{kind}_{created}.csv'
+
+
+def get_csv_fields() -> list:
+    """ Function for getting columns of .csv file
+    (keys of downloaded images are added if images are harvested) """
+
+    if config.images_enable:
+        return CSV_FIELDS + ['sku_images_keys']
+    return CSV_FIELDS
+
+
+def is_splitting_enabled() -> bool:
+    """ Function for checking limits of part in config """
+
+    return bool(config.part_max_rows or
+                config.part_max_bytes)
+
+
+def estimate_row_bytes(prod: dict, fields: list = CSV_FIELDS) -> int:
+    """ Function for estimating size of row of .csv file """
+
+    return sum(len(str(prod[f]).encode('utf-8')) + 1
+               for f in fields if prod.get(f, ''))
+
+
+def take_chunk(parts: dict, fields: list) -> dict:
+    """ Function for taking first pending rows within limits of part
+    (at least 1 row, rest of rows stays pending) """
+
+    max_rows = config.part_max_rows
+    max_bytes = config.part_max_bytes
+    pending = parts['pending']
+
+    chunk = {}
+    size = 0
+    for link, prod in pending.items():
+        row = estimate_row_bytes(prod, fields)
+        if chunk and ((max_rows and len(chunk) >= max_rows) or
+                      (max_bytes and size + row > max_bytes)):
+            break
+        chunk[link] = prod
+        size += row
+
+    for link in chunk:
+        del pending[link]
+    parts['bytes'] -= size
+    return chunk
+
+
+def flush_part(parts: dict, products: dict, final: bool = False) -> None:
+    """ Function for writing not written products to new parts of at most
+    part_max_rows rows and part_max_bytes bytes (rows over limits wait
+    for next call, all rows are written if it is final part of store) """
+
+    new_products = dict(islice(products.items(), parts['written'], None))
+    parts['written'] = len(products)
+
+    fields = get_csv_fields()
+    delta = parts['delta']
+    if delta is not None:
+        new_products = mark_changes(delta, new_products, fields)
+        fields = fields + ['change_type']
+        if final:
+            new_products.update(get_removed_products(delta))
+
+    pending = parts['pending']
+    for link, prod in new_products.items():
+        pending[link] = prod
+        parts['bytes'] += estimate_row_bytes(prod, fields)
+
+    max_rows = config.part_max_rows
+    max_bytes = config.part_max_bytes
+    dir = config.output_directory
+
+    while pending and (final or
+                       (max_rows and len(pending) >= max_rows) or
+                       (max_bytes and parts['bytes'] >= max_bytes)):
+        chunk = take_chunk(parts, fields)
+        name_csv = get_part_name(parts)
+        put_part(parts['pipeline'], parts['tt'], dir, name_csv, chunk,
+                 fields)
+        parts['number'] += 1
+
+    # store without changes (or products) gets part with header only,
+    # so run without changes differs from failed run
+    if final and not parts['number']:
+        name_csv = get_part_name(parts)
+        put_part(parts['pipeline'], parts['tt'], dir, name_csv, {}, fields)
+        parts['number'] += 1
+        getLogger(__name__).info(f'Store "{parts["tt"]}" has no changes, '
+                                 f'part "{name_csv}" has header only.')
+
+
+def parse_prods(browser: Chrome, cats: list, logger: Logger, tt: str,
+                cache: dict, errors: dict, pipeline: dict,
+                history: sqlite3.Connection = None,
+                schedule: dict = None, timings: dict = None) -> int:
+    """ Function for parsing information about all relevant products
+    (cache - static attributes of products shared between stores,
+    errors - counter of failed products of run, pipeline - stages
+    archiving and sending parts of .csv file, history - database
+    of prices, schedule - changes of categories in daemon mode,
+    timings - durations of categories for planner),
+    number of parts is returned """
 
     try:
-        # Confirm cookies breaks pressing on button
-        try:
-            cookie = browser.find_element_by_xpath(
-                                "//button[@class='aJ8u8iEK8']")
-            cookie.click()
-        except Exception:
-            cookie = None
+        # banner of cookies breaks pressing on button
+        confirm_cookies(browser)
 
         products = {}
 
+        # 'pages' - category pages are loaded by number without browser
+        if config.pagination_mode == 'pages':
+            session = create_session(browser)
+        else:
+            session = None
+
+        # prices and stock are taken from category pages (promo products
+        # of category page have promo prices)
+        listing_only = config.listing_only or config.promo_only
+        stats = create_cache_stats()
+        partial = schedule is not None or config.shard_count > 1
+        parts = create_parts(tt, pipeline, partial)
+
+        # category_url - category in work (None - error is not in category),
+        # empty - categories without products links
+        category_url = None
+        empty = 0
         for category_url in cats:
-            url = '{}{}'.format(config['base_url'], category_url)
-            products_links = get_products_links_from_category(browser, url)
+            maintain_browser(browser, 'category')
+            started = time.monotonic()
+            url = '{}{}'.format(config.base_url, category_url)
+            cards = {} if listing_only else None
+            with stage('category_links'):
+                products_links = get_products_links_from_category(
+                                        browser, url, session, cards)
             if not products_links:
                 logger.error(f'Неудачная попытка спарсить продукты с "{url}"')
+                empty += 1
                 continue
 
-            parse_prods_links(browser, products_links, products, tt)
+            with stage('product_pages'):
+                if listing_only:
+                    parse_listing_prods(browser, products_links, cards,
+                                        cache, products, tt, stats, errors)
+                else:
+                    parse_prods_links(browser, products_links, products, tt,
+                                      cache, stats, errors)
+
+            if timings is not None:
+                record_category(timings, tt, category_url,
+                                len(products_links),
+                                time.monotonic() - started)
+
+            if schedule is not None:
+                record_refresh(schedule, tt, category_url,
+                               [products[link] for link in products_links
+                                if link in products])
+
+            # ready parts are sent while next categories are parsed
+            with stage('flush_part'):
+                flush_part(parts, products)
+        category_url = None
+
+        logger.info('Products links: {links}, duplicates: {duplicates}, '
+                    'static cache hits: {cache_hits}, '
+                    'misses: {cache_misses}.'.format(**stats))
+        if stats['errors']:
+            logger.error('{} products failed and are written to quarantine '
+                         'file.'.format(stats['errors']))
+
+        if listing_only:
+            save_static_cache(config.static_cache,
+                              cache)
+
+        # products of failed categories and products are not removed
+        complete = not empty and not stats['errors']
+        with stage('finish_store'):
+            return finish_store(parts, products, logger, history, complete)
 
-        dir = config.get('output_directory', 'out')
-        created = datetime.now().strftime('%Y-%m-%d_%H-%M-%S')
-        region = config.get('tt_region', 'msk')
-        p = config.get('part_number', 'p1')
+    except Exception as e:
+        raise ParseProductsFailed(cats, tt, category_url) from e
 
-        name_csv = f'yarche_app_{region}_{tt}_{p}_pd_all_{created}.csv'
-        write_products_csv(dir, name_csv, products)
-        copyfile(f'{dir}/{name_csv}', name_csv)
 
-        return name_csv
+def finish_store(parts: dict, products: dict, logger: Logger,
+                 history: sqlite3.Connection = None,
+                 complete: bool = True) -> int:
+    """ Function for writing last part of store and history of prices
+    (complete - all categories
+    and products of store are parsed, otherwise products absent in run
+    are not removed from delta), number of parts is returned """
 
-    except Exception as e:
-        raise ParseProductsFailed(cats, tt) from e
+    tt = parts['tt']
+    delta = parts['delta']
+    if delta is not None and not complete:
+        logger.warning(f'Some products of "{tt}" failed, removed products '
+                       f'are not written.')
+        mark_partial(delta)
+
+    flush_part(parts, products, final=True)
+
+    # snapshot is saved only if all parts of store are archived,
+    # otherwise changes are written again in next run; images are
+    # harvested in archive stage, so index is saved after parts too
+    harvest = get_harvest()
+
+    def save_results() -> None:
+        if delta is not None:
+            finish_delta(delta)
+        if harvest is not None:
+            save_images_index(harvest)
+            logger.info(describe_harvest(harvest))
+
+    if delta is not None or harvest is not None:
+        after_parts(parts['pipeline'], tt, save_results)
+
+    if history is not None:
+        rows = write_history(history, products.values())
+        logger.info(f'{rows} products are writed to history.')
+
+    return parts['number']
+
+
+def open_store(browser: Chrome, logger: Logger, tt_id: str) -> list:
+    """ Function for specifying location of store on site,
+    categories of store for parsing are returned """
+
+    with stage('open_store'):
+        get_link(browser, config.base_url)
+
+        logger.info('Page "{}" is loaded successfully.'.format(
+                                                    config.base_url))
+
+        specify_address(browser, tt_id)
+        # location is specified again if browser is recycled
+        browser.store = tt_id
+
+        logger.info(f'Location "{tt_id}" specifies successfully.')
+        maintain_browser(browser, 'store')
+
+        categories_from_config = config.categories[tt_id]
+        return check_categories(browser, logger,
+                                list(categories_from_config))
+
+
+def save_daemon_state(logger: Logger, schedule: dict,
+                      timings: dict = None) -> None:
+    """ Function for saving schedule of daemon and timings of refreshed
+    categories (failed saving is logged, daemon keeps working and state
+    is saved again after next refresh) """
+
+    try:
+        save_schedule(config.daemon_schedule_file, schedule)
+        if timings is not None:
+            save_timings(config.planner_file, timings)
+    except (SaveScheduleFailed, SaveTimingsFailed):
+        logger.exception('Saving state of daemon failed, it is saved again '
+                         'after next refresh!')
+
+
+def run_daemon(browser: Chrome, logger: Logger, cache: dict, errors: dict,
+               pipeline: dict, history: sqlite3.Connection = None) -> None:
+    """ Function for refreshing categories of stores by schedule
+    until interruption (volatile categories are refreshed more often,
+    requests are limited by budget per hour, failed refreshes are
+    logged and failed categories are backed off) """
+
+    schedule = load_schedule(config.daemon_schedule_file)
+
+    # numbers of products of planner estimate cost of new categories
+    timings = load_timings(config.planner_file)
+
+    # categories of stores are checked again after max interval
+    stores = {}
+    current = None
+
+    try:
+        while True:
+            refreshed = 0
+            for tt_id in config.tt_id:
+                now = time.time()
+                checked, cats = stores.get(tt_id, (0, []))
+                try:
+                    if now - checked > config.daemon_max_interval_s:
+                        current = None
+                        cats = open_store(browser, logger, tt_id)
+                        stores[tt_id] = (now, cats)
+                        current = tt_id
+
+                    due = select_due_categories(schedule, tt_id, cats, now,
+                                                timings)
+                    if not due:
+                        continue
+
+                    if current != tt_id:
+                        current = None
+                        open_store(browser, logger, tt_id)
+                        current = tt_id
+
+                except ParserException:
+                    logger.exception(f'Opening of store "{tt_id}" failed, '
+                                     f'store is opened again on next tick!')
+                    continue
+
+                # states are restored if refresh fails, because products
+                # of refreshed categories are not written
+                states = {url: dict(get_category_state(schedule, tt_id, url))
+                          for url in due}
+
+                # error budget is counted per refresh
+                errors['products'] = 0
+                try:
+                    number = parse_prods(browser, due, logger, tt_id, cache,
+                                         errors, pipeline, history, schedule,
+                                         timings)
+                except ParseProductsFailed as e:
+                    logger.exception(f'Refresh of "{tt_id}" failed!')
+                    for url, state in states.items():
+                        schedule['categories'][f'{tt_id}|{url}'] = state
+                    if e.category is not None:
+                        retry_at = record_failure(schedule, tt_id,
+                                                  e.category)
+                        logger.warning(
+                            f'Category "{e.category}" of "{tt_id}" is '
+                            f'retried after {retry_at - now:.0f} s.')
+                    # page of browser is unknown after error
+                    current = None
+                    save_daemon_state(logger, schedule)
+                    continue
+
+                save_daemon_state(logger, schedule, timings)
+                refreshed += len(due)
+
+                logger.info(f'{len(due)} categories of "{tt_id}" are '
+                            f'refreshed, {number} parts are queued for '
+                            f'archiving.')
+
+            if not refreshed:
+                time.sleep(config.daemon_tick_s)
+
+    except KeyboardInterrupt:
+        logger.info('Daemon is stopped.')
+        save_daemon_state(logger, schedule)
+
+
+def create_executor() -> Executor:
+    """ Function for creating executor compressing parts of .csv file
+    in worker processes (part_workers 0 - in main process) """
+
+    workers = config.part_workers
+    if workers:
+        return ProcessPoolExecutor(max_workers=workers)
+    return InlineExecutor()
+
+
+def process_jobs(browser: Chrome, logger: Logger, conn: sqlite3.Connection,
+                 run_id: str, owner: str, cache: dict,
+                 timings: dict) -> None:
+    """ Function for leasing and processing jobs of work queue until
+    all jobs of run are finished (by this or other workers) """
+
+    # categories of opened stores
+    stores = {}
+    current = None
+    session = None
+
+    while True:
+        jobs = lease_jobs(conn, run_id, owner, config.queue_batch_size)
+        if not jobs:
+            counts = count_jobs(conn, run_id)
+            if counts['pending'] or counts['leased'] or counts['expired']:
+                time.sleep(config.queue_tick_s)
+                continue
+            return
+
+        tt = jobs[0]['tt_id']
+        kind = jobs[0]['kind']
+        maintain_browser(browser, kind)
+
+        # location of browser is changed only for jobs of another store
+        if current != tt:
+            stores[tt] = open_store(browser, logger, tt)
+            current = tt
+            session = None
+
+        if kind == 'store':
+            # long categories are leased first
+            cats = stores[tt]
+            for url in cats:
+                add_jobs(conn, run_id, 'category', tt, [url],
+                         estimate_category(timings, tt, url))
+            complete_jobs(conn, jobs)
+            logger.info(f'{len(cats)} categories of "{tt}" are queued.')
+
+        elif kind == 'category':
+            if config.pagination_mode == 'pages' and session is None:
+                session = create_session(browser)
+
+            for job in jobs:
+                url = '{}{}'.format(config.base_url, job['target'])
+                try:
+                    links = get_products_links_from_category(browser, url,
+                                                             session)
+                except Exception as e:
+                    logger.exception(f'Category "{url}" failed!')
+                    fail_job(conn, job, e)
+                    continue
+
+                add_jobs(conn, run_id, 'product', tt, links)
+                complete_jobs(conn, [job])
+                extend_leases(conn, jobs)
+
+        else:
+            res = {}
+            stats = create_cache_stats()
+            leased = {job['target']: job for job in jobs}
+            done = []
+            for link, html in load_products_pages(browser, list(leased)):
+                try:
+                    parse_product_page(html, link, res, tt, cache, stats)
+                except Exception as e:
+                    res.pop(link, None)
+                    if fail_job(conn, leased[link], e):
+                        quarantine_product(link, tt, e)
+                    continue
+                done.append(leased[link])
+
+            upsert_results(conn, run_id, tt, res, owner)
+            complete_jobs(conn, done)
+
+
+def work() -> None:
+    """ Function launching worker of work queue (python3 run.py --worker
+    on any number of hosts with the same queue_db) """
+
+    logger = create_logger('worker.log', __name__)
+    owner = f'{socket.gethostname()}:{os.getpid()}'
+
+    conn = open_queue(config.queue_db)
+    run_id = get_run_id(conn)
+    for tt_id in config.tt_id:
+        add_jobs(conn, run_id, 'store', tt_id, [tt_id])
+
+    browser = open_browser()
+    logger.info(f'Worker "{owner}" started jobs of run "{run_id}".')
+
+    try:
+        process_jobs(browser, logger, conn, run_id, owner, {},
+                     load_timings(config.planner_file))
+        logger.info('Jobs of run "{}" are finished: {}.'.format(
+                                        run_id, count_jobs(conn, run_id)))
+        logger.info(describe_memory(browser))
+
+    except Exception:
+        logger.exception(f'Worker "{owner}" failed!')
+        raise
+
+    finally:
+        close_browser(browser)
+        conn.close()
+
+
+def merge() -> None:
+    """ Function for writing results of work queue to archives
+    of stores with usual names and sending them (python3 run.py --merge) """
+
+    logger = create_logger('run.log', __name__)
+    check_parquet()
+    check_archive_codec()
+    conn = open_queue(config.queue_db)
+    run_id = get_run_id(conn, create=False)
+    if run_id is None:
+        logger.warning('There is no run of work queue to merge.')
+        conn.close()
+        return
+
+    counts = count_jobs(conn, run_id)
+    if counts['pending'] or counts['leased'] or counts['expired']:
+        logger.warning(f'Jobs of run "{run_id}" are not finished, '
+                       f'available results are merged: {counts}.')
+    if counts['failed']:
+        logger.error(f'{counts["failed"]} jobs of run "{run_id}" failed.')
+
+    # products of failed and not finished jobs are not removed from delta
+    complete = not (counts['pending'] or counts['leased'] or
+                    counts['expired'] or counts['failed'])
+
+    if config.history_enable:
+        history = open_history(config.history_db)
+    else:
+        history = None
+
+    executor = create_executor()
+    mailer = start_mailer(logger)
+    pipeline = start_pipeline(
+                logger, executor, write_part,
+                lambda path, tt: send_archive(mailer, path, tt), prepare_part)
+
+    try:
+        for tt_id in config.tt_id:
+            parts = create_parts(tt_id, pipeline)
+            products = dict(iter_results(conn, run_id, tt_id))
+            number = finish_store(parts, products, logger, history,
+                                  complete)
+            logger.info(f'{len(products)} products of "{tt_id}" are merged '
+                        f'to {number} parts.')
+
+        # run stays open if any archive failed
+        check_pipeline(pipeline)
+        mark_merged(conn, run_id)
+
+    except Exception:
+        logger.exception(f'Merging of run "{run_id}" failed!')
+        raise
+
+    finally:
+        stop_pipeline(pipeline)
+        executor.shutdown()
+        stop_mailer(mailer)
+        log_pipeline_stats(pipeline, mailer)
+        if history is not None:
+            history.close()
+        conn.close()
 
 
 def parse() -> None:
     """ Main work function launching parser """
 
+    browser = None
+    executor = None
+    mailer = None
+    pipeline = None
+    history = None
     try:
         logger = create_logger('run.log', __name__)
         logger.debug('Parser started launched successfully.')
 
-        options = create_chrome_options()
+        # missing pyarrow or zstandard stops parser before scraping,
+        # not after it
+        check_parquet()
+        check_archive_codec()
 
-        logger.debug('Browser is configured successfully.')
+        # stages are profiled only with profile_mode
+        start_profiler()
 
-        browser = initialize_browser(options)
+        # browser is recycled after browser_max_pages pages
+        # or browser_max_rss_mb MB of memory
+        browser = open_browser()
 
         logger.debug('Browser is launched successfully.')
 
-        tt_ids = config.get('tt_id', ["Москва, Вересаева 10"])
+        tt_ids = config.tt_id
 
-        for tt_id in tt_ids:
-            get_link(browser, config['base_url'])
+        # static attributes of products are the same for all stores
+        if config.listing_only or config.promo_only:
+            cache = load_static_cache(config.static_cache)
+        else:
+            cache = {}
 
-            logger.info('Page "{}" is loaded successfully.'.format(
-                                                        config['base_url']))
+        # failed products of all stores (limited by error budget)
+        errors = {'products': 0}
 
-            specify_address(browser, tt_id)
+        executor = create_executor()
 
-            logger.info(f'Location "{tt_id}" specifies successfully.')
+        if config.history_enable:
+            history = open_history(config.history_db)
+        else:
+            history = None
 
-            categories_from_config = config['categories'][tt_id]
-            cats_for_parsing = check_categories(browser,
-                                                logger,
-                                                categories_from_config)
+        # archives are sent in background while next store is parsed
+        mailer = start_mailer(logger)
+        pipeline = start_pipeline(
+                    logger, executor, write_part,
+                    lambda path, tt: send_archive(mailer, path, tt),
+                    prepare_part)
 
-            csv_name = parse_prods(browser, cats_for_parsing, logger, tt_id)
+        if config.daemon_enable:
+            run_daemon(browser, logger, cache, errors, pipeline, history)
 
-            logger.info(f'Parsing products "{tt_id}" finished successfully.')
+        else:
+            # categories are split between shard_count processes
+            # by durations of previous runs (plan is frozen for run)
+            timings = load_timings(config.planner_file)
+            shards = freeze_plan(timings)
+            shard = config.shard_index
+            logger.info(describe_plan(shards))
+
+            for tt_id in tt_ids:
+                cats_for_parsing = [
+                    url for url in open_store(browser, logger, tt_id)
+                    if get_job_shard(shards, tt_id, url) == shard]
+
+                started = time.monotonic()
+                number = parse_prods(browser, cats_for_parsing, logger,
+                                     tt_id, cache, errors, pipeline, history,
+                                     timings=timings)
+                save_timings(config.planner_file, timings)
+
+                # archiving and sending of store continue while next store
+                # is parsed
+                logger.info(f'Parsing products "{tt_id}" finished '
+                            f'successfully, {number} parts are queued for '
+                            f'archiving ({time.monotonic() - started:.1f} s).')
+
+            # plan is deleted after all shards of run are finished
+            finish_plan()
+
+        # errors of archive stage fail run after all parts are archived
+        check_pipeline(pipeline)
+        pool = get_proxy_pool()
+        if pool is not None:
+            logger.info(f'Proxies: {describe_pool(pool)}.')
+        logger.info(describe_memory(browser))
+        logger.debug('Parser finished to work.')
 
-            name_archive = csv_name.replace('.csv', '.zip')
+    except ConfigInvalid as e:
+        print(e)
+        raise
 
-            create_zip_archive(name_archive, csv_name)
+    except CreateLoggerFailed as e:
+        print(e)
+        raise
 
-            send_archive(name_archive, csv_name, tt_id)
+    except ParquetUnavailable:
+        logger.exception('Checking of Parquet output failed!')
+        raise
 
-            logger.info(f'Archive "{name_archive}" with csv file is sended.')
+    except ArchiveCodecUnavailable:
+        logger.exception('Checking of archive codec failed!')
+        raise
 
-        logger.debug('Parser finished to work.')
+    except SavePlanFailed:
+        logger.exception('Saving plan of run failed!')
+        raise
 
-    except CreateLoggerFailed as e:
-        print(e)
+    except SaveTimingsFailed:
+        logger.exception('Saving timings of categories failed!')
         raise
 
     except ChromeOptionsFailed:
@@ -655,12 +1639,41 @@ def parse() -> None:
         logger.exception('Parsing products failed!')
         raise
 
+    except ArchivePartsFailed:
+        logger.exception('Archiving of parts failed!')
+        raise
+
     except Exception as e:
         assert False, f'Unknown error: {e}'
 
-    else:
-        browser.quit()
+    finally:
+        # queued parts are archived and sent also after errors
+        if pipeline is not None:
+            stop_pipeline(pipeline)
+        if executor is not None:
+            executor.shutdown()
+        if mailer is not None:
+            stop_mailer(mailer)
+        if pipeline is not None:
+            log_pipeline_stats(pipeline, mailer)
+        if history is not None:
+            history.close()
+        if browser is not None:
+            close_browser(browser)
+        profile_dir = stop_profiler()
+        if profile_dir is not None:
+            logger.info(f'Profiles of stages are writed to "{profile_dir}".')
 
 
 if __name__ == '__main__':
-    parse()
+    # python3 run.py --shard 2/4 - second of 4 processes
+    if len(sys.argv) == 3 and sys.argv[1] == '--shard':
+        index, count = sys.argv[2].split('/')
+        configure(shard_index=int(index) - 1, shard_count=int(count))
+
+    if sys.argv[1:] == ['--worker']:
+        work()
+    elif sys.argv[1:] == ['--merge']:
+        merge()
+    else:
+        parse()
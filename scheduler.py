@@ -0,0 +1,192 @@
+"""
+Module with schedule of daemon mode: every category of store is refreshed
+with own interval depending on how often its prices and stock change,
+number of requests per hour is limited by budget
+"""
+
+from hashlib import blake2b
+import json
+import os
+import time
+
+from exceptions import SaveScheduleFailed
+from settings import config
+
+
+# Constants
+
+# Fields compared between refreshes of category
+FINGERPRINT_FIELDS = ['source_sku_code', 'price', 'price_promo',
+                      'sku_status']
+
+# Weight of last refresh in rate of changes of category
+SMOOTHING = 0.3
+
+BUDGET_WINDOW_S = 3600
+
+# Requests of category without records (if no category is refreshed)
+DEFAULT_COST = 100
+
+
+# Functions
+
+def load_schedule(path: str) -> dict:
+    """ Function for loading schedule of categories
+    (keys of categories - 'tt_id|url') """
+
+    schedule = {'categories': {}, 'spent': []}
+    if os.path.exists(path):
+        with open(path, encoding='utf-8') as f:
+            schedule.update(json.load(f))
+    return schedule
+
+
+def save_schedule(path: str, schedule: dict) -> None:
+    """ Function for saving schedule of categories """
+
+    try:
+        dir = os.path.dirname(path)
+        if dir and not os.path.exists(dir):
+            os.makedirs(dir)
+
+        with open(f'{path}.tmp', 'w', encoding='utf-8') as f:
+            json.dump(schedule, f, ensure_ascii=False)
+        os.replace(f'{path}.tmp', path)
+
+    except Exception as e:
+        raise SaveScheduleFailed(path) from e
+
+
+def estimate_cost(schedule: dict, tt: str, url: str,
+                  timings: dict = None) -> int:
+    """ Function for estimating requests of category never refreshed
+    by daemon: products of category recorded by planner, average
+    of refreshed categories or DEFAULT_COST """
+
+    if timings is not None:
+        record = timings['categories'].get(f'{tt}|{url}')
+        if record is not None:
+            return record['products'] + 1
+
+    costs = [state['cost'] for state in schedule['categories'].values()
+             if state['refreshes']]
+    if costs:
+        return round(sum(costs) / len(costs))
+    return DEFAULT_COST
+
+
+def get_category_state(schedule: dict, tt: str, url: str,
+                       timings: dict = None) -> dict:
+    """ Function for getting state of category in store
+    (new category is considered volatile and is refreshed at once) """
+
+    key = f'{tt}|{url}'
+    if key not in schedule['categories']:
+        schedule['categories'][key] = {
+            'last': 0, 'rate': 1.0,
+            'cost': estimate_cost(schedule, tt, url, timings),
+            'fingerprint': None, 'refreshes': 0, 'changes': 0,
+            'failures': 0, 'retry_at': 0}
+    return schedule['categories'][key]
+
+
+def get_interval(state: dict) -> float:
+    """ Function for getting refresh interval of category: from
+    daemon_max_interval_s (never changes) to daemon_min_interval_s
+    (changes on every refresh) on logarithmic scale """
+
+    min_interval = config.daemon_min_interval_s
+    max_interval = config.daemon_max_interval_s
+    return max_interval * (min_interval / max_interval) ** state['rate']
+
+
+def get_spent(schedule: dict, now: float) -> int:
+    """ Function for counting requests spent in last hour """
+
+    schedule['spent'] = [[moment, cost] for moment, cost in schedule['spent']
+                         if now - moment < BUDGET_WINDOW_S]
+    return sum(cost for _, cost in schedule['spent'])
+
+
+def select_due_categories(schedule: dict, tt: str, cats: list,
+                          now: float, timings: dict = None) -> list:
+    """ Function for selecting categories of store to refresh: most overdue
+    categories first, while estimated requests fit in budget (failed
+    categories wait until retry time) """
+
+    due = []
+    for url in cats:
+        state = get_category_state(schedule, tt, url, timings)
+        if now < state.get('retry_at', 0):
+            continue
+        overdue = (now - state['last']) / get_interval(state)
+        if overdue >= 1:
+            due.append((overdue, url, state['cost']))
+
+    budget = config.daemon_requests_per_hour - get_spent(schedule, now)
+    selected = []
+    for _, url, cost in sorted(due, reverse=True):
+        if cost > budget:
+            continue
+        selected.append(url)
+        budget -= cost
+
+    return selected
+
+
+def get_fingerprint(products: list) -> str:
+    """ Function for getting hash of prices and stock of products """
+
+    digest = blake2b(digest_size=16)
+    for values in sorted(tuple(str(prod.get(field, ''))
+                               for field in FINGERPRINT_FIELDS)
+                         for prod in products):
+        digest.update('\x1f'.join(values).encode('utf-8'))
+        digest.update(b'\x1e')
+    return digest.hexdigest()
+
+
+def record_refresh(schedule: dict, tt: str, url: str, products: list,
+                   now: float = None) -> bool:
+    """ Function for updating rate of changes of category after refresh
+    (requests - product pages and category page), True is returned
+    if prices or stock are changed """
+
+    if now is None:
+        now = time.time()
+
+    state = get_category_state(schedule, tt, url)
+    fingerprint = get_fingerprint(products)
+    changed = fingerprint != state['fingerprint']
+
+    # first refresh says nothing about changes
+    if state['fingerprint'] is not None:
+        state['rate'] = SMOOTHING * changed + (1 - SMOOTHING) * state['rate']
+        state['changes'] += changed
+
+    state['fingerprint'] = fingerprint
+    state['last'] = now
+    state['cost'] = len(products) + 1
+    state['refreshes'] += 1
+    state['failures'] = 0
+    state['retry_at'] = 0
+    schedule['spent'].append([now, state['cost']])
+
+    return changed
+
+
+def record_failure(schedule: dict, tt: str, url: str,
+                   now: float = None) -> float:
+    """ Function for backing off failed category: retry after
+    daemon_min_interval_s, doubled after every failure in a row
+    (up to daemon_max_interval_s), time of retry is returned """
+
+    if now is None:
+        now = time.time()
+
+    state = get_category_state(schedule, tt, url)
+    state['failures'] = state.get('failures', 0) + 1
+    delay = min(config.daemon_max_interval_s,
+                config.daemon_min_interval_s * 2 ** (state['failures'] - 1))
+    state['retry_at'] = now + delay
+    return state['retry_at']
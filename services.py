@@ -1,46 +1,94 @@
 """
 Module with functions for parsers
+
+Selenium and requests are imported inside functions, so modules
+not working with browser are imported fast
 """
 
-import json
-from logging import getLogger, Formatter, Logger, DEBUG, handlers
+from __future__ import annotations
+
+import atexit
+from itertools import count
+from logging import (getLogger, Filter, Formatter, Logger, LogRecord,
+                     handlers)
 import os
+from queue import Queue
 import random
 import time
-
-from selenium.webdriver import Chrome, ChromeOptions
-from selenium.webdriver.common.keys import Keys
+from typing import TYPE_CHECKING
 
 from exceptions import (CreateLoggerFailed, ChromeOptionsFailed,
                         OpenBrowserFailed, LoadPageFailed,
-                        SpecifyAddressFailed)
+                        SpecifyAddressFailed, CreateSessionFailed)
+from proxies import (acquire_proxy, choose_proxy, find_proxy,
+                     get_proxy_pool, report_proxy, wait_turn, BLOCK_STATUSES)
+from settings import config
+
+if TYPE_CHECKING:
+    import requests
+    from selenium.webdriver import Chrome, ChromeOptions
+
+
+# Background listeners writing records to log files (keys - paths of files)
+LISTENERS = {}
+
 
+class SamplingFilter(Filter):
+    """ Filter passing only every n-th record marked as sampled
+    (extra={'sampled': True}), other records are passed always """
 
-# Read configuration file
-with open('config.json') as config:
-    config = json.load(config)
+    def __init__(self, rate: int) -> None:
+        super().__init__()
+        self.rate = max(1, rate)
+        self.counter = count()
+
+    def filter(self, record: LogRecord) -> bool:
+        if not getattr(record, 'sampled', False):
+            return True
+        return next(self.counter) % self.rate == 0
 
 
 def create_logger(log_name: str, module_name) -> Logger:
-    """ Function for creating and configuration of logger """
+    """ Function for creating and configuration of logger
+    (records are written to file by background listener, repeated call
+    returns already configured logger) """
+
+    # invalid config is reported by ConfigInvalid, not by this function
+    logs_dir = config.logs_dir
 
     try:
-        logs_dir = config.get('logs_dir', 'logs')
+        logger = getLogger(module_name)
+        if any(isinstance(handler, handlers.QueueHandler)
+               for handler in logger.handlers):
+            return logger
+
         if not os.path.exists(logs_dir):
             os.mkdir(logs_dir)
 
-        logger = getLogger(module_name)
         format = '%(asctime)s %(name)s - %(levelname)s: %(message)s'
         log_formatter = Formatter(format)
 
-        handler = handlers.RotatingFileHandler(f'{logs_dir}/{log_name}',
-                                               mode='a',
-                                               maxBytes=20*1024*1024,
-                                               backupCount=60,
-                                               encoding='utf8')
-        handler.setFormatter(log_formatter)
-        logger.setLevel(DEBUG)
-        logger.addHandler(handler)
+        path = f'{logs_dir}/{log_name}'
+        if path not in LISTENERS:
+            handler = handlers.RotatingFileHandler(path,
+                                                   mode='a',
+                                                   maxBytes=20*1024*1024,
+                                                   backupCount=60,
+                                                   encoding='utf8')
+            handler.setFormatter(log_formatter)
+
+            log_queue = Queue(-1)
+            listener = handlers.QueueListener(log_queue, handler)
+            listener.start()
+            atexit.register(listener.stop)
+            LISTENERS[path] = listener
+
+        queue_handler = handlers.QueueHandler(LISTENERS[path].queue)
+        queue_handler.addFilter(
+                    SamplingFilter(config.log_sample_rate))
+
+        logger.setLevel(config.log_level.upper())
+        logger.addHandler(queue_handler)
 
         return logger
 
@@ -51,6 +99,8 @@ def create_logger(log_name: str, module_name) -> Logger:
 def create_chrome_options() -> ChromeOptions:
     """ Function for initialization of Google Chrome browser settings """
 
+    from selenium.webdriver import ChromeOptions
+
     options = ChromeOptions()
     options.headless = True
 
@@ -60,9 +110,16 @@ def create_chrome_options() -> ChromeOptions:
     options.add_argument('--start-maximized')
 
     try:
-        headers = config['headers'].get('User-Agent', '')
+        headers = config.headers.get('User-Agent', '')
         options.add_argument(f'user-agent={headers}')
 
+        # browser uses 1 proxy of pool for all pages
+        pool = get_proxy_pool()
+        if pool is not None:
+            with pool['lock']:
+                proxy = choose_proxy(pool)
+            options.add_argument(f"--proxy-server={proxy['url']}")
+
         return options
 
     except Exception as e:
@@ -72,11 +129,19 @@ def create_chrome_options() -> ChromeOptions:
 def initialize_browser(options: ChromeOptions) -> Chrome:
     """ Function to launch Google Chrome browser with created settings """
 
+    from selenium.webdriver import Chrome
+
     try:
         path_to_driver = 'driver/chromedriver'
         browser = Chrome(executable_path=path_to_driver,
                          service_log_path=os.path.devnull,
                          options=options)
+
+        browser.proxy_url = None
+        for argument in options.arguments:
+            if argument.startswith('--proxy-server='):
+                browser.proxy_url = argument.split('=', 1)[1]
+
         return browser
 
     except Exception as e:
@@ -87,23 +152,105 @@ def get_link(browser: Chrome, url: str) -> bool:
     """ Function to open URL in browser Google Chrome browser """
 
     try:
-        max_retries = config.get('max_retries', 5)
-        if config['delay_range_s']:
-            start_delay = config['delay_range_s'].split('-')[0]
-            finish_delay = config['delay_range_s'].split('-')[1]
-            delay = random.uniform(float(start_delay), float(finish_delay))
+        max_retries = config.max_retries
+        if config.delay_range:
+            delay = random.uniform(*config.delay_range)
         else:
             delay = 0
 
+        pool = get_proxy_pool()
+        proxy = None
+        if pool is not None and getattr(browser, 'proxy_url', None):
+            proxy = find_proxy(pool, browser.proxy_url)
+
         for _ in range(max_retries):
+            started = time.monotonic()
             try:
+                if proxy is not None:
+                    wait_turn(pool, proxy)
+                    started = time.monotonic()
                 browser.get(url)
+                if proxy is not None:
+                    report_proxy(pool, proxy, time.monotonic() - started)
                 return
             except Exception as e:
                 print(e)
+                if proxy is not None:
+                    report_proxy(pool, proxy, time.monotonic() - started,
+                                 error=True)
+                if delay:
+                    time.sleep(delay)
+                    delay *= config.backoff_factor
+    except Exception as e:
+        raise LoadPageFailed(url, max_retries) from e
+
+    raise LoadPageFailed(url, max_retries)
+
+
+def create_session(browser: Chrome) -> requests.Session:
+    """ Function for creating HTTP session with cookies of browser
+    (location specified in browser is kept for requests) """
+
+    import requests
+
+    try:
+        session = requests.Session()
+        session.headers.update(config.headers)
+        for cookie in browser.get_cookies():
+            session.cookies.set(cookie['name'], cookie['value'],
+                                domain=cookie.get('domain'),
+                                path=cookie.get('path', '/'))
+        return session
+
+    except Exception as e:
+        raise CreateSessionFailed(browser.current_url) from e
+
+
+def get_html(session: requests.Session, url: str,
+             missing_ok: bool = False) -> str:
+    """ Function to get HTML-page by URL without browser
+    (through proxy of pool if proxies are set in config), if missing_ok,
+    absent page (404) is not retried and None is returned """
+
+    from requests import HTTPError
+
+    try:
+        max_retries = config.max_retries
+        if config.delay_range:
+            delay = random.uniform(*config.delay_range)
+        else:
+            delay = 0
+
+        pool = get_proxy_pool()
+
+        for _ in range(max_retries):
+            proxy = acquire_proxy(pool) if pool is not None else None
+            started = time.monotonic()
+            try:
+                if proxy is None:
+                    response = session.get(url, timeout=30)
+                else:
+                    response = session.get(url, timeout=30,
+                                           proxies={'http': proxy['url'],
+                                                    'https': proxy['url']})
+                missing = missing_ok and response.status_code == 404
+                if proxy is not None:
+                    report_proxy(
+                        pool, proxy, time.monotonic() - started,
+                        error=not response.ok and not missing,
+                        blocked=response.status_code in BLOCK_STATUSES)
+                if missing:
+                    return None
+                response.raise_for_status()
+                return response.text
+            except Exception as e:
+                print(e)
+                if proxy is not None and not isinstance(e, HTTPError):
+                    report_proxy(pool, proxy, time.monotonic() - started,
+                                 error=True)
                 if delay:
                     time.sleep(delay)
-                    delay *= config.get('backoff_factor', 1)
+                    delay *= config.backoff_factor
     except Exception as e:
         raise LoadPageFailed(url, max_retries) from e
 
@@ -113,6 +260,8 @@ def get_link(browser: Chrome, url: str) -> bool:
 def specify_address(browser: Chrome, address: str) -> None:
     """ Function to refine location on site 'https://yarcheplus.ru/' """
 
+    from selenium.webdriver.common.keys import Keys
+
     try:
         browser.find_element_by_xpath(
                         "//button[@class='a31qlM9dd c2D0-ojBi']"
@@ -137,3 +286,17 @@ def specify_address(browser: Chrome, address: str) -> None:
         span.click()
     except Exception as e:
         raise SpecifyAddressFailed(address) from e
+
+
+def confirm_cookies(browser: Chrome) -> bool:
+    """ Function for confirming cookies on opened page of site (banner
+    of cookies breaks pressing on buttons), True is returned if banner
+    was confirmed """
+
+    try:
+        cookie = browser.find_element_by_xpath(
+                            "//button[@class='aJ8u8iEK8']")
+        cookie.click()
+    except Exception:
+        return False
+    return True
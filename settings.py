@@ -0,0 +1,202 @@
+"""
+Module with typed configuration of parsers (config.json is read
+and validated only on first access to settings)
+"""
+
+from dataclasses import dataclass, field, fields
+import json
+import os
+from typing import Any, Optional, Tuple
+
+from exceptions import ConfigInvalid
+
+
+# Constants
+
+# Path to configuration file can be changed for tests and mock site
+CONFIG_PATH = os.environ.get('PARSER_CONFIG', 'config.json')
+
+CHOICES = {'pagination_mode': ['click', 'pages'],
+           'archive_codec': ['deflate', 'zstd', 'none'],
+           'categories_export': ['matrix', 'stores'],
+           'profile_mode': ['', 'sampling', 'cprofile'],
+           'log_level': ['DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL']}
+
+
+# Classes
+
+@dataclass
+class Settings:
+    """ Typed configuration of parsers (defaults - values
+    used when key is absent in config.json) """
+
+    output_directory: str = 'out'
+    base_url: str = 'https://yarcheplus.ru'
+    chain_name: str = 'Ярче'
+    chain_id: int = 113
+    parser_id: str = 'mc_test'
+    tt_region: str = 'msk'
+    part_number: str = 'p1'
+    part_max_rows: int = 0
+    part_max_bytes: int = 0
+    part_workers: int = 2
+    pipeline_queue_size: int = 4
+    tt_id: list = field(default_factory=lambda: ['Москва, Вересаева 10'])
+    categories: dict = field(default_factory=dict)
+    categories_export: str = 'stores'
+    categories_workers: int = 4
+    sku_images_enable: bool = True
+    sku_parameters_enable: bool = True
+    images_enable: bool = False
+    images_dir: str = 'out/images'
+    images_workers: int = 8
+    promo_only: bool = False
+    promo_filter: str = 'promo=1'
+    pagination_mode: str = 'click'
+    pagination_workers: int = 4
+    page_param: str = 'page'
+    browser_tabs: int = 1
+    browser_max_pages: int = 1000
+    browser_max_rss_mb: int = 2048
+    page_timeout_s: float = 60
+    listing_only: bool = False
+    static_cache: str = 'cache/static.json'
+    parquet_enable: bool = False
+    parquet_row_group_size: int = 10000
+    parquet_compression: str = 'snappy'
+    archive_codec: str = 'deflate'
+    archive_level: int = 6
+    history_enable: bool = False
+    history_db: str = 'out/history.sqlite3'
+    history_batch_size: int = 5000
+    delta_enable: bool = False
+    delta_dir: str = 'out/snapshots'
+    delta_full_every: int = 7
+    daemon_enable: bool = False
+    daemon_schedule_file: str = 'out/schedule.json'
+    daemon_min_interval_s: float = 900
+    daemon_max_interval_s: float = 86400
+    daemon_requests_per_hour: int = 3000
+    daemon_tick_s: float = 60
+    planner_file: str = 'out/planner.json'
+    shard_count: int = 1
+    shard_index: int = 0
+    shard_run_id: str = ''
+    queue_db: str = 'out/queue.sqlite3'
+    queue_run_id: str = ''
+    queue_visibility_s: float = 600
+    queue_max_attempts: int = 3
+    queue_batch_size: int = 10
+    queue_tick_s: float = 10
+    delay_range_s: str = '1-3'
+    max_retries: int = 5
+    backoff_factor: float = 1
+    headers: dict = field(default_factory=dict)
+    proxies: list = field(default_factory=list)
+    proxy_rate_per_s: float = 1
+    proxy_block_s: float = 300
+    logs_dir: str = 'logs'
+    log_level: str = 'DEBUG'
+    log_sample_rate: int = 1
+    profile_mode: str = ''
+    profile_interval_ms: float = 5
+    error_budget: int = 50
+    quarantine_file: str = 'quarantine.jsonl'
+    email_from: dict = field(default_factory=dict)
+    emails_to: list = field(default_factory=list)
+    mail_queue_dir: str = 'out/mail_queue'
+    mail_max_retries: int = 5
+    mail_retry_delay_s: float = 30
+
+    @property
+    def delay_range(self) -> Optional[Tuple[float, float]]:
+        """ Range of delay between retries of loading page
+        (None - without delay) """
+
+        if not self.delay_range_s:
+            return None
+        start_delay, finish_delay = self.delay_range_s.split('-')
+        return float(start_delay), float(finish_delay)
+
+
+class LazySettings:
+    """ Proxy of settings, config.json is read on first access
+    to any field """
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(get_settings(), name)
+
+
+# Functions
+
+def convert_value(name: str, kind: type, value: Any) -> Any:
+    """ Function for converting value from config.json to type of field """
+
+    if kind is bool:
+        if isinstance(value, bool):
+            return value
+        if str(value).lower() in ('true', 'false'):
+            return str(value).lower() == 'true'
+    elif kind is int:
+        if not isinstance(value, bool):
+            return int(value)
+    elif kind is float:
+        if not isinstance(value, bool):
+            return float(value)
+    elif isinstance(value, kind):
+        return value
+
+    raise ValueError(f'{value!r} is not {kind.__name__}')
+
+
+def load_settings(path: str = CONFIG_PATH, **overrides) -> Settings:
+    """ Function for reading and validating configuration file
+    (overrides - values replacing values from file) """
+
+    key = None
+    try:
+        with open(path, encoding='utf-8') as f:
+            raw = json.load(f)
+        raw.update(overrides)
+
+        kinds = {item.name: item.type for item in fields(Settings)}
+        values = {}
+        for key, value in raw.items():
+            if key not in kinds:
+                raise KeyError(f'unknown key "{key}"')
+            values[key] = convert_value(key, kinds[key], value)
+            if key in CHOICES and values[key] not in CHOICES[key]:
+                raise ValueError(f'{value!r} not in {CHOICES[key]}')
+
+        key = 'delay_range_s'
+        settings = Settings(**values)
+        settings.delay_range
+
+        return settings
+
+    except Exception as e:
+        raise ConfigInvalid(path, key) from e
+
+
+_settings = None
+
+
+def get_settings() -> Settings:
+    """ Function for getting settings (file is read once) """
+
+    global _settings
+    if _settings is None:
+        _settings = load_settings()
+    return _settings
+
+
+def configure(path: str = CONFIG_PATH, **overrides) -> Settings:
+    """ Function for replacing settings of process (for example,
+    base_url of local mock site) """
+
+    global _settings
+    _settings = load_settings(path, **overrides)
+    return _settings
+
+
+config = LazySettings()
@@ -0,0 +1,137 @@
+"""
+Module with functions for loading pages concurrently in several tabs
+of one Google Chrome browser (tabs share cookies, so location specified
+on site is the same for all tabs)
+"""
+
+from __future__ import annotations
+
+import time
+from typing import TYPE_CHECKING, Iterator, Tuple
+
+from exceptions import OpenTabsFailed
+from proxies import find_proxy, get_proxy_pool, report_proxy, wait_turn
+from settings import config
+
+if TYPE_CHECKING:
+    from selenium.webdriver import Chrome
+
+
+# Marker is set in tab before navigation and disappears with new document
+START_LOADING = ('window.__parserLoading = true; '
+                 'window.location.href = arguments[0];')
+IS_LOADED = ('return window.__parserLoading === undefined && '
+             'document.readyState === "complete";')
+
+
+def get_tabs(browser: Chrome, count: int) -> list:
+    """ Function for opening missing tabs in browser,
+    first tab stays current """
+
+    try:
+        main = browser.current_window_handle
+        while len(browser.window_handles) < count:
+            browser.switch_to.new_window('tab')
+        browser.switch_to.window(main)
+
+        handles = [main] + [handle for handle in browser.window_handles
+                            if handle != main]
+        return handles[:count]
+
+    except Exception as e:
+        raise OpenTabsFailed(count) from e
+
+
+def start_loading(browser: Chrome, handle: str, task: dict,
+                  pool: dict = None, proxy: dict = None) -> None:
+    """ Function for starting loading of page in tab (after turn
+    of proxy of browser), error of tab is written to task """
+
+    if proxy is not None:
+        wait_turn(pool, proxy)
+    task['started'] = time.monotonic()
+    task['attempt'] += 1
+    task['error'] = None
+    try:
+        browser.switch_to.window(handle)
+        browser.execute_script(START_LOADING, task['url'])
+    except Exception as e:
+        task['error'] = e
+
+
+def check_tab(browser: Chrome, handle: str, task: dict) -> str:
+    """ Function for checking page in tab: 'loaded' (HTML-page is written
+    to task), 'loading' or 'failed' (error of tab or timeout) """
+
+    if task['error'] is not None:
+        return 'failed'
+
+    try:
+        browser.switch_to.window(handle)
+        if browser.execute_script(IS_LOADED):
+            task['html'] = browser.page_source
+            return 'loaded'
+    except Exception as e:
+        task['error'] = e
+        return 'failed'
+
+    if time.monotonic() - task['started'] > config.page_timeout_s:
+        return 'failed'
+    return 'loading'
+
+
+def load_pages_in_tabs(browser: Chrome, urls: list,
+                       count: int) -> Iterator[Tuple[str, str]]:
+    """ Function for loading pages in several tabs at the same time,
+    pairs (url, HTML-page) are returned in order of loading
+    (HTML-page is None if page is not loaded after all retries,
+    error of one tab fails only its page), pages are loaded through
+    proxy of browser by its limit and are reported to pool """
+
+    handles = get_tabs(browser, count)
+    main = handles[0]
+    max_retries = config.max_retries
+
+    pool = get_proxy_pool()
+    proxy = None
+    if pool is not None and getattr(browser, 'proxy_url', None):
+        proxy = find_proxy(pool, browser.proxy_url)
+
+    queue = list(reversed(urls))
+    # handle -> task of tab (url, start time, attempt, error, HTML-page)
+    loading = {}
+
+    try:
+        while queue or loading:
+            for handle in handles:
+                if handle not in loading and queue:
+                    loading[handle] = {'url': queue.pop(), 'attempt': 0,
+                                       'html': None}
+                    start_loading(browser, handle, loading[handle], pool,
+                                  proxy)
+
+            finished = None
+            for handle, task in loading.items():
+                state = check_tab(browser, handle, task)
+                if state == 'loading':
+                    continue
+
+                if proxy is not None:
+                    report_proxy(pool, proxy,
+                                 time.monotonic() - task['started'],
+                                 error=state == 'failed')
+
+                if state == 'loaded' or task['attempt'] >= max_retries:
+                    finished = handle
+                    break
+                start_loading(browser, handle, task, pool, proxy)
+
+            if finished is None:
+                time.sleep(0.1)
+                continue
+
+            task = loading.pop(finished)
+            yield task['url'], task['html']
+
+    finally:
+        browser.switch_to.window(main)
@@ -0,0 +1,111 @@
+"""
+Common fixtures of tests: modules of parser are imported from root
+of repository, settings are read from config.json with directories
+in temporary directory of test
+"""
+
+import os
+import sys
+import threading
+from types import SimpleNamespace
+from urllib.parse import quote
+
+import pytest
+import requests
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import settings  # noqa: E402
+from mock_site import ADDRESS_COOKIE, create_site  # noqa: E402
+
+
+class SiteBrowser:
+    """ Stand-in of Chrome loading pages of mock site by HTTP
+    (address of store is kept in cookie as on site), scripts of tabs.py
+    load pages in tabs by background threads, pages of broken urls
+    fail in tab with error of script """
+
+    def __init__(self, address: str = '', broken: tuple = ()) -> None:
+        self.session = requests.Session()
+        self.session.trust_env = False
+        if address:
+            self.session.cookies.set(ADDRESS_COOKIE, quote(address))
+        self.broken = set(broken)
+        self.urls = []
+        self.tabs = {'tab-0': {'url': None, 'html': ''}}
+        self.current_window_handle = 'tab-0'
+        self.switch_to = SimpleNamespace(window=self.switch_window,
+                                         new_window=self.new_window)
+
+    @property
+    def window_handles(self) -> list:
+        return list(self.tabs)
+
+    @property
+    def page_source(self) -> str:
+        return self.tabs[self.current_window_handle]['html']
+
+    def switch_window(self, handle: str) -> None:
+        self.current_window_handle = handle
+
+    def new_window(self, kind: str) -> None:
+        handle = f'tab-{len(self.tabs)}'
+        self.tabs[handle] = {'url': None, 'html': ''}
+        self.current_window_handle = handle
+
+    def get(self, url: str) -> None:
+        response = self.session.get(url, timeout=30)
+        response.raise_for_status()
+        self.urls.append(url)
+        self.tabs[self.current_window_handle].update(url=url,
+                                                     html=response.text)
+
+    def execute_script(self, script: str, *args):
+        from tabs import IS_LOADED, START_LOADING
+
+        tab = self.tabs[self.current_window_handle]
+        if script == START_LOADING:
+            tab.update(url=args[0], html=None)
+            threading.Thread(target=self.load, args=(tab, args[0]),
+                             daemon=True).start()
+        elif script == IS_LOADED:
+            if tab['url'] in self.broken:
+                raise RuntimeError('javascript error: tab crashed')
+            return tab['html'] is not None
+
+    def load(self, tab: dict, url: str) -> None:
+        html = self.session.get(url, timeout=30).text
+        self.urls.append(url)
+        if tab['url'] == url:
+            tab['html'] = html
+
+
+@pytest.fixture
+def configure(tmp_path):
+    """ Fixture replacing settings of process (keys of config.json
+    can be overridden) """
+
+    def configure(**overrides):
+        values = {'output_directory': str(tmp_path / 'out'),
+                  'logs_dir': str(tmp_path / 'logs'),
+                  'delay_range_s': '', 'max_retries': 2}
+        values.update(overrides)
+        return settings.configure(os.path.join(ROOT, 'config.json'),
+                                  **values)
+
+    configure()
+    yield configure
+    settings._settings = None
+
+
+@pytest.fixture
+def mock_site():
+    """ Fixture with local mock site in background thread """
+
+    site = create_site(0, categories=4, products=25, page_size=10)
+    thread = threading.Thread(target=site.serve_forever, daemon=True)
+    thread.start()
+    yield site
+    site.shutdown()
+    site.server_close()
@@ -0,0 +1,120 @@
+import subprocess
+import time
+
+import browsers
+
+
+class Driver:
+    """ Stand-in of chromedriver: process with child processes """
+
+    def __init__(self):
+        process = subprocess.Popen(['sh', '-c', 'sleep 60 & sleep 60'])
+        self.service = type('Service', (), {'process': process})()
+        self.quitted = False
+        self.urls = []
+
+    def get(self, url):
+        self.urls.append(url)
+
+    def quit(self):
+        self.quitted = True
+
+
+def wait_children(pid):
+    for _ in range(50):
+        tree = browsers.get_process_tree(pid)
+        if len(tree) > 1:
+            return tree
+        time.sleep(0.05)
+    return tree
+
+
+def is_alive(pid):
+    try:
+        with open(f'/proc/{pid}/stat') as f:
+            return f.read().rsplit(')', 1)[1].split()[0] != 'Z'
+    except OSError:
+        return False
+
+
+def test_browser_is_recycled_after_max_pages(configure):
+    configure(browser_max_pages=3, browser_max_rss_mb=0)
+    drivers = []
+    browser = browsers.ManagedBrowser(
+        lambda: drivers.append(Driver()) or drivers[-1])
+
+    try:
+        for number in range(7):
+            browsers.maintain_browser(browser, 'products')
+            browser.get(f'http://site/{number}')
+    finally:
+        browsers.close_browser(browser)
+
+    assert browser.recycles == 2
+    assert [len(driver.urls) for driver in drivers] == [3, 3, 1]
+    assert all(driver.quitted for driver in drivers)
+    assert 'products' in browsers.describe_memory(browser)
+
+
+def test_processes_of_browser_are_killed(configure):
+    configure()
+    browser = browsers.ManagedBrowser(Driver)
+    pids = wait_children(browser.driver.service.process.pid)
+    assert len(pids) > 1
+    assert browsers.get_browser_rss_mb(browser) > 0
+
+    browsers.close_browser(browser)
+    browser.driver.service.process.wait(5)
+    for _ in range(50):
+        if not any(is_alive(pid) for pid in pids):
+            break
+        time.sleep(0.05)
+
+    assert not any(is_alive(pid) for pid in pids)
+
+
+def test_recycled_browser_gets_store_and_cookies(configure, monkeypatch):
+    configure(browser_max_pages=1, browser_max_rss_mb=0)
+    calls = []
+    monkeypatch.setattr(browsers, 'get_link',
+                        lambda browser, url: calls.append('link'))
+    monkeypatch.setattr(browsers, 'specify_address',
+                        lambda browser, tt: calls.append(tt))
+    monkeypatch.setattr(browsers, 'confirm_cookies',
+                        lambda browser: calls.append('cookies'))
+    browser = browsers.ManagedBrowser(Driver)
+    browser.store = 'tt'
+
+    try:
+        browser.get('http://site/1')
+        browsers.maintain_browser(browser, 'category')
+    finally:
+        browsers.close_browser(browser)
+
+    assert browser.recycles == 1
+    assert calls == ['link', 'tt', 'cookies']
+
+
+def test_reused_pids_are_not_killed(configure, monkeypatch):
+    configure()
+    driver = Driver()
+    pids = wait_children(driver.service.process.pid)
+    killed = []
+    start_times = {}
+
+    def get_start_time(pid):
+        # after quit pids belong to other processes
+        return start_times.setdefault(pid, 0) + driver.quitted
+
+    monkeypatch.setattr(browsers, 'get_start_time', get_start_time)
+    monkeypatch.setattr(browsers.os, 'kill',
+                        lambda pid, signal: killed.append(pid))
+    try:
+        browsers.quit_driver(driver)
+    finally:
+        monkeypatch.undo()
+        for pid in pids:
+            browsers.os.kill(pid, browsers.signal.SIGKILL)
+        driver.service.process.wait(5)
+
+    assert killed == []
@@ -0,0 +1,72 @@
+import csv
+import os
+
+import pytest
+
+import get_categories
+
+
+def category(tree_id, name, children=(), parent=None):
+    return {'treeId': tree_id, 'parentTreeId': parent, 'id': tree_id,
+            'code': f'code-{tree_id}', 'name': name,
+            'isCatalogDisplay': not children, 'isCategoryDisplay': True,
+            'children': list(children)}
+
+
+def test_categories_of_stores_are_not_mixed():
+    first = get_categories.parse_categories_from_list(
+        [category(1, 'Молоко')])
+    second = get_categories.parse_categories_from_list(
+        [category(2, 'Хлеб')])
+
+    assert list(first) == [1]
+    assert list(second) == [2]
+
+
+def test_category_matrix(tmp_path):
+    tt_ids = ['a', 'b', 'c']
+    tree = category(1, 'Еда', [category(2, 'Молоко', parent=1),
+                               category(3, 'Хлеб', parent=1)])
+    captures = {
+        'a': get_categories.parse_categories_from_list([tree]),
+        'b': get_categories.parse_categories_from_list(
+            [dict(tree, children=tree['children'][:1])]),
+        'c': get_categories.parse_categories_from_list(
+            [dict(tree, children=tree['children'][1:])])}
+
+    matrix = get_categories.build_category_matrix(captures, tt_ids)
+    get_categories.write_category_matrix(str(tmp_path), 'categories.csv',
+                                         matrix, tt_ids)
+
+    with open(tmp_path / 'categories.csv', encoding='utf-8') as f:
+        rows = {row['id']: row for row in csv.DictReader(f, delimiter=';')}
+    with open(tmp_path / 'stores.csv', encoding='utf-8') as f:
+        stores = [row['tt_id'] for row in csv.DictReader(f, delimiter=';')]
+
+    assert stores == tt_ids
+    assert rows['1']['stores'] == '7'
+    assert rows['2']['name'] == 'Еда|Молоко'
+    assert get_categories.get_category_stores(
+        int(rows['2']['stores'], 16), stores) == ['a', 'b']
+    assert get_categories.get_category_stores(
+        int(rows['3']['stores'], 16), stores) == ['a', 'c']
+
+
+@pytest.mark.parametrize('export, names', [
+    ({}, ['categories (a) - {}.csv', 'categories (b) - {}.csv']),
+    ({'categories_export': 'matrix'},
+     ['categories - {}.csv', 'stores - {}.csv'])])
+def test_categories_export(configure, tmp_path, monkeypatch, export, names):
+    configure(tt_id=['a', 'b'], **export)
+    captures = {'a': get_categories.parse_categories_from_list(
+                    [category(1, 'Молоко')]),
+                'b': get_categories.parse_categories_from_list(
+                    [category(2, 'Хлеб')])}
+    monkeypatch.setattr(get_categories, 'capture_categories',
+                        lambda tt_ids, logger: captures)
+
+    get_categories.parse()
+
+    files = sorted(os.listdir(tmp_path / 'out'))
+    created = files[0].split(' - ', 1)[1][:-len('.csv')]
+    assert files == [name.format(created) for name in names]
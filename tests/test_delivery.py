@@ -0,0 +1,90 @@
+import io
+import os
+import subprocess
+import sys
+import zipfile
+
+import pytest
+
+import delivery
+from conftest import ROOT
+from exceptions import ArchiveCodecUnavailable, CreateZIPArchiveFailed
+from test_settings import write_config
+
+ROWS = ''.join(f'{number};Product {number}\r\n' for number in range(2000))
+
+
+def read_archive(path):
+    if path.endswith('.zip'):
+        with zipfile.ZipFile(path) as zf:
+            return zf.read('products.csv').decode('utf-8')
+    if path.endswith('.zst'):
+        import zstandard
+        with open(path, 'rb') as f:
+            reader = zstandard.ZstdDecompressor().stream_reader(f)
+            return io.TextIOWrapper(reader, encoding='utf-8',
+                                    newline='').read()
+    with open(path, encoding='utf-8', newline='') as f:
+        return f.read()
+
+
+@pytest.mark.parametrize('codec, extension', [
+    ('deflate', '.zip'), ('zstd', '.csv.zst'), ('none', '.csv')])
+def test_rows_are_written_to_archive(configure, tmp_path, codec, extension):
+    configure(archive_codec=codec, archive_level=3)
+    stats = {}
+
+    with delivery.open_archive_stream(str(tmp_path / 'out'), 'products.csv',
+                                      stats) as stream:
+        for line in ROWS.splitlines(keepends=True):
+            stream.write(line)
+
+    assert stats['path'] == str(tmp_path / 'out' / f'products{extension}')
+    assert read_archive(stats['path']) == ROWS
+    assert stats['raw_bytes'] == len(ROWS.encode('utf-8'))
+    assert stats['archive_bytes'] == os.path.getsize(stats['path'])
+    if codec != 'none':
+        assert stats['archive_bytes'] < stats['raw_bytes']
+
+
+def test_failed_writing_is_reported(configure, tmp_path):
+    configure(archive_codec='deflate')
+
+    with pytest.raises(CreateZIPArchiveFailed):
+        with delivery.open_archive_stream(str(tmp_path / 'out'),
+                                          'products.csv', {}) as stream:
+            stream.write('row\r\n')
+            raise OSError('disk is full')
+
+
+def test_missing_codec_library_is_detected(configure, monkeypatch):
+    configure(archive_codec='zstd')
+    monkeypatch.setitem(sys.modules, 'zstandard', None)
+
+    with pytest.raises(ArchiveCodecUnavailable):
+        delivery.check_archive_codec()
+
+    configure(archive_codec='deflate')
+    delivery.check_archive_codec()
+
+
+def test_missing_codec_library_is_reported(tmp_path):
+    logs_dir = tmp_path / 'logs'
+    path = write_config(tmp_path, archive_codec='zstd',
+                        logs_dir=str(logs_dir))
+    script = ('import runpy, sys\n'
+              f'sys.path.insert(0, {ROOT!r})\n'
+              "sys.modules['zstandard'] = None\n"
+              f"runpy.run_path({os.path.join(ROOT, 'run.py')!r}, "
+              "run_name='__main__')\n")
+
+    result = subprocess.run(
+        [sys.executable, '-c', script], cwd=str(tmp_path),
+        env=dict(os.environ, PARSER_CONFIG=path), capture_output=True,
+        text=True, timeout=60)
+
+    assert result.returncode != 0
+    assert 'ArchiveCodecUnavailable' in result.stderr
+    assert 'Unknown error' not in result.stderr
+    log = (logs_dir / 'run.log').read_text(encoding='utf-8')
+    assert 'Checking of archive codec failed!' in log
@@ -0,0 +1,52 @@
+import delta
+
+FIELDS = ['source_sku_code', 'price']
+
+
+def products(**prices):
+    return {f'link-{sku}': {'source_sku_code': sku, 'price': price}
+            for sku, price in prices.items()}
+
+
+def run_store(products, partial=False):
+    state = delta.create_delta('tt', partial)
+    marked = delta.mark_changes(state, products, FIELDS)
+    marked.update(delta.get_removed_products(state))
+    delta.finish_delta(state)
+    return state, {str(prod['source_sku_code']): prod['change_type']
+                   for prod in marked.values()}
+
+
+def test_changes_since_previous_run(configure, tmp_path):
+    configure(delta_dir=str(tmp_path / 'snapshots'), delta_full_every=7)
+
+    state, changes = run_store(products(a=1, b=2, c=3))
+    assert state['full']
+    assert changes == {'a': 'new', 'b': 'new', 'c': 'new'}
+
+    state, changes = run_store(products(a=1, b=5, d=4))
+    assert not state['full']
+    assert changes == {'b': 'changed', 'c': 'removed', 'd': 'new'}
+
+
+def test_full_output_every_delta_full_every_run(configure, tmp_path):
+    configure(delta_dir=str(tmp_path / 'snapshots'), delta_full_every=2)
+
+    run_store(products(a=1, b=2))
+    state, _ = run_store(products(a=1, b=2))
+    assert not state['full']
+    state, changes = run_store(products(a=1, b=3))
+
+    assert state['full']
+    assert changes == {'a': 'unchanged', 'b': 'changed'}
+
+
+def test_partial_run_keeps_other_products(configure, tmp_path):
+    configure(delta_dir=str(tmp_path / 'snapshots'))
+    run_store(products(a=1, b=2))
+
+    _, changes = run_store(products(a=5), partial=True)
+
+    # removed products are unknown in partial run
+    assert changes == {'a': 'changed'}
+    assert sorted(delta.load_snapshot('tt')[0]) == ['a', 'b']
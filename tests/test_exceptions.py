@@ -0,0 +1,29 @@
+import pickle
+
+from exceptions import (ArchivePartsFailed, LazyParserException,
+                        WriteProductsToCsvFailed)
+
+
+class ParseShelfFailed(LazyParserException):
+    pass
+
+
+def test_lazy_exception_has_default_message():
+    assert str(ParseShelfFailed()) == 'Parse shelf failed!'
+
+
+def test_lazy_exception_is_restored_from_worker_process():
+    error = pickle.loads(pickle.dumps(ArchivePartsFailed(['p1', 'p2'])))
+
+    assert isinstance(error, ArchivePartsFailed)
+    assert str(error) == str(ArchivePartsFailed(['p1', 'p2']))
+
+
+def test_payload_is_shortened_in_message():
+    products = {f'/product/{id}': {} for id in range(100)}
+    error = WriteProductsToCsvFailed('out', 'name.csv', products,
+                                     {'sku_name': 'x' * 1000})
+
+    assert 'Products: 100\n' in str(error)
+    assert str(error).endswith('symbols)')
+    assert len(str(error)) < 700
@@ -0,0 +1,76 @@
+import pytest
+
+import history
+from exceptions import WriteHistoryFailed
+
+
+def product(sku, tt, date, price, promo=''):
+    return {'source_sku_code': sku, 'tt_id': tt,
+            'price_datetime': f'{date} 10:00:00', 'price': price,
+            'price_promo': promo, 'price_card': '', 'price_card_promo': '',
+            'sku_status': 1, 'in_stock': 1, 'sku_name': 'Name',
+            'sku_link': f'https://site/{sku}'}
+
+
+@pytest.fixture
+def conn(configure, tmp_path):
+    configure(history_batch_size=2)
+    conn = history.open_history(str(tmp_path / 'db' / 'history.sqlite3'))
+    history.write_history(conn, [product(1, 'tt1', '2026-01-01', 100),
+                                 product(2, 'tt1', '2026-01-01', 200),
+                                 product(1, 'tt2', '2026-01-01', 110)])
+    history.write_history(conn, [product(1, 'tt1', '2026-01-02', 90, 80),
+                                 product(2, 'tt1', '2026-01-02', 200),
+                                 product(3, 'tt1', '2026-01-02', 300),
+                                 product(1, 'tt2', '2026-01-02', 110)])
+    yield conn
+    conn.close()
+
+
+def test_only_prices_and_availability_are_stored(conn):
+    row = history.get_latest_price(conn, 1, 'tt1')
+
+    assert row == {'source_sku_code': '1', 'tt_id': 'tt1',
+                   'price_datetime': '2026-01-02 10:00:00', 'price': 90.0,
+                   'price_promo': 80.0, 'price_card': None,
+                   'price_card_promo': None, 'sku_status': 1, 'in_stock': 1}
+    assert history.get_latest_price(conn, 4, 'tt1') is None
+
+
+def test_latest_prices_of_store(conn):
+    # older run written later does not replace latest prices
+    history.write_history(conn, [product(1, 'tt1', '2025-12-31', 50)])
+
+    latest = {row['source_sku_code']: row['price']
+              for row in history.get_latest_prices(conn, 'tt1')}
+
+    assert latest == {'1': 90.0, '2': 200.0, '3': 300.0}
+    assert len(history.get_latest_prices(conn)) == 4
+
+
+def test_price_changes_since_datetime(conn):
+    changes = history.get_price_changes(conn, '2026-01-02 00:00:00', 'tt1')
+
+    assert [(row['source_sku_code'], row['previous_price'], row['price'])
+            for row in changes] == [('1', 100.0, 90.0), ('3', None, 300.0)]
+    assert len(history.get_price_changes(conn, '2026-01-02 00:00:00')) == 2
+    assert len(history.get_price_changes(conn, '2026-01-01 00:00:00')) == 5
+
+
+def test_store_query_uses_index(conn):
+    plan = ' '.join(row['detail'] for row in conn.execute(
+        'EXPLAIN QUERY PLAN SELECT * FROM prices '
+        'WHERE tt_id = ? AND price_datetime >= ?', ('tt1', '2026-01-02')))
+
+    assert 'prices_store' in plan
+
+
+def test_failed_batch_is_reported(conn):
+    prods = [product(4, 'tt1', '2026-01-03', 10),
+             product(5, 'tt1', '2026-01-03', 10),
+             dict(product(6, 'tt1', '2026-01-03', 10), price_datetime='')]
+
+    with pytest.raises(WriteHistoryFailed):
+        history.write_history(conn, prods)
+    assert history.get_latest_price(conn, 4, 'tt1')['price'] == 10.0
+    assert history.get_latest_price(conn, 6, 'tt1') is None
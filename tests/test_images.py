@@ -0,0 +1,96 @@
+from logging import getLogger
+import os
+import threading
+
+import images
+import run
+from delivery import InlineExecutor
+
+
+def product_images(site, ids):
+    return {f'link-{id}': {'sku_images': f'/images/{id}.jpg'} for id in ids}
+
+
+def create_harvest(configure, site, tmp_path):
+    configure(base_url=f'http://127.0.0.1:{site.server_address[1]}',
+              images_enable=True, images_dir=str(tmp_path / 'images'),
+              images_workers=4)
+    harvest = images.create_harvest()
+    harvest['session'].trust_env = False
+    return harvest
+
+
+def test_images_are_stored_by_content(configure, mock_site, tmp_path):
+    harvest = create_harvest(configure, mock_site, tmp_path)
+    ids = list(mock_site.catalog.products)[:30]
+    products = product_images(mock_site, ids)
+
+    images.harvest_images(harvest, products)
+    images.harvest_images(harvest, product_images(mock_site, ids[:5]))
+
+    # every URL is requested once, equal images are stored once
+    assert mock_site.get_stats()['images'] == len(ids)
+    brands = {mock_site.catalog.products[id]['brand'] for id in ids}
+    keys = {prod['sku_images_keys'] for prod in products.values()}
+    assert len(keys) == len(brands)
+    for key in keys:
+        assert os.path.isfile(tmp_path / 'images' / key)
+
+
+def test_unchanged_images_are_not_downloaded(configure, mock_site,
+                                             tmp_path):
+    harvest = create_harvest(configure, mock_site, tmp_path)
+    ids = list(mock_site.catalog.products)[:10]
+    products = product_images(mock_site, ids)
+    images.harvest_images(harvest, products)
+    images.save_images_index(harvest)
+    downloaded = mock_site.get_stats()['bytes']
+
+    # next run: conditional requests, answers without content
+    harvest = create_harvest(configure, mock_site, tmp_path)
+    repeated = product_images(mock_site, ids)
+    images.harvest_images(harvest, repeated)
+
+    stats = mock_site.get_stats()
+    assert stats['not_modified'] == len(ids)
+    assert stats['bytes'] == downloaded
+    assert harvest['stats']['bytes'] == 0
+    assert repeated == products
+
+
+def test_images_are_harvested_in_archive_stage(configure, mock_site,
+                                               tmp_path, monkeypatch):
+    harvest = create_harvest(configure, mock_site, tmp_path)
+    monkeypatch.setattr(images, '_harvest', harvest)
+    harvesters = []
+    harvest_images = run.harvest_images
+
+    def record_thread(harvest, products):
+        harvesters.append(threading.current_thread().name)
+        harvest_images(harvest, products)
+
+    monkeypatch.setattr(run, 'harvest_images', record_thread)
+    written = {}
+
+    def write(dir, name_csv, products, fields):
+        written.update(products)
+        return {'path': name_csv, 'raw_bytes': 0, 'archive_bytes': 0,
+                'seconds': 0}
+
+    pipeline = run.start_pipeline(getLogger('test'), InlineExecutor(),
+                                  write, lambda path, tt: None,
+                                  run.prepare_part)
+    ids = list(mock_site.catalog.products)[:10]
+    products = {link: dict(prod, source_sku_code=link)
+                for link, prod in product_images(mock_site, ids).items()}
+    try:
+        run.finish_store(run.create_parts('tt', pipeline), products,
+                         getLogger('test'))
+    finally:
+        run.stop_pipeline(pipeline)
+
+    assert harvesters and all(name.startswith('archive-')
+                              for name in harvesters)
+    assert set(written) == set(products)
+    assert all(prod['sku_images_keys'] for prod in written.values())
+    assert os.path.isfile(tmp_path / 'images' / images.INDEX_NAME)
@@ -0,0 +1,85 @@
+import requests
+
+import run
+from conftest import SiteBrowser
+
+
+def category_url(site, number=0):
+    category = site.catalog.categories[number]
+    return (f'http://127.0.0.1:{site.server_address[1]}'
+            f'/catalog/{category["code"]}-{category["id"]}')
+
+
+def get_listing(site, configure, **overrides):
+    configure(base_url=f'http://127.0.0.1:{site.server_address[1]}',
+              pagination_mode='pages', **overrides)
+    session = requests.Session()
+    session.trust_env = False
+    cards = {}
+    links = run.get_products_links_from_category(
+        None, category_url(site), session, cards)
+    return links, cards
+
+
+def test_cards_of_all_pages_are_taken(configure, mock_site):
+    links, cards = get_listing(mock_site, configure, pagination_workers=2)
+
+    catalog = mock_site.catalog
+    ids = catalog.categories[0]['products']
+    assert [int(link.rsplit('-', 1)[1]) for link in links] == ids
+    assert set(cards) == set(links)
+    assert all(cards[link] == catalog.get_card(cards[link]['id'], '')
+               for link in links)
+
+
+def test_only_unknown_products_are_loaded(configure, mock_site):
+    links, cards = get_listing(mock_site, configure)
+    known = links[:15]
+    cache = {str(cards[link]['id']): {'sku_brand': 'Ярче'}
+             for link in known}
+    res = {}
+    stats = run.create_cache_stats()
+
+    run.parse_listing_prods(SiteBrowser(), links, cards, cache, res, 'tt',
+                            stats, {'products': 0})
+
+    assert set(res) == set(links)
+    assert mock_site.get_stats()['product'] == len(links) - len(known)
+    assert (stats['cache_hits'], stats['cache_misses']) == \
+        (len(known), len(links) - len(known))
+    # static attributes of loaded products are cached for next runs
+    assert len(cache) == len(links)
+    for link in known:
+        card = cards[link]
+        assert res[link]['sku_brand'] == 'Ярче'
+        assert res[link]['sku_name'] == card['name']
+        assert res[link]['sku_status'] == int(card['isAvailable'])
+        assert float(res[link]['price']) == (card['previousPrice']
+                                             or card['price'])
+
+
+def test_failed_card_is_quarantined(configure, mock_site, tmp_path):
+    links, cards = get_listing(mock_site, configure)
+    cards[links[0]] = dict(cards[links[0]], price='нет цены')
+    cache = {str(card['id']): {} for card in cards.values()}
+    res = {}
+    stats = run.create_cache_stats()
+
+    run.parse_listing_prods(None, links, cards, cache, res, 'tt', stats,
+                            {'products': 0})
+
+    assert set(res) == set(links[1:])
+    assert stats['errors'] == 1
+    quarantine = tmp_path / 'logs' / 'quarantine.jsonl'
+    assert links[0] in quarantine.read_text(encoding='utf-8')
+
+
+def test_absent_page_ends_category(configure, mock_site):
+    mock_site.missing_pages = True
+    links, _ = get_listing(mock_site, configure, pagination_workers=2,
+                           max_retries=3)
+
+    ids = mock_site.catalog.categories[0]['products']
+    assert [int(link.rsplit('-', 1)[1]) for link in links] == ids
+    # 3 pages and absent 4th page, which is not requested again
+    assert mock_site.get_stats()['catalog'] == 4
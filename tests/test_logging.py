@@ -0,0 +1,82 @@
+from logging import getLogger, handlers
+import threading
+
+import pytest
+
+import services
+
+
+@pytest.fixture
+def create_logger(configure, tmp_path):
+    """ Fixture creating loggers of test, records are read from file
+    after listener writes them """
+
+    names = []
+
+    def create(name, **overrides):
+        configure(**overrides)
+        names.append(name)
+        return services.create_logger('test.log', name)
+
+    path = f'{tmp_path / "logs"}/test.log'
+
+    def read():
+        services.LISTENERS[path].queue.join()
+        with open(path, encoding='utf-8') as f:
+            return f.read().splitlines()
+
+    create.path = path
+    create.read = read
+    yield create
+    for name in names:
+        getLogger(name).handlers.clear()
+
+
+def test_repeated_setup_does_not_duplicate_records(create_logger):
+    logger = create_logger('test.repeated')
+    assert create_logger('test.repeated') is logger
+
+    logger.info('Store is parsed.')
+
+    assert len(logger.handlers) == 1
+    assert [line.split(' - ')[1] for line in create_logger.read()] == \
+        ['INFO: Store is parsed.']
+
+
+def test_level_is_taken_from_config(create_logger):
+    logger = create_logger('test.level', log_level='INFO')
+
+    logger.debug('Product is parsed.')
+    logger.warning('Category is empty.')
+
+    assert [line.split(' - ')[1] for line in create_logger.read()] == \
+        ['WARNING: Category is empty.']
+
+
+def test_sampled_records_are_thinned(create_logger):
+    logger = create_logger('test.sampled', log_sample_rate=3)
+
+    for number in range(9):
+        logger.debug(f'Product {number} is parsed.',
+                     extra={'sampled': True})
+    logger.error('Product failed.')
+
+    lines = [line.split(': ', 1)[1] for line in create_logger.read()]
+    assert lines == ['Product 0 is parsed.', 'Product 3 is parsed.',
+                     'Product 6 is parsed.', 'Product failed.']
+
+
+def test_records_are_written_by_listener(create_logger):
+    logger = create_logger('test.listener')
+    writers = []
+    listener = services.LISTENERS[create_logger.path]
+    for handler in listener.handlers:
+        handler.addFilter(
+            lambda record: writers.append(threading.current_thread()) or 1)
+
+    logger.info('Store is parsed.')
+    create_logger.read()
+
+    assert all(isinstance(handler, handlers.QueueHandler)
+               for handler in logger.handlers)
+    assert writers and threading.current_thread() not in writers
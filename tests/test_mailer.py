@@ -0,0 +1,89 @@
+from logging import getLogger
+import os
+import threading
+import time
+
+import pytest
+
+import mailer
+from mail_stub import SMTPStub
+
+
+@pytest.fixture
+def smtp_stub(tmp_path):
+    """ Fixture with local SMTP server in background thread """
+
+    server = SMTPStub(('127.0.0.1', 0), str(tmp_path / 'mail_stub'))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def configure_mail(configure, server, tmp_path, **overrides):
+    configure(email_from={'login': 'parser@localhost', 'password': '',
+                          'smtp': '127.0.0.1',
+                          'port': server.server_address[1], 'ssl': 'false'},
+              emails_to=['report@localhost'],
+              mail_queue_dir=str(tmp_path / 'mail_queue'), **overrides)
+
+
+def write_archive(tmp_path, name):
+    path = tmp_path / name
+    path.write_bytes(b'archive')
+    return str(path)
+
+
+def test_archives_are_sent(configure, smtp_stub, tmp_path):
+    configure_mail(configure, smtp_stub, tmp_path)
+    started = mailer.start_mailer(getLogger('test'))
+
+    for number in range(3):
+        mailer.enqueue_archive(started, write_archive(tmp_path, f'{number}'),
+                               'subject', 'tt')
+    mailer.stop_mailer(started)
+
+    assert started['sent'] == smtp_stub.messages == 3
+    assert os.listdir(tmp_path / 'mail_queue') == []
+
+
+def test_failed_archive_does_not_block_queue(configure, smtp_stub, tmp_path):
+    configure_mail(configure, smtp_stub, tmp_path, mail_max_retries=2,
+                   mail_retry_delay_s=1)
+    started = mailer.start_mailer(getLogger('test'))
+
+    # archive is absent, so sending fails until it is written
+    missing = str(tmp_path / 'missing')
+    mailer.enqueue_archive(started, missing, 'subject', 'tt')
+    mailer.enqueue_archive(started, write_archive(tmp_path, 'ready'),
+                           'subject', 'tt')
+
+    deadline = time.monotonic() + 0.5
+    while smtp_stub.messages < 1 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert smtp_stub.messages == 1
+    assert [job['attempts'] for job in started['waiting']] == [1]
+
+    write_archive(tmp_path, 'missing')
+    mailer.stop_mailer(started)
+
+    assert started['sent'] == smtp_stub.messages == 2
+    assert started['waiting'] == []
+
+
+def test_jobs_of_previous_run_keep_retry_time(configure, smtp_stub,
+                                              tmp_path):
+    configure_mail(configure, smtp_stub, tmp_path, mail_max_retries=1)
+    os.makedirs(tmp_path / 'mail_queue')
+    job = {'file': str(tmp_path / 'mail_queue' / 'job.json'),
+           'path': write_archive(tmp_path, 'old'), 'subject': 'subject',
+           'tt_id': 'tt', 'attempts': 1, 'retry_at': time.time() + 0.3}
+    mailer.save_job(job)
+
+    started = mailer.start_mailer(getLogger('test'))
+    time.sleep(0.1)
+    assert smtp_stub.messages == 0
+
+    mailer.stop_mailer(started)
+    assert smtp_stub.messages == 1
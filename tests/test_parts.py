@@ -0,0 +1,162 @@
+from logging import getLogger
+import os
+
+import pytest
+
+import delta
+import run
+from delivery import InlineExecutor
+from exceptions import ArchivePartsFailed, ParquetUnavailable
+
+
+def start_pipeline(written):
+    def write(dir, name_csv, products, fields):
+        written.append((name_csv, list(products)))
+        return {'path': name_csv, 'raw_bytes': 0, 'archive_bytes': 0,
+                'seconds': 0}
+
+    return run.start_pipeline(getLogger('test'), InlineExecutor(), write,
+                              lambda path, tt: None)
+
+
+def create_products(start, number):
+    return {f'/product/{id}': {'source_sku_code': id, 'sku_name': 'x' * 90}
+            for id in range(start, start + number)}
+
+
+def test_parts_are_limited_by_rows(configure):
+    configure(part_max_rows=100)
+    written = []
+    pipeline = start_pipeline(written)
+    parts = run.create_parts('tt', pipeline)
+    products = create_products(0, 550)
+
+    run.flush_part(parts, products)
+    run.stop_pipeline(pipeline)
+    assert [len(links) for _, links in written] == [100] * 5
+
+    pipeline = parts['pipeline'] = start_pipeline(written)
+    products.update(create_products(550, 30))
+    run.flush_part(parts, products, final=True)
+    run.stop_pipeline(pipeline)
+
+    assert [len(links) for _, links in written] == [100] * 5 + [80]
+    assert [name.split('_')[4] for name, _ in written] == [
+        f'p{number}' for number in range(1, 7)]
+    assert sum((links for _, links in written), []) == list(products)
+
+
+def test_parts_are_limited_by_bytes(configure):
+    configure(part_max_bytes=1000)
+    written = []
+    pipeline = start_pipeline(written)
+    parts = run.create_parts('tt', pipeline)
+    products = create_products(0, 25)
+
+    run.flush_part(parts, products, final=True)
+    run.stop_pipeline(pipeline)
+
+    sizes = [sum(run.estimate_row_bytes(products[link]) for link in links)
+             for _, links in written]
+    assert len(written) > 1
+    assert all(size <= 1000 for size in sizes)
+    assert sum(len(links) for _, links in written) == 25
+
+
+def test_snapshot_is_saved_after_parts(configure, tmp_path):
+    configure(part_max_rows=10, delta_enable=True,
+              delta_dir=str(tmp_path / 'snapshots'))
+    written = []
+    pipeline = start_pipeline(written)
+    parts = run.create_parts('tt', pipeline)
+    products = create_products(0, 25)
+
+    run.flush_part(parts, products)
+    run.finish_store(parts, products, getLogger('test'))
+    run.check_pipeline(pipeline)
+
+    assert [len(links) for _, links in written] == [10, 10, 5]
+    assert len(delta.load_snapshot('tt')[0]) == 25
+
+
+def test_failed_part_fails_run_and_keeps_snapshot(configure, tmp_path):
+    configure(part_max_rows=10, delta_enable=True,
+              delta_dir=str(tmp_path / 'snapshots'))
+
+    def write(dir, name_csv, products, fields):
+        raise OSError('disk is full')
+
+    pipeline = run.start_pipeline(getLogger('test'), InlineExecutor(), write,
+                                  lambda path, tt: None)
+    parts = run.create_parts('tt', pipeline)
+    products = create_products(0, 25)
+    run.finish_store(parts, products, getLogger('test'))
+
+    with pytest.raises(ArchivePartsFailed):
+        run.check_pipeline(pipeline)
+    assert delta.load_snapshot('tt')[0] == {}
+
+
+def test_parquet_files_are_written_with_parts(configure, tmp_path):
+    pq = pytest.importorskip('pyarrow.parquet')
+    configure(parquet_enable=True, part_max_rows=10, archive_codec='none')
+    pipeline = run.start_pipeline(getLogger('test'), InlineExecutor(),
+                                  run.write_part, lambda path, tt: None)
+    parts = run.create_parts('tt', pipeline)
+    products = {link: dict(prod, price='10.5')
+                for link, prod in create_products(0, 25).items()}
+
+    run.finish_store(parts, products, getLogger('test'))
+    run.check_pipeline(pipeline)
+
+    # every part has .parquet file with the same rows as .csv file
+    names = sorted(os.listdir(tmp_path / 'out'))
+    assert [name.rsplit('.', 1)[1] for name in names] == ['csv',
+                                                          'parquet'] * 3
+    tables = [pq.read_table(tmp_path / 'out' / name) for name in names
+              if name.endswith('.parquet')]
+    assert [table.num_rows for table in tables] == [10, 10, 5]
+    assert tables[0].column('price').to_pylist() == [10.5] * 10
+
+
+def test_unavailable_parquet_stops_parser_on_start(configure):
+    configure(parquet_enable=True, parquet_compression='unknown')
+
+    with pytest.raises(ParquetUnavailable):
+        run.check_parquet()
+
+
+def test_failed_products_are_not_removed(configure, tmp_path):
+    configure(delta_enable=True, delta_dir=str(tmp_path / 'snapshots'))
+    written = []
+    pipeline = start_pipeline(written)
+    run.finish_store(run.create_parts('tt', pipeline), create_products(0, 5),
+                     getLogger('test'))
+    run.check_pipeline(pipeline)
+
+    # products 3 and 4 are quarantined in next run
+    pipeline = start_pipeline(written)
+    run.finish_store(run.create_parts('tt', pipeline), create_products(0, 3),
+                     getLogger('test'), complete=False)
+    run.check_pipeline(pipeline)
+
+    assert written[-1][1] == []
+    assert len(delta.load_snapshot('tt')[0]) == 5
+
+
+def test_store_without_changes_has_header_only_part(configure, tmp_path):
+    configure(delta_enable=True, delta_dir=str(tmp_path / 'snapshots'),
+              archive_codec='none')
+    for _ in range(2):
+        pipeline = run.start_pipeline(getLogger('test'), InlineExecutor(),
+                                      run.write_products_csv,
+                                      lambda path, tt: None)
+        run.finish_store(run.create_parts('tt', pipeline),
+                         create_products(0, 5), getLogger('test'))
+        run.check_pipeline(pipeline)
+
+    [name] = [name for name in os.listdir(tmp_path / 'out')
+              if '_pd_delta_' in name]
+    with open(tmp_path / 'out' / name, encoding='utf-8') as f:
+        assert f.read().splitlines() == [';'.join(run.CSV_FIELDS +
+                                                  ['change_type'])]
@@ -0,0 +1,71 @@
+import run
+from conftest import SiteBrowser
+
+
+def product_links(site, number=0):
+    catalog = site.catalog
+    return [f'/product/{catalog.products[id]["code"]}-{id}'
+            for id in catalog.categories[number]['products']]
+
+
+def configure_site(configure, site, **overrides):
+    configure(base_url=f'http://127.0.0.1:{site.server_address[1]}',
+              **overrides)
+
+
+def test_product_is_loaded_once_per_store(configure, mock_site):
+    configure_site(configure, mock_site)
+    first = product_links(mock_site, 0)
+    second = product_links(mock_site, 1)
+    # first product of previous category is shown also in next category
+    assert first[0] in second
+    res = {}
+    stats = run.create_cache_stats()
+
+    run.parse_prods_links(SiteBrowser(), first + first[:3], res, 'tt', {},
+                          stats)
+    run.parse_prods_links(SiteBrowser(), second, res, 'tt', {}, stats)
+
+    assert set(res) == set(first) | set(second)
+    assert mock_site.get_stats()['product'] == len(res)
+    assert stats['links'] == len(first) + 3 + len(second)
+    assert (stats['duplicates'], stats['errors']) == (4, 0)
+
+
+def test_static_attributes_are_shared_by_stores(configure, mock_site):
+    configure_site(configure, mock_site)
+    links = product_links(mock_site, 0)
+    cache = {}
+    first, second = {}, {}
+    stats = run.create_cache_stats()
+
+    run.parse_prods_links(SiteBrowser('Адрес 1'), links, first, 'tt1',
+                          cache, stats)
+    assert stats['cache_misses'] == len(links)
+    stats = run.create_cache_stats()
+    run.parse_prods_links(SiteBrowser('Адрес 2'), links, second, 'tt2',
+                          cache, stats)
+
+    assert (stats['cache_hits'], stats['cache_misses']) == (len(links), 0)
+    assert len(cache) == len(links)
+    catalog = mock_site.catalog
+    for link in links:
+        id = int(link.rsplit('-', 1)[1])
+        offer = catalog.get_card(id, 'Адрес 2')
+        assert second[link]['tt_id'] == 'tt2'
+        assert second[link]['sku_brand'] == first[link]['sku_brand'] == \
+            catalog.products[id]['brand']
+        assert second[link]['sku_status'] == int(offer['isAvailable'])
+        assert float(second[link]['price']) == (offer['previousPrice']
+                                                or offer['price'])
+
+
+def test_static_cache_is_saved_and_loaded(configure, tmp_path):
+    configure()
+    path = str(tmp_path / 'cache' / 'static.json')
+    cache = {'1': {'sku_brand': 'Ярче', 'sku_country': 'Россия'}}
+
+    run.save_static_cache(path, cache)
+
+    assert run.load_static_cache(path) == cache
+    assert run.load_static_cache(str(tmp_path / 'absent.json')) == {}
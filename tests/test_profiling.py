@@ -0,0 +1,66 @@
+import os
+import threading
+import time
+
+import profiling
+
+
+def busy(seconds):
+    finish = time.monotonic() + seconds
+    while time.monotonic() < finish:
+        pass
+
+
+def read_stacks(dir):
+    with open(os.path.join(dir, 'stacks.collapsed'), encoding='utf-8') as f:
+        return [line.rsplit(' ', 1) for line in f]
+
+
+def test_disabled_profiling_has_no_stages(configure):
+    configure(profile_mode='')
+
+    assert profiling.start_profiler() is None
+    assert profiling.stage('archive') is profiling.NO_STAGE
+    assert profiling.stop_profiler() is None
+
+
+def test_sampling_profiles_of_stages(configure):
+    configure(profile_mode='sampling', profile_interval_ms=1)
+    profiling.start_profiler()
+
+    def archive():
+        with profiling.stage('archive'):
+            busy(0.2)
+
+    thread = threading.Thread(target=archive)
+    thread.start()
+    with profiling.stage('product_pages'):
+        busy(0.2)
+    busy(0.1)
+    thread.join()
+    dir = profiling.stop_profiler()
+
+    stacks = read_stacks(dir)
+    roots = {stack.split(';')[0] for stack, _ in stacks}
+    assert roots == {'archive', 'product_pages'}
+    assert all('busy (test_profiling.py' in stack for stack, _ in stacks)
+    assert os.path.isfile(os.path.join(dir, 'archive.txt'))
+    assert os.path.isfile(os.path.join(dir, 'product_pages.txt'))
+
+
+def test_cprofile_profiles_of_nested_stages(configure):
+    configure(profile_mode='cprofile')
+    profiling.start_profiler()
+
+    with profiling.stage('product_pages'):
+        time.sleep(0.01)
+        with profiling.stage('parse_product'):
+            busy(0.05)
+    dir = profiling.stop_profiler()
+
+    stacks = dict(read_stacks(dir))
+    busy_stacks = [stack for stack in stacks if ';busy (' in stack]
+    assert [stack.split(';')[0] for stack in busy_stacks] == [
+        'parse_product']
+    assert os.path.isfile(os.path.join(dir, 'product_pages.prof'))
+    assert os.path.isfile(os.path.join(dir, 'parse_product.prof'))
@@ -0,0 +1,72 @@
+import requests
+
+import run
+
+
+def category_url(site, number=0):
+    category = site.catalog.categories[number]
+    return (f'http://127.0.0.1:{site.server_address[1]}'
+            f'/catalog/{category["code"]}-{category["id"]}')
+
+
+def promo_ids(site, number=0):
+    category = site.catalog.categories[number]
+    return {id for id in category['products']
+            if site.catalog.get_card(id, '')['previousPrice']}
+
+
+def test_promo_filter_loads_only_promo_pages(configure, mock_site):
+    configure(base_url=f'http://127.0.0.1:{mock_site.server_address[1]}',
+              promo_only=True, pagination_mode='pages',
+              pagination_workers=1)
+    session = requests.Session()
+    session.trust_env = False
+    cards = {}
+
+    links = run.get_products_links_from_category(
+        None, category_url(mock_site), session, cards)
+
+    expected = promo_ids(mock_site)
+    assert expected
+    assert {int(link.rsplit('-', 1)[1]) for link in links} == expected
+    assert all(cards[link]['previousPrice'] for link in links)
+    # pages of promo products and 1 empty page, not all pages of category
+    pages = -(-len(expected) // mock_site.catalog.page_size) + 1
+    assert mock_site.get_stats()['catalog'] == pages
+
+
+def test_known_promo_products_are_not_loaded(configure, mock_site):
+    configure(base_url=f'http://127.0.0.1:{mock_site.server_address[1]}',
+              promo_only=True, pagination_mode='pages')
+    session = requests.Session()
+    session.trust_env = False
+    cards = {}
+    links = run.get_products_links_from_category(
+        None, category_url(mock_site), session, cards)
+
+    cache = {str(cards[link]['id']): {'sku_brand': 'Ярче'}
+             for link in links}
+    res = {}
+    run.parse_listing_prods(None, links, cards, cache, res, 'tt',
+                            run.create_cache_stats(), {'products': 0})
+
+    assert set(res) == set(links)
+    assert all(prod['price_promo'] for prod in res.values())
+    assert 'product' not in mock_site.get_stats()
+
+
+def test_pages_without_promo_products_do_not_end_category(configure,
+                                                          mock_site):
+    # site ignores promo filter, so pages without promo products are loaded
+    configure(base_url=f'http://127.0.0.1:{mock_site.server_address[1]}',
+              promo_only=True, promo_filter='', pagination_mode='pages',
+              pagination_workers=1)
+    mock_site.catalog.page_size = 2
+    session = requests.Session()
+    session.trust_env = False
+
+    links = run.get_products_links_from_category(
+        None, category_url(mock_site), session)
+
+    assert {int(link.rsplit('-', 1)[1]) for link in links} == \
+        promo_ids(mock_site)
@@ -0,0 +1,122 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import threading
+import time
+from urllib.request import urlopen
+
+import pytest
+import requests
+
+import proxies
+from services import get_html
+
+
+class ProxyHandler(BaseHTTPRequestHandler):
+    """ Local stand-in proxy forwarding GET requests (absolute URLs) """
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self.server.requests += 1
+        if self.server.status != 200:
+            self.send_response(self.server.status)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        with urlopen(self.path) as response:
+            body = response.read()
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def start_proxy(status=200):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), ProxyHandler)
+    server.daemon_threads = True
+    server.requests = 0
+    server.status = status
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+@pytest.fixture
+def stand_in_proxies():
+    servers = []
+
+    def start(*statuses):
+        servers.extend(start_proxy(status) for status in statuses)
+        return servers
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+    proxies._pool = None
+
+
+def proxy_urls(servers):
+    return [f'http://127.0.0.1:{server.server_address[1]}'
+            for server in servers]
+
+
+def test_get_html_goes_through_proxies(configure, mock_site,
+                                       stand_in_proxies):
+    servers = stand_in_proxies(200, 200)
+    configure(proxies=proxy_urls(servers), proxy_rate_per_s=100)
+    url = f'http://127.0.0.1:{mock_site.server_address[1]}/category/'
+
+    session = requests.Session()
+    session.trust_env = False
+    for _ in range(10):
+        assert '__INITIAL_STATE__' in get_html(session, url)
+
+    assert sum(server.requests for server in servers) == 10
+    pool = proxies.get_proxy_pool()
+    assert sum(proxy['requests'] for proxy in pool['proxies']) == 10
+
+
+def test_blocked_proxy_is_avoided(configure, mock_site, stand_in_proxies):
+    servers = stand_in_proxies(200, 429)
+    configure(proxies=proxy_urls(servers), proxy_rate_per_s=100,
+              max_retries=3)
+    url = f'http://127.0.0.1:{mock_site.server_address[1]}/category/'
+
+    session = requests.Session()
+    session.trust_env = False
+    for _ in range(10):
+        get_html(session, url)
+
+    # blocked proxy gets at most 1 request before blocking period
+    assert servers[1].requests <= 1
+    blocked = proxies.get_proxy_pool()['proxies'][1]
+    assert blocked['blocks'] == servers[1].requests
+
+
+def test_rate_limit_is_per_proxy():
+    pool = proxies.create_pool(['a', 'b'], rate_per_s=20, block_s=1)
+
+    def run(count):
+        started = time.monotonic()
+        for _ in range(count):
+            proxies.wait_turn(pool, pool['proxies'][0])
+        return time.monotonic() - started
+
+    # 10 requests through 1 proxy take about 9 intervals of 0.05 s
+    assert run(10) >= 0.4
+
+    # other proxy is not limited by requests of first one
+    started = time.monotonic()
+    proxies.wait_turn(pool, pool['proxies'][1])
+    assert time.monotonic() - started < 0.05
+
+
+def test_unhealthy_proxy_has_lower_weight():
+    pool = proxies.create_pool(['a', 'b'], rate_per_s=1, block_s=1)
+    good, bad = pool['proxies']
+    for _ in range(5):
+        proxies.report_proxy(pool, good, 0.1)
+        proxies.report_proxy(pool, bad, 2.0, error=True)
+
+    assert proxies.get_weight(good) > 10 * proxies.get_weight(bad)
@@ -0,0 +1,119 @@
+import run
+import scheduler
+from exceptions import ParseProductsFailed
+
+
+def products(*prices):
+    return [{'source_sku_code': number, 'price': price}
+            for number, price in enumerate(prices)]
+
+
+def test_new_categories_are_due_within_budget(configure):
+    configure(daemon_requests_per_hour=300)
+    schedule = {'categories': {}, 'spent': []}
+    timings = {'categories': {'tt|/big': {'products': 500, 'seconds': 1},
+                              'tt|/small': {'products': 20, 'seconds': 1}}}
+
+    due = scheduler.select_due_categories(schedule, 'tt',
+                                          ['/big', '/small', '/new'], 1000,
+                                          timings)
+
+    # cost of new category: planner or DEFAULT_COST, not 1 request
+    assert sorted(due) == ['/new', '/small']
+    assert schedule['categories']['tt|/big']['cost'] == 501
+    assert schedule['categories']['tt|/new']['cost'] == \
+        scheduler.DEFAULT_COST
+
+
+def test_volatile_categories_are_refreshed_more_often(configure):
+    configure(daemon_min_interval_s=60, daemon_max_interval_s=6000,
+              daemon_requests_per_hour=10000)
+    schedule = {'categories': {}, 'spent': []}
+
+    for refresh in range(10):
+        now = refresh * 6000
+        scheduler.record_refresh(schedule, 'tt', '/promo',
+                                 products(refresh, 1), now)
+        scheduler.record_refresh(schedule, 'tt', '/static',
+                                 products(1, 1), now)
+
+    due = scheduler.select_due_categories(schedule, 'tt',
+                                          ['/promo', '/static'],
+                                          9 * 6000 + 600)
+    assert due == ['/promo']
+
+
+def test_failed_category_is_backed_off(configure):
+    configure(daemon_min_interval_s=60, daemon_max_interval_s=1000)
+    schedule = {'categories': {}, 'spent': []}
+
+    retries = [scheduler.record_failure(schedule, 'tt', '/a', 0)
+               for _ in range(6)]
+
+    assert retries == [60, 120, 240, 480, 960, 1000]
+    assert scheduler.select_due_categories(schedule, 'tt', ['/a'], 999) == []
+    assert scheduler.select_due_categories(schedule, 'tt', ['/a'],
+                                           1000) == ['/a']
+
+
+def test_daemon_continues_after_failed_refresh(configure, tmp_path,
+                                              monkeypatch):
+    configure(daemon_schedule_file=str(tmp_path / 'schedule.json'),
+              planner_file=str(tmp_path / 'planner.json'),
+              tt_id=['tt'], daemon_tick_s=0)
+    calls = []
+    sleeps = []
+
+    def parse_prods(browser, cats, logger, tt, *args):
+        calls.append(list(cats))
+        schedule = args[4]
+        scheduler.record_refresh(schedule, tt, cats[0], products(1))
+        if '/b' in cats:
+            raise ParseProductsFailed(cats, tt, '/b')
+        return 1
+
+    def sleep(seconds):
+        # daemon is stopped on second tick without due categories
+        if sleeps:
+            raise KeyboardInterrupt
+        sleeps.append(seconds)
+
+    monkeypatch.setattr(run, 'open_store', lambda *args: ['/a', '/b'])
+    monkeypatch.setattr(run, 'parse_prods', parse_prods)
+    monkeypatch.setattr(run.time, 'sleep', sleep)
+
+    run.run_daemon(None, run.getLogger('test'), {}, {'products': 0}, None)
+
+    schedule = scheduler.load_schedule(str(tmp_path / 'schedule.json'))
+    # first refresh fails, second refresh skips failed category
+    assert calls[0] in (['/a', '/b'], ['/b', '/a'])
+    assert calls[1] == ['/a']
+    assert schedule['categories']['tt|/b']['failures'] == 1
+    assert schedule['categories']['tt|/a']['refreshes'] == 1
+
+
+def test_daemon_continues_if_schedule_is_not_saved(configure, tmp_path,
+                                                   monkeypatch):
+    # directory of schedule can not be created (path of file)
+    (tmp_path / 'file').write_text('')
+    configure(daemon_schedule_file=str(tmp_path / 'file' / 'schedule.json'),
+              planner_file=str(tmp_path / 'planner.json'),
+              tt_id=['tt'], daemon_tick_s=0)
+    calls = []
+
+    def parse_prods(browser, cats, logger, tt, *args):
+        calls.append(list(cats))
+        scheduler.record_refresh(args[4], tt, cats[0], products(1))
+        return 1
+
+    def sleep(seconds):
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(run, 'open_store', lambda *args: ['/a'])
+    monkeypatch.setattr(run, 'parse_prods', parse_prods)
+    monkeypatch.setattr(run.time, 'sleep', sleep)
+
+    run.run_daemon(None, run.getLogger('test'), {}, {'products': 0}, None)
+
+    # failed saving is logged, daemon is stopped only by interruption
+    assert calls == [['/a']]
@@ -0,0 +1,77 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+import settings
+from conftest import ROOT
+from exceptions import ConfigInvalid
+
+
+def write_config(tmp_path, **values):
+    with open(os.path.join(ROOT, 'config.json'), encoding='utf-8') as f:
+        raw = json.load(f)
+    raw.update(values)
+    path = tmp_path / 'config.json'
+    path.write_text(json.dumps(raw, ensure_ascii=False), encoding='utf-8')
+    return str(path)
+
+
+def test_load_settings_converts_values(tmp_path):
+    path = write_config(tmp_path, part_workers='3', delta_enable='true',
+                        delay_range_s='1-2')
+
+    loaded = settings.load_settings(path)
+
+    assert loaded.part_workers == 3
+    assert loaded.delta_enable is True
+    assert loaded.delay_range == (1.0, 2.0)
+
+
+@pytest.mark.parametrize('values, key', [
+    ({'part_workers': 'abc'}, 'part_workers'),
+    ({'pagination_mode': 'scroll'}, 'pagination_mode'),
+    ({'unknown_key': 1}, 'unknown_key'),
+    ({'delay_range_s': '1'}, 'delay_range_s')])
+def test_load_settings_rejects_invalid_values(tmp_path, values, key):
+    path = write_config(tmp_path, **values)
+
+    with pytest.raises(ConfigInvalid) as error:
+        settings.load_settings(path)
+    assert error.value.key == key
+
+
+@pytest.mark.parametrize('module', ['run.py', 'get_categories.py'])
+def test_invalid_config_is_reported(tmp_path, module):
+    path = write_config(tmp_path, part_workers='abc',
+                        logs_dir=str(tmp_path / 'logs'))
+
+    result = subprocess.run(
+        [sys.executable, os.path.join(ROOT, module)], cwd=str(tmp_path),
+        env=dict(os.environ, PARSER_CONFIG=path), capture_output=True,
+        text=True, timeout=60)
+
+    assert result.returncode != 0
+    assert 'ConfigInvalid' in result.stderr
+    assert 'Key: part_workers' in result.stdout
+    assert 'Unknown error' not in result.stderr
+
+
+def test_unavailable_parquet_is_reported(tmp_path):
+    logs_dir = tmp_path / 'logs'
+    path = write_config(tmp_path, parquet_enable=True,
+                        parquet_compression='unknown',
+                        logs_dir=str(logs_dir))
+
+    result = subprocess.run(
+        [sys.executable, os.path.join(ROOT, 'run.py')], cwd=str(tmp_path),
+        env=dict(os.environ, PARSER_CONFIG=path), capture_output=True,
+        text=True, timeout=60)
+
+    assert result.returncode != 0
+    assert 'ParquetUnavailable' in result.stderr
+    assert 'Unknown error' not in result.stderr
+    log = (logs_dir / 'run.log').read_text(encoding='utf-8')
+    assert 'Checking of Parquet output failed!' in log
@@ -0,0 +1,121 @@
+import os
+from threading import Thread
+
+from delta import create_delta, finish_delta, load_snapshot, mark_changes
+from planner import (finish_plan, freeze_plan, get_job_shard, load_timings,
+                     plan_shards, record_category, save_timings)
+
+
+def record(path, tt, urls, seconds):
+    timings = load_timings(path)
+    for url in urls:
+        record_category(timings, tt, url, 10, seconds)
+    save_timings(path, timings)
+
+
+def test_shards_have_close_durations():
+    timings = {'categories': {f'tt|/{seconds}': {'seconds': seconds}
+                              for seconds in (70, 50, 40, 30, 10)}}
+    jobs = [('tt', f'/{seconds}') for seconds in (10, 30, 40, 50, 70)]
+
+    shards = plan_shards(timings, jobs, 2)
+
+    assert sorted(shard['seconds'] for shard in shards) == [100, 100]
+    assert get_job_shard(shards, 'tt', '/70') == get_job_shard(shards, 'tt',
+                                                              '/30')
+    # new category is given to the same shard in every process
+    assert get_job_shard(shards, 'tt', '/new') == \
+        get_job_shard(plan_shards(timings, jobs, 2), 'tt', '/new')
+
+
+def test_plan_is_frozen_for_run(configure, tmp_path):
+    path = str(tmp_path / 'planner.json')
+    configure(planner_file=path, tt_id=['tt'], shard_count=2,
+              shard_run_id='run-1')
+    record(path, 'tt', ['/a', '/b', '/c'], 10)
+
+    first = freeze_plan(load_timings(path))
+    # first shard records timings before second shard starts
+    record(path, 'tt', ['/a'], 1000)
+    record(path, 'tt', ['/d'], 10)
+    second = freeze_plan(load_timings(path))
+
+    assert second == first
+    assert sum(len(shard['jobs']) for shard in second) == 3
+
+    configure(planner_file=path, tt_id=['tt'], shard_count=2,
+              shard_run_id='run-2')
+    assert sum(len(shard['jobs'])
+               for shard in freeze_plan(load_timings(path))) == 4
+
+
+def count_jobs(shards):
+    return sum(len(shard['jobs']) for shard in shards)
+
+
+def test_plan_of_date_is_created_again_for_next_run(configure, tmp_path):
+    path = str(tmp_path / 'planner.json')
+    record(path, 'tt', ['/a', '/b'], 10)
+
+    for index in range(2):
+        configure(planner_file=path, tt_id=['tt'], shard_count=2,
+                  shard_index=index)
+        assert count_jobs(freeze_plan(load_timings(path))) == 2
+        record(path, 'tt', ['/c'], 10)
+        finish_plan()
+
+    # plan is deleted by last shard, next run of the same day plans again
+    assert [name for name in os.listdir(tmp_path)
+            if name.endswith('.json')] == ['planner.json']
+    assert count_jobs(freeze_plan(load_timings(path))) == 3
+
+
+def test_plan_is_created_again_if_shard_is_finished(configure, tmp_path):
+    path = str(tmp_path / 'planner.json')
+    configure(planner_file=path, tt_id=['tt'], shard_count=2)
+    record(path, 'tt', ['/a', '/b'], 10)
+    freeze_plan(load_timings(path))
+    finish_plan()
+
+    # second shard of previous run failed, first shard starts next run
+    record(path, 'tt', ['/c'], 10)
+    assert count_jobs(freeze_plan(load_timings(path))) == 3
+
+    configure(planner_file=path, tt_id=['tt', 'other'], shard_count=2)
+    record(path, 'other', ['/a'], 10)
+    assert count_jobs(freeze_plan(load_timings(path))) == 4
+
+
+def test_shards_keep_timings_of_each_other(configure, tmp_path):
+    path = str(tmp_path / 'planner.json')
+    configure(planner_file=path)
+
+    threads = [Thread(target=record, args=(path, f'tt{n}', ['/a'], n))
+               for n in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(load_timings(path)['categories']) == 8
+
+
+def test_shards_keep_snapshot_of_each_other(configure, tmp_path):
+    configure(delta_dir=str(tmp_path / 'snapshots'))
+    fields = ['source_sku_code', 'price']
+
+    # shards start with the same snapshot and parse different products
+    deltas = [create_delta('tt', partial=True) for _ in range(8)]
+    for number, delta in enumerate(deltas):
+        mark_changes(delta, {'link': {'source_sku_code': number,
+                                      'price': 1}}, fields)
+
+    threads = [Thread(target=finish_delta, args=(delta,))
+               for delta in deltas]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    hashes, _ = load_snapshot('tt')
+    assert sorted(hashes) == [str(number) for number in range(8)]
@@ -0,0 +1,77 @@
+import time
+
+import proxies
+import run
+from conftest import SiteBrowser
+
+
+def product_links(site, number=0):
+    catalog = site.catalog
+    return [f'/product/{catalog.products[id]["code"]}-{id}'
+            for id in catalog.categories[number]['products']]
+
+
+def configure_site(configure, site, **overrides):
+    configure(base_url=f'http://127.0.0.1:{site.server_address[1]}',
+              **overrides)
+
+
+def test_pages_are_loaded_in_tabs_at_the_same_time(configure, mock_site):
+    configure_site(configure, mock_site, browser_tabs=5)
+    mock_site.latency_s = 0.2
+    links = product_links(mock_site)
+    browser = SiteBrowser()
+    res = {}
+    stats = run.create_cache_stats()
+
+    started = time.monotonic()
+    run.parse_prods_links(browser, links, res, 'tt', {}, stats)
+    elapsed = time.monotonic() - started
+
+    assert set(res) == set(links)
+    assert len(browser.window_handles) == 5
+    assert browser.current_window_handle == 'tab-0'
+    assert mock_site.get_stats()['product'] == len(links)
+    # 1 tab would load pages one by one: 25 x 0.2 s
+    assert elapsed < len(links) * mock_site.latency_s / 2
+
+
+def test_error_of_tab_fails_only_its_product(configure, mock_site, tmp_path):
+    configure_site(configure, mock_site, browser_tabs=3)
+    links = product_links(mock_site)
+    url = f'{run.config.base_url}{links[1]}'
+    res = {}
+    stats = run.create_cache_stats()
+
+    run.parse_prods_links(SiteBrowser(broken=[url]), links, res, 'tt', {},
+                          stats)
+
+    assert set(res) == set(links) - {links[1]}
+    assert stats['errors'] == 1
+    quarantine = tmp_path / 'logs' / 'quarantine.jsonl'
+    assert links[1] in quarantine.read_text(encoding='utf-8')
+
+
+def test_tabs_keep_limit_and_health_of_proxy(configure, mock_site):
+    configure_site(configure, mock_site, browser_tabs=3,
+                   proxies=['http://proxy:3128'], proxy_rate_per_s=20)
+    links = product_links(mock_site)[:10]
+    broken = f'{run.config.base_url}{links[0]}'
+    browser = SiteBrowser(broken=[broken])
+    browser.proxy_url = 'http://proxy:3128'
+
+    try:
+        started = time.monotonic()
+        run.parse_prods_links(browser, links, {}, 'tt', {},
+                              run.create_cache_stats())
+        elapsed = time.monotonic() - started
+
+        proxy = proxies.get_proxy_pool()['proxies'][0]
+    finally:
+        proxies._pool = None
+
+    # broken page is loaded max_retries times
+    attempts = len(links) - 1 + run.config.max_retries
+    assert (proxy['requests'], proxy['errors']) == \
+        (attempts, run.config.max_retries)
+    assert elapsed >= (attempts - 1) / 20 - 0.01
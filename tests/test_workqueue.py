@@ -0,0 +1,153 @@
+import threading
+import time
+
+import workqueue
+
+
+def open_run(tmp_path):
+    conn = workqueue.open_queue(str(tmp_path / 'queue' / 'queue.sqlite3'))
+    return conn, workqueue.get_run_id(conn)
+
+
+def test_jobs_are_leased_by_kind_and_priority(configure, tmp_path):
+    configure(queue_visibility_s=600)
+    conn, run_id = open_run(tmp_path)
+    workqueue.add_jobs(conn, run_id, 'product', 'tt', ['p1', 'p2', 'p3'])
+    workqueue.add_jobs(conn, run_id, 'category', 'tt', ['c1'])
+    workqueue.add_jobs(conn, run_id, 'category', 'tt', ['c2'], priority=5)
+
+    categories = workqueue.lease_jobs(conn, run_id, 'w1', limit=5)
+    products = workqueue.lease_jobs(conn, run_id, 'w1', limit=2)
+
+    assert [job['target'] for job in categories] == ['c2', 'c1']
+    assert [job['target'] for job in products] == ['p1', 'p2']
+    assert all(job['attempts'] == 1 for job in categories + products)
+    assert workqueue.count_jobs(conn, run_id) == {
+        'pending': 1, 'leased': 4, 'expired': 0, 'done': 0, 'failed': 0}
+
+
+def test_expired_lease_is_leased_again(configure, tmp_path):
+    configure(queue_visibility_s=0.05, queue_max_attempts=2)
+    conn, run_id = open_run(tmp_path)
+    workqueue.add_jobs(conn, run_id, 'category', 'tt', ['c1'])
+
+    first = workqueue.lease_jobs(conn, run_id, 'w1')
+    assert workqueue.lease_jobs(conn, run_id, 'w2') == []
+    time.sleep(0.1)
+    assert workqueue.count_jobs(conn, run_id)['expired'] == 1
+    second = workqueue.lease_jobs(conn, run_id, 'w2')
+    time.sleep(0.1)
+    # lease expired after queue_max_attempts fails job
+    third = workqueue.lease_jobs(conn, run_id, 'w3')
+
+    assert first[0]['id'] == second[0]['id']
+    assert (second[0]['owner'], second[0]['attempts']) == ('w2', 2)
+    assert third == []
+    assert workqueue.count_jobs(conn, run_id)['failed'] == 1
+
+
+def test_extended_lease_does_not_expire(configure, tmp_path):
+    configure(queue_visibility_s=0.2)
+    conn, run_id = open_run(tmp_path)
+    workqueue.add_jobs(conn, run_id, 'category', 'tt', ['c1'])
+
+    jobs = workqueue.lease_jobs(conn, run_id, 'w1')
+    time.sleep(0.15)
+    workqueue.extend_leases(conn, jobs)
+    time.sleep(0.1)
+
+    assert workqueue.lease_jobs(conn, run_id, 'w2') == []
+
+
+def test_failed_job_is_retried_until_max_attempts(configure, tmp_path):
+    configure(queue_visibility_s=600, queue_max_attempts=2)
+    conn, run_id = open_run(tmp_path)
+    workqueue.add_jobs(conn, run_id, 'product', 'tt', ['p1'])
+
+    job = workqueue.lease_jobs(conn, run_id, 'w1')[0]
+    assert workqueue.fail_job(conn, job, TimeoutError('page')) is False
+    assert workqueue.count_jobs(conn, run_id)['pending'] == 1
+
+    job = workqueue.lease_jobs(conn, run_id, 'w1')[0]
+    assert workqueue.fail_job(conn, job, TimeoutError('page')) is True
+
+    assert workqueue.lease_jobs(conn, run_id, 'w1') == []
+    assert workqueue.count_jobs(conn, run_id)['failed'] == 1
+    error = conn.execute('SELECT error FROM jobs').fetchone()['error']
+    assert error == 'TimeoutError: page'
+
+
+def test_done_job_is_not_failed_by_late_worker(configure, tmp_path):
+    configure(queue_visibility_s=600)
+    conn, run_id = open_run(tmp_path)
+    workqueue.add_jobs(conn, run_id, 'product', 'tt', ['p1'])
+
+    job = workqueue.lease_jobs(conn, run_id, 'w1')[0]
+    workqueue.complete_jobs(conn, [job])
+    workqueue.fail_job(conn, job, TimeoutError('page'))
+
+    assert workqueue.count_jobs(conn, run_id)['done'] == 1
+
+
+def test_repeated_work_is_merged(configure, tmp_path):
+    configure(queue_visibility_s=600)
+    conn, run_id = open_run(tmp_path)
+    workqueue.add_jobs(conn, run_id, 'product', 'tt', ['p1', 'p2'])
+    # the same jobs added by other worker are ignored
+    workqueue.add_jobs(conn, run_id, 'product', 'tt', ['p2', 'p3'])
+
+    workqueue.upsert_results(conn, run_id, 'tt',
+                             {'p1': {'price': 1}, 'p2': {'price': 2}}, 'w1')
+    workqueue.upsert_results(conn, run_id, 'tt', {'p2': {'price': 3}}, 'w2')
+
+    assert workqueue.count_jobs(conn, run_id)['pending'] == 3
+    assert list(workqueue.iter_results(conn, run_id, 'tt')) == [
+        ('p1', {'price': 1}), ('p2', {'price': 3})]
+    assert list(workqueue.iter_results(conn, run_id, 'other')) == []
+
+
+def test_run_is_shared_until_merged(configure, tmp_path):
+    configure()
+    conn, run_id = open_run(tmp_path)
+    other = workqueue.open_queue(str(tmp_path / 'queue' / 'queue.sqlite3'))
+
+    assert workqueue.get_run_id(other) == run_id
+    workqueue.mark_merged(conn, run_id)
+    assert workqueue.get_run_id(other, create=False) is None
+
+
+def test_concurrent_workers_lease_each_job_once(configure, tmp_path):
+    configure(queue_visibility_s=600)
+    conn, run_id = open_run(tmp_path)
+    targets = [f'p{number}' for number in range(60)]
+    workqueue.add_jobs(conn, run_id, 'product', 'tt', targets)
+    leased = {}
+
+    def work(owner):
+        worker = workqueue.open_queue(
+            str(tmp_path / 'queue' / 'queue.sqlite3'))
+        while True:
+            jobs = workqueue.lease_jobs(worker, run_id, owner, limit=3)
+            if not jobs:
+                break
+            leased.setdefault(owner, []).extend(
+                job['target'] for job in jobs)
+            workqueue.upsert_results(
+                worker, run_id, 'tt',
+                {job['target']: {'owner': owner} for job in jobs}, owner)
+            workqueue.complete_jobs(worker, jobs)
+        worker.close()
+
+    threads = [threading.Thread(target=work, args=(owner,))
+               for owner in ('w1', 'w2')]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(60)
+
+    done = leased.get('w1', []) + leased.get('w2', [])
+    assert sorted(done) == sorted(targets)
+    assert workqueue.count_jobs(conn, run_id)['done'] == len(targets)
+    results = dict(workqueue.iter_results(conn, run_id, 'tt'))
+    assert all(target in leased[results[target]['owner']]
+               for target in targets)
@@ -0,0 +1,257 @@
+"""
+Module with work queue for parsing on several hosts: jobs (store,
+category of store, product of store) are leased by workers with
+visibility timeout, results are upserted to SQLite database
+on shared volume and merged to usual archives of stores
+"""
+
+import json
+import os
+import sqlite3
+import time
+from typing import Callable, Iterator
+
+from exceptions import WorkQueueFailed
+from settings import config
+
+
+# Constants
+
+# Kinds of jobs: store - checking categories of store,
+# category - getting products links, product - parsing product page
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY,
+    run_id TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    tt_id TEXT NOT NULL,
+    target TEXT NOT NULL,
+    priority REAL NOT NULL DEFAULT 0,
+    status TEXT NOT NULL DEFAULT 'pending',
+    owner TEXT,
+    lease_until REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    UNIQUE (run_id, kind, tt_id, target)
+);
+CREATE INDEX IF NOT EXISTS jobs_status
+    ON jobs (run_id, status, priority);
+CREATE TABLE IF NOT EXISTS results (
+    run_id TEXT NOT NULL,
+    tt_id TEXT NOT NULL,
+    link TEXT NOT NULL,
+    record TEXT NOT NULL,
+    owner TEXT,
+    updated REAL NOT NULL,
+    PRIMARY KEY (run_id, tt_id, link)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    created REAL NOT NULL,
+    merged REAL
+);
+'''
+
+AVAILABLE = '''
+    run_id = ? AND (status = 'pending'
+                    OR (status = 'leased' AND lease_until < ?))
+'''
+
+
+# Functions
+
+def open_queue(path: str) -> sqlite3.Connection:
+    """ Function for opening database of work queue (transactions
+    are started explicitly, writers wait for lock of other hosts;
+    default rollback journal is used, WAL does not work on network
+    file systems) """
+
+    dir = os.path.dirname(path)
+    if dir and not os.path.exists(dir):
+        os.makedirs(dir)
+
+    conn = sqlite3.connect(path, timeout=60, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def with_transaction(conn: sqlite3.Connection, function: Callable):
+    """ Function for running function in write transaction """
+
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        result = function()
+    except BaseException:
+        conn.execute('ROLLBACK')
+        raise
+    conn.execute('COMMIT')
+    return result
+
+
+def get_run_id(conn: sqlite3.Connection, create: bool = True) -> str:
+    """ Function for getting id of run shared by all workers: queue_run_id
+    from config or last not merged run of database (new run is created
+    if all runs are merged and create is True, otherwise None) """
+
+    def find() -> str:
+        if config.queue_run_id:
+            run_id = config.queue_run_id
+        else:
+            row = conn.execute('SELECT run_id FROM runs WHERE merged IS NULL '
+                               'ORDER BY created DESC LIMIT 1').fetchone()
+            if row is not None:
+                return row['run_id']
+            if not create:
+                return None
+            run_id = time.strftime('%Y-%m-%d_%H-%M-%S')
+
+        conn.execute('INSERT OR IGNORE INTO runs (run_id, created) '
+                     'VALUES (?, ?)', (run_id, time.time()))
+        return run_id
+
+    try:
+        return with_transaction(conn, find)
+
+    except Exception as e:
+        raise WorkQueueFailed('run', config.queue_run_id) from e
+
+
+def mark_merged(conn: sqlite3.Connection, run_id: str) -> None:
+    """ Function for closing merged run (next workers start new run) """
+
+    with_transaction(conn, lambda: conn.execute(
+        'UPDATE runs SET merged = ? WHERE run_id = ?', (time.time(), run_id)))
+
+
+def add_jobs(conn: sqlite3.Connection, run_id: str, kind: str, tt: str,
+             targets: list, priority: float = 0) -> None:
+    """ Function for adding jobs (already added jobs are ignored,
+    so jobs can be added by several workers) """
+
+    try:
+        with_transaction(conn, lambda: conn.executemany(
+            'INSERT OR IGNORE INTO jobs (run_id, kind, tt_id, target, '
+            'priority) VALUES (?, ?, ?, ?, ?)',
+            [(run_id, kind, tt, target, priority) for target in targets]))
+
+    except Exception as e:
+        raise WorkQueueFailed('add', f'{kind} jobs of {tt}') from e
+
+
+def lease_jobs(conn: sqlite3.Connection, run_id: str, owner: str,
+               limit: int = 1) -> list:
+    """ Function for leasing available jobs: pending jobs and jobs
+    with expired lease (only jobs of the same kind and store as job
+    with highest priority, stores before categories before products),
+    jobs expired after queue_max_attempts are failed """
+
+    def lease() -> list:
+        now = time.time()
+        conn.execute(
+            "UPDATE jobs SET status = 'failed', error = 'Lease expired' "
+            "WHERE run_id = ? AND status = 'leased' AND lease_until < ? "
+            "AND attempts >= ?", (run_id, now, config.queue_max_attempts))
+
+        first = conn.execute(
+            f'SELECT kind, tt_id FROM jobs WHERE {AVAILABLE} '
+            f"ORDER BY CASE kind WHEN 'store' THEN 0 "
+            f"WHEN 'category' THEN 1 ELSE 2 END, priority DESC, id LIMIT 1",
+            (run_id, now)).fetchone()
+        if first is None:
+            return []
+
+        rows = conn.execute(
+            f'SELECT * FROM jobs WHERE {AVAILABLE} AND kind = ? AND tt_id = ? '
+            f'ORDER BY priority DESC, id LIMIT ?',
+            (run_id, now, first['kind'], first['tt_id'], limit)).fetchall()
+
+        until = now + config.queue_visibility_s
+        conn.executemany(
+            "UPDATE jobs SET status = 'leased', owner = ?, lease_until = ?, "
+            "attempts = attempts + 1 WHERE id = ?",
+            [(owner, until, row['id']) for row in rows])
+
+        return [dict(row, owner=owner, attempts=row['attempts'] + 1)
+                for row in rows]
+
+    try:
+        return with_transaction(conn, lease)
+
+    except Exception as e:
+        raise WorkQueueFailed('lease', owner) from e
+
+
+def extend_leases(conn: sqlite3.Connection, jobs: list) -> None:
+    """ Function for extending leases of jobs still in work """
+
+    until = time.time() + config.queue_visibility_s
+    with_transaction(conn, lambda: conn.executemany(
+        "UPDATE jobs SET lease_until = ? WHERE id = ? AND owner = ? "
+        "AND status = 'leased'",
+        [(until, job['id'], job['owner']) for job in jobs]))
+
+
+def complete_jobs(conn: sqlite3.Connection, jobs: list) -> None:
+    """ Function for marking jobs as done (job finished after expiration
+    of lease is also done, its result is the same) """
+
+    with_transaction(conn, lambda: conn.executemany(
+        "UPDATE jobs SET status = 'done', lease_until = NULL WHERE id = ?",
+        [(job['id'],) for job in jobs]))
+
+
+def fail_job(conn: sqlite3.Connection, job: dict, error: Exception) -> bool:
+    """ Function for returning failed job to queue, job is failed
+    finally after queue_max_attempts (True is returned) """
+
+    final = job['attempts'] >= config.queue_max_attempts
+    status = 'failed' if final else 'pending'
+    with_transaction(conn, lambda: conn.execute(
+        "UPDATE jobs SET status = ?, lease_until = NULL, error = ? "
+        "WHERE id = ? AND status != 'done'",
+        (status, f'{type(error).__name__}: {error}'[:1000], job['id'])))
+    return final
+
+
+def upsert_results(conn: sqlite3.Connection, run_id: str, tt: str,
+                   products: dict, owner: str) -> None:
+    """ Function for saving parsed products (keys - products links),
+    repeated result of the same product replaces previous one """
+
+    now = time.time()
+    try:
+        with_transaction(conn, lambda: conn.executemany(
+            'INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?)',
+            [(run_id, tt, link, json.dumps(prod, ensure_ascii=False,
+                                           default=str), owner, now)
+             for link, prod in products.items()]))
+
+    except Exception as e:
+        raise WorkQueueFailed('upsert', f'results of {tt}') from e
+
+
+def count_jobs(conn: sqlite3.Connection, run_id: str) -> dict:
+    """ Function for counting jobs of run by status
+    (expired - leased jobs with expired lease) """
+
+    counts = {'pending': 0, 'leased': 0, 'expired': 0, 'done': 0,
+              'failed': 0}
+    for row in conn.execute(
+            "SELECT CASE WHEN status = 'leased' AND lease_until < ? "
+            "THEN 'expired' ELSE status END AS state, COUNT(*) AS number "
+            "FROM jobs WHERE run_id = ? GROUP BY state",
+            (time.time(), run_id)):
+        counts[row['state']] = row['number']
+    return counts
+
+
+def iter_results(conn: sqlite3.Connection, run_id: str,
+                 tt: str) -> Iterator[tuple]:
+    """ Function for getting pairs (link, product) of store """
+
+    for row in conn.execute('SELECT link, record FROM results '
+                            'WHERE run_id = ? AND tt_id = ? ORDER BY link',
+                            (run_id, tt)):
+        yield row['link'], json.loads(row['record'])
+